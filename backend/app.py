@@ -1,28 +1,334 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
 from flask_cors import CORS
-from utils.model_loader import ModelManager
+from werkzeug.exceptions import RequestEntityTooLarge
+from utils.model_loader import CROP_CLASS_NAMES, CropModelUnavailable, ModelManager
+from utils.batching import MicroBatcher
+from utils.prediction_cache import PredictionCache, stream_digest
+from utils.near_duplicates import NearDuplicateIndex, dhash
+from utils.weather import WeatherProxy
+from utils.soil_tiles import SoilTileCache
+from utils.assessment_store import AssessmentStore, field_key
+from utils.spatial_index import SpatialIndex, cell_degrees_for_zoom
+from utils.soil_sweep import parse_axes, sweep_soil
+from utils.metrics import metrics, request_timings, server_timing_header, start_request_timings
 from utils.preprocessor import (
+    ImageRejected,
+    check_image_upload,
     preprocess_image, 
-    prepare_soil_data, 
+    prepare_soil_sample,
+    prepare_soil_batch,
     classify_health
 )
+from utils.scoring_rules import RISK_CLASSES
 from utils.recommendations import (
     get_treatment_recommendations,
     get_soil_recommendations
 )
 from config import Config
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import contextvars
+import gc
+import json
+import os
+import threading
+import time
 import traceback
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": Config.CORS_ORIGINS}})
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
 
-# Load all models at startup
+# Models load lazily; warmup loads them in the background without blocking startup
 print("Initializing AgriSense-MRV Backend...")
 model_manager = ModelManager()
+if Config.MODEL_PRELOAD:
+    # Load everything now (in the gunicorn master when preload_app is on), then
+    # freeze the loaded objects out of the GC so forked workers keep sharing
+    # their pages instead of copying them when the collector touches them
+    model_manager.warmup()
+    gc.collect()
+    gc.freeze()
+elif Config.MODEL_WARMUP:
+    model_manager.start_warmup()
+
+# Batch concurrent crop predictions into single forward passes
+crop_batcher = MicroBatcher(
+    model_manager.predict_crop_disease_batch,
+    max_batch_size=Config.CROP_BATCH_MAX_SIZE,
+    max_wait_ms=Config.CROP_BATCH_MAX_WAIT_MS
+)
+
+# The image and soil halves of /api/predict/integrated run concurrently
+image_executor = ThreadPoolExecutor(
+    max_workers=Config.INTEGRATED_IMAGE_WORKERS, thread_name_prefix='integrated-image'
+)
+soil_executor = ThreadPoolExecutor(
+    max_workers=Config.INTEGRATED_SOIL_WORKERS, thread_name_prefix='integrated-soil'
+)
+
+# Repeat uploads of the same photo skip decoding and inference
+prediction_cache = PredictionCache(
+    max_entries=Config.PREDICTION_CACHE_SIZE,
+    ttl_seconds=Config.PREDICTION_CACHE_TTL_SECONDS
+)
+
+# Re-shot photos of the same leaf match an earlier upload by perceptual hash
+near_duplicates = NearDuplicateIndex(
+    max_distance=Config.NEAR_DUPLICATE_MAX_DISTANCE,
+    max_entries=Config.NEAR_DUPLICATE_MAX_ENTRIES,
+    ttl_seconds=Config.PREDICTION_CACHE_TTL_SECONDS
+)
+
+# Weather lookups for the soil form, proxied to Open-Meteo
+weather_proxy = WeatherProxy(
+    Config.OPEN_METEO_URL,
+    timeout_seconds=Config.WEATHER_TIMEOUT_SECONDS,
+    cell_degrees=Config.WEATHER_CELL_DEGREES,
+    ttl_seconds=Config.WEATHER_CACHE_TTL_SECONDS,
+    failure_ttl_seconds=Config.WEATHER_FAILURE_TTL_SECONDS,
+    max_entries=Config.WEATHER_CACHE_SIZE,
+    pool_size=Config.WEATHER_POOL_SIZE
+)
+
+# Location-derived soil priors, computed once per grid cell
+soil_tiles = SoilTileCache(
+    Config.SOIL_TILE_DIR,
+    cells_per_degree=Config.SOIL_TILE_CELLS_PER_DEGREE,
+    max_open_tiles=Config.SOIL_TILE_MAX_OPEN
+)
+
+# Append-only assessment history, written off the request path
+assessment_store = AssessmentStore(
+    Config.ASSESSMENT_DB_PATH,
+    batch_size=Config.ASSESSMENT_BATCH_SIZE,
+    flush_interval_ms=Config.ASSESSMENT_FLUSH_INTERVAL_MS,
+    max_queue=Config.ASSESSMENT_QUEUE_SIZE
+)
+atexit.register(assessment_store.flush, 2.0)  # write what is still queued on shutdown
+
+# Scored samples by location, for map aggregation
+spatial_index = SpatialIndex(merge_threshold=Config.SPATIAL_INDEX_MERGE_THRESHOLD)
+spatial_sync = {'last_id': 0, 'last_refresh': 0.0}
+spatial_sync_lock = threading.Lock()
+spatial_build = {'pid': None, 'thread': None}
 print("Backend ready!")
 
 
+@app.errorhandler(413)
+def request_too_large(error):
+    """Body over MAX_CONTENT_LENGTH, refused before it is read"""
+    return jsonify({
+        'status': 'error',
+        'message': f"Request is larger than {Config.MAX_CONTENT_LENGTH} bytes"
+    }), 413
+
+
+def image_rejected(error):
+    """Response for an upload refused by check_image_upload"""
+    return jsonify({
+        'status': 'error',
+        'message': str(error)
+    }), error.status_code
+
+
+@app.before_request
+def start_timing():
+    g.request_start = time.perf_counter()
+    start_request_timings()
+
+
+@app.after_request
+def record_timing(response):
+    """Observe the request latency and report per-stage timings in Server-Timing"""
+    request_start = g.get('request_start')
+    if request_start is None:
+        return response
+    total_ms = (time.perf_counter() - request_start) * 1000
+    metrics.observe_request(request.endpoint or 'unknown', response.status_code, total_ms)
+    if Config.SERVER_TIMING_ENABLED:
+        response.headers['Server-Timing'] = server_timing_header(request_timings(), total_ms)
+    return response
+
+
+def record_assessment(endpoint, inputs, assessment=None, crop_prediction=None):
+    """Queue a result for the assessment history (no-op when the store is disabled)"""
+    if Config.ASSESSMENT_STORE_ENABLED:
+        assessment_store.record(endpoint, inputs, assessment, crop_prediction)
+    elif Config.SPATIAL_INDEX_ENABLED and assessment:
+        # Without the store the index is fed directly (per worker)
+        try:
+            spatial_index.add(
+                float(inputs['latitude']), float(inputs['longitude']),
+                assessment['health_score'], assessment['disease_risk']['risk_class']
+            )
+        except (KeyError, TypeError, ValueError):
+            pass
+
+
+def _pull_spatial_rows(limit):
+    """Add up to limit history rows after the last synced one (caller holds spatial_sync_lock)"""
+    rows = assessment_store.scored_points(spatial_sync['last_id'], limit)
+    if rows:
+        spatial_index.add_many(
+            [row['latitude'] for row in rows],
+            [row['longitude'] for row in rows],
+            [row['health_score'] for row in rows],
+            [RISK_CLASSES.index(row['risk_class']) for row in rows]
+        )
+        spatial_sync['last_id'] = rows[-1]['id']
+    return len(rows)
+
+
+def sync_spatial_index():
+    """
+    Add assessment history rows written since the last sync to the spatial index
+    Request path: reads at most Config.SPATIAL_SYNC_MAX_ROWS rows and never
+    waits while the background build (or another request) is reading
+    """
+    if not Config.ASSESSMENT_STORE_ENABLED:
+        return
+    if not spatial_sync_lock.acquire(blocking=False):
+        return
+    try:
+        if time.monotonic() - spatial_sync['last_refresh'] < Config.SPATIAL_INDEX_REFRESH_SECONDS:
+            return
+        _pull_spatial_rows(Config.SPATIAL_SYNC_MAX_ROWS)
+        spatial_sync['last_refresh'] = time.monotonic()
+    finally:
+        spatial_sync_lock.release()
+
+
+def build_spatial_index():
+    """Load the whole assessment history into the spatial index, one page per lock hold"""
+    start = time.perf_counter()
+    try:
+        while True:
+            with spatial_sync_lock:
+                if not _pull_spatial_rows(Config.SPATIAL_INDEX_BUILD_PAGE_ROWS):
+                    break
+        print(f"✓ Spatial index built: {len(spatial_index)} points in {time.perf_counter() - start:.1f} s")
+    except Exception as e:
+        print(f"✗ Spatial index build failed: {e}")
+
+
+def start_spatial_index_build():
+    """
+    Build the spatial index in a background thread, once per process
+    Threads do not survive fork, so with gunicorn preload this is called from
+    post_worker_init (see gunicorn.conf.py) rather than in the master
+    """
+    if not (Config.SPATIAL_INDEX_ENABLED and Config.ASSESSMENT_STORE_ENABLED):
+        return
+    if spatial_build['pid'] == os.getpid():
+        return
+    spatial_build['pid'] = os.getpid()
+    spatial_build['thread'] = threading.Thread(
+        target=build_spatial_index, name='spatial-index-build', daemon=True
+    )
+    spatial_build['thread'].start()
+
+
+def spatial_index_building():
+    thread = spatial_build['thread']
+    return thread is not None and thread.is_alive()
+
+
+def submit_with_context(executor, fn, *args):
+    """Run fn on an executor thread that still records into this request's timings"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def crop_batching_enabled():
+    """
+    Micro-batching only pays off with a real model: the mock predicts image by
+    image, so requests would just wait out CROP_BATCH_MAX_WAIT_MS
+    """
+    return Config.CROP_BATCHING_ENABLED and Config.CROP_INFERENCE_BACKEND != 'mock'
+
+
+def predict_crop(processed_image, **options):
+    """Crop disease prediction, through the micro-batcher when enabled"""
+    with metrics.stage('crop_predict'):
+        if crop_batching_enabled():
+            return crop_batcher.predict(processed_image, **options)
+        return model_manager.predict_crop_disease(processed_image, **options)
+
+
+def cache_bypassed():
+    """Clients can skip the prediction cache with ?cache=false or Cache-Control: no-cache"""
+    if request.args.get('cache', '').lower() in ('0', 'false', 'no', 'off'):
+        return True
+    return 'no-cache' in request.headers.get('Cache-Control', '').lower()
+
+
+def requested_top_k():
+    """
+    top_k query parameter of the crop endpoint, or None when absent
+    Raises ValueError when it is not an integer between 1 and the class count
+    """
+    value = request.args.get('top_k')
+    if value in (None, ''):
+        return None
+    top_k = int(value)
+    if not 1 <= top_k <= len(CROP_CLASS_NAMES):
+        raise ValueError(f"top_k must be between 1 and {len(CROP_CLASS_NAMES)}")
+    return top_k
+
+
+def full_distribution_requested():
+    return request.args.get('full_distribution', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def predict_crop_from_upload(image_stream, use_cache=True, top_k=None, full_distribution=False):
+    """
+    Crop prediction for an uploaded image stream (checked by check_image_upload),
+    answered from the prediction cache when the same bytes were seen before, or
+    from the near-duplicate index when a perceptually similar photo was
+    A reused near-duplicate prediction carries 'near_duplicate_of' (digest of
+    the upload it was inferred from and the dHash distance), so it is never
+    passed off as a fresh inference
+    The stream is hashed in chunks and decoded in place, never copied whole
+    Returns: (prediction, cached)
+    """
+    use_cache = use_cache and Config.PREDICTION_CACHE_ENABLED
+    # Near-duplicates only serve plain predictions (no top_k / full distribution)
+    use_near_duplicates = use_cache and Config.NEAR_DUPLICATE_ENABLED and not (top_k or full_distribution)
+    
+    if use_cache:
+        cache_key = stream_digest(image_stream)
+        if top_k or full_distribution:
+            cache_key = f"{cache_key}:top{top_k or 0}:{'full' if full_distribution else 'partial'}"
+        prediction = prediction_cache.get(cache_key)
+        if prediction is not None:
+            return prediction, True
+    
+    with metrics.stage('preprocess_image'):
+        processed_image, pixels = preprocess_image(image_stream, with_pixels=True)
+    
+    if use_near_duplicates:
+        with metrics.stage('near_duplicate_lookup'):
+            image_hash = dhash(pixels)
+            match = near_duplicates.lookup(image_hash)
+        if match is not None:
+            (source_prediction, source_digest), distance = match
+            prediction = dict(source_prediction, near_duplicate_of={
+                'image_digest': source_digest,
+                'distance': distance
+            })
+            prediction_cache.put(cache_key, prediction)
+            return prediction, True
+    
+    prediction = predict_crop(processed_image, top_k=top_k, full_distribution=full_distribution)
+    
+    if use_cache:
+        prediction_cache.put(cache_key, prediction)
+    if use_near_duplicates:
+        near_duplicates.add(image_hash, (prediction, cache_key))
+    return prediction, False
+
+
 @app.route('/', methods=['GET'])
 def home():
     """Health check endpoint"""
@@ -33,12 +339,286 @@ def home():
     })
 
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness endpoint: per-model load status and load timings"""
+    if not (Config.MODEL_PRELOAD or Config.MODEL_WARMUP):
+        # Nothing warms up: load what the endpoints need on the first check
+        model_manager.load_required()
+    status = model_manager.model_status()
+    return jsonify({
+        'status': 'ready' if status['ready'] else 'loading',
+        **status
+    }), 200 if status['ready'] else 503
+
+
+def crop_model_disabled():
+    """Error response for crop endpoints in a soil-only deployment"""
+    return jsonify({
+        'status': 'error',
+        'message': 'Crop disease model is disabled in this deployment'
+    }), 503
+
+
+def crop_model_unavailable(error):
+    """Error response when the configured crop backend failed to load"""
+    return jsonify({
+        'status': 'error',
+        'message': str(error)
+    }), 503
+
+
+@app.route('/api/stats/crop-batching', methods=['GET'])
+def crop_batching_stats():
+    """Batch-size distribution of the crop disease micro-batcher"""
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'enabled': crop_batching_enabled(),
+            **crop_batcher.stats()
+        }
+    })
+
+
+@app.route('/api/stats/prediction-cache', methods=['GET'])
+def prediction_cache_stats():
+    """Hit/miss counters of the crop prediction cache"""
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'enabled': Config.PREDICTION_CACHE_ENABLED,
+            **prediction_cache.stats()
+        }
+    })
+
+
+@app.route('/api/stats/near-duplicates', methods=['GET'])
+def near_duplicate_stats():
+    """Size, hit rate and average lookup time of the near-duplicate photo index"""
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'enabled': Config.NEAR_DUPLICATE_ENABLED,
+            **near_duplicates.stats()
+        }
+    })
+
+
+@app.route('/api/stats/weather', methods=['GET'])
+def weather_stats():
+    """Upstream call, coalescing and cache counters of the weather proxy"""
+    return jsonify({
+        'status': 'success',
+        'data': weather_proxy.stats()
+    })
+
+
+@app.route('/api/stats/assessments', methods=['GET'])
+def assessment_store_stats():
+    """Queue and write counters of the assessment history store"""
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'enabled': Config.ASSESSMENT_STORE_ENABLED,
+            **assessment_store.stats()
+        }
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Latency histograms per stage and endpoint, plus batcher and cache counters (Prometheus text format)"""
+    batching = crop_batcher.stats()
+    cache = prediction_cache.stats()
+    weather = weather_proxy.stats()
+    duplicates = near_duplicates.stats()
+    tiles = soil_tiles.stats()
+    history = assessment_store.stats()
+    gauges = {
+        'agrisense_crop_batches_total': batching['batches'],
+        'agrisense_crop_batched_items_total': batching['items'],
+        'agrisense_prediction_cache_entries': cache['entries'],
+        'agrisense_prediction_cache_hits_total': cache['hits'],
+        'agrisense_prediction_cache_misses_total': cache['misses'],
+        'agrisense_prediction_cache_evictions_total': cache['evictions'],
+        'agrisense_near_duplicate_entries': duplicates['entries'],
+        'agrisense_near_duplicate_lookups_total': duplicates['lookups'],
+        'agrisense_near_duplicate_hits_total': duplicates['hits'],
+        'agrisense_weather_upstream_calls_total': weather['upstream_calls'],
+        'agrisense_weather_upstream_errors_total': weather['upstream_errors'],
+        'agrisense_weather_coalesced_total': weather['coalesced'],
+        'agrisense_weather_cache_hits_total': weather['cache_hits'],
+        'agrisense_soil_tile_hits_total': tiles['hits'],
+        'agrisense_soil_tile_misses_total': tiles['misses'],
+        'agrisense_assessments_queued': history['queued'],
+        'agrisense_assessments_written_total': history['written'],
+        'agrisense_assessments_dropped_total': history['dropped'],
+        'agrisense_spatial_index_points': len(spatial_index)
+    }
+    return metrics.render(gauges), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+@app.route('/api/weather', methods=['GET'])
+def current_weather():
+    """
+    Current weather for the soil form (proxied and cached Open-Meteo lookup)
+    Expects: ?lat=<latitude>&lng=<longitude>
+    Falls back to a latitude-based estimate when Open-Meteo is unavailable
+    """
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+    except (KeyError, ValueError):
+        return jsonify({
+            'status': 'error',
+            'message': 'lat and lng query parameters are required'
+        }), 400
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({
+            'status': 'error',
+            'message': 'lat must be within [-90, 90] and lng within [-180, 180]'
+        }), 400
+    
+    with metrics.stage('weather_lookup'):
+        weather = weather_proxy.current_weather(lat, lng)
+    
+    return jsonify({
+        'status': 'success',
+        'data': weather
+    })
+
+
+@app.route('/api/soil/location', methods=['GET'])
+def soil_for_location():
+    """
+    Location-based soil parameters for the soil form (server-side version of
+    the frontend's generateLocationBasedSoilData, cached per grid cell)
+    Expects: ?lat=<latitude>&lng=<longitude>, optional weather=true to use the
+    current weather from /api/weather instead of the latitude estimate
+    """
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+    except (KeyError, ValueError):
+        return jsonify({
+            'status': 'error',
+            'message': 'lat and lng query parameters are required'
+        }), 400
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({
+            'status': 'error',
+            'message': 'lat must be within [-90, 90] and lng within [-180, 180]'
+        }), 400
+    
+    weather = None
+    if request.args.get('weather', '').lower() in ('1', 'true', 'yes', 'on'):
+        with metrics.stage('weather_lookup'):
+            weather = weather_proxy.current_weather(lat, lng)
+    
+    with metrics.stage('soil_tile_lookup'):
+        soil_data, cell = soil_tiles.lookup(lat, lng, weather)
+    
+    return jsonify({
+        'status': 'success',
+        'data': soil_data,
+        'cell': cell
+    })
+
+
+@app.route('/api/assessments', methods=['GET'])
+def assessment_history():
+    """
+    Time series of recorded assessments for one field
+    Expects: ?field_id=<id> or ?lat=<latitude>&lng=<longitude> (the field key of
+    samples without a field_id), optional since/until (unix seconds) and limit
+    """
+    try:
+        field_id = request.args.get('field_id') or field_key({
+            'latitude': request.args['lat'], 'longitude': request.args['lng']
+        })
+        since = float(request.args['since']) if 'since' in request.args else None
+        until = float(request.args['until']) if 'until' in request.args else None
+        limit = min(int(request.args.get('limit', 1000)), 10000)
+    except (KeyError, ValueError):
+        field_id = None
+    if field_id is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'field_id (or lat and lng) is required; since, until and limit must be numbers'
+        }), 400
+    
+    with metrics.stage('assessment_query'):
+        history = assessment_store.field_history(field_id, since, until, limit)
+    
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'field_id': field_id,
+            'count': len(history),
+            'assessments': history
+        }
+    })
+
+
+@app.route('/api/map/aggregate', methods=['GET'])
+def map_aggregate():
+    """
+    Soil health of recorded samples aggregated into grid cells for a map view
+    Expects: ?bbox=<south>,<west>,<north>,<east> and either zoom=<map zoom>
+    (one cell per 32 px) or cell=<degrees>; defaults to 32 cells across the box
+    Returns per non-empty cell: bounds, count, mean health, p50/p90 and risk class counts
+    """
+    if not Config.SPATIAL_INDEX_ENABLED:
+        return jsonify({
+            'status': 'error',
+            'message': 'Spatial index is disabled'
+        }), 503
+    try:
+        south, west, north, east = (float(value) for value in request.args['bbox'].split(','))
+        if 'zoom' in request.args:
+            cell_degrees = cell_degrees_for_zoom(min(max(int(request.args['zoom']), 0), 22))
+        elif 'cell' in request.args:
+            cell_degrees = float(request.args['cell'])
+        else:
+            cell_degrees = max(north - south, east - west) / Config.SPATIAL_DEFAULT_CELLS
+    except (KeyError, ValueError):
+        return jsonify({
+            'status': 'error',
+            'message': 'bbox=south,west,north,east is required; zoom and cell must be numbers'
+        }), 400
+    if not (-90 <= south < north <= 90 and -180 <= west < east <= 180 and cell_degrees > 0):
+        return jsonify({
+            'status': 'error',
+            'message': 'bbox must satisfy south < north and west < east within lat/lng range; cell must be positive'
+        }), 400
+    
+    with metrics.stage('spatial_sync'):
+        sync_spatial_index()
+    with metrics.stage('spatial_aggregate'):
+        aggregate = spatial_index.aggregate(south, north, west, east, cell_degrees)
+    
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'bbox': [south, west, north, east],
+            'indexed_points': len(spatial_index),
+            'index_building': spatial_index_building(),
+            **aggregate
+        }
+    })
+
+
 @app.route('/api/predict/crop-disease', methods=['POST'])
 def predict_crop_disease():
     """
     Endpoint to detect crop disease from leaf image
     Expects: multipart/form-data with 'image' file
+    Optional query parameters: top_k (1-38) adds the k most likely classes,
+    full_distribution=true adds all class probabilities
     """
+    if not model_manager.crop_enabled:
+        return crop_model_disabled()
+    
     try:
         # Check if image is provided
         if 'image' not in request.files:
@@ -56,25 +636,56 @@ def predict_crop_disease():
                 'message': 'Empty filename'
             }), 400
         
-        # Preprocess image
-        processed_image = preprocess_image(image_file)
+        try:
+            top_k = requested_top_k()
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': f"Invalid top_k: {str(e)}"
+            }), 400
+        full_distribution = full_distribution_requested()
+        
+        # Size, format and pixel limits are checked before anything is decoded
+        try:
+            with metrics.stage('upload_check'):
+                check_image_upload(image_file.stream)
+        except ImageRejected as e:
+            return image_rejected(e)
         
-        # Get prediction
-        prediction = model_manager.predict_crop_disease(processed_image)
+        # Get prediction (cached by upload content unless bypassed)
+        prediction, cached = predict_crop_from_upload(
+            image_file.stream, not cache_bypassed(), top_k=top_k, full_distribution=full_distribution
+        )
         
         # Get recommendations
-        recommendations = get_treatment_recommendations(prediction['class_name'])
+        with metrics.stage('crop_recommendations'):
+            recommendations = get_treatment_recommendations(prediction['class_name'])
+        
+        data = {
+            'disease': prediction['class_name'],
+            'confidence': prediction['confidence'],
+            'confidence_percentage': f"{prediction['confidence'] * 100:.2f}%",
+            'recommendations': recommendations,
+            'cached': cached,
+            'near_duplicate_of': prediction.get('near_duplicate_of')
+        }
+        if top_k:
+            data['top_predictions'] = [
+                {'disease': label, 'probability': probability}
+                for label, probability in prediction['top_k']
+            ]
+        if full_distribution:
+            data['all_probabilities'] = dict(zip(CROP_CLASS_NAMES, prediction['all_probabilities']))
         
         return jsonify({
             'status': 'success',
-            'data': {
-                'disease': prediction['class_name'],
-                'confidence': prediction['confidence'],
-                'confidence_percentage': f"{prediction['confidence'] * 100:.2f}%",
-                'recommendations': recommendations
-            }
+            'data': data
         })
     
+    except RequestEntityTooLarge:
+        raise  # answered by request_too_large
+    except CropModelUnavailable as e:
+        return crop_model_unavailable(e)
     except Exception as e:
         print(f"Error in crop disease prediction: {str(e)}")
         traceback.print_exc()
@@ -100,22 +711,25 @@ def predict_soil_health():
                 'message': 'No data provided'
             }), 400
         
-        # Prepare soil features
-        soil_features = prepare_soil_data(data)
-        
-        # Get predictions
-        health_score = model_manager.predict_soil_health(soil_features)
-        disease_risk = model_manager.predict_soil_disease_risk(soil_features)
+        # Prepare soil features (pandas-free)
+        with metrics.stage('prepare_soil_data'):
+            soil_features = prepare_soil_sample(data)
         
-        # Classify health
-        health_class = classify_health(health_score)
+        # Get predictions (health score, class and disease risk in one pass)
+        with metrics.stage('soil_assess'):
+            assessment = model_manager.assess_soil(soil_features)
+        health_score = assessment['health_score']
+        health_class = assessment['health_class']
+        disease_risk = assessment['disease_risk']
+        record_assessment('soil-health', data, assessment)
         
         # Get recommendations
-        recommendations = get_soil_recommendations(
-            health_score, 
-            disease_risk,
-            data
-        )
+        with metrics.stage('soil_recommendations'):
+            recommendations = get_soil_recommendations(
+                health_score, 
+                disease_risk,
+                data
+            )
         
         return jsonify({
             'status': 'success',
@@ -142,12 +756,147 @@ def predict_soil_health():
         }), 500
 
 
+@app.route('/api/predict/soil-health/batch', methods=['POST'])
+def predict_soil_health_batch():
+    """
+    Endpoint to score many soil samples in one vectorized pass
+    Expects: JSON data {"samples": [<soil parameters>, ...]}
+    Returns one result per sample, identical to /api/predict/soil-health
+    """
+    try:
+        data = request.get_json(silent=True)
+        samples = data.get('samples') if isinstance(data, dict) else None
+        
+        if not isinstance(samples, list) or not samples:
+            return jsonify({
+                'status': 'error',
+                'message': 'No samples provided'
+            }), 400
+        
+        # Score all samples at once (a malformed sample is a client error)
+        try:
+            with metrics.stage('prepare_soil_data'):
+                features = prepare_soil_batch(samples)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        with metrics.stage('soil_score_batch'):
+            scores = model_manager.score_soil_batch(features)
+        
+        with metrics.stage('soil_recommendations'):
+            results = []
+            for i, sample in enumerate(samples):
+                health_score = float(scores['health_scores'][i])
+                low, medium, high = scores['risk_probabilities'][i].tolist()
+                disease_risk = {
+                    'risk_class': str(scores['risk_classes'][i]),
+                    'risk_idx': int(scores['risk_idx'][i]),
+                    'probabilities': {'Low': low, 'Medium': medium, 'High': high}
+                }
+                record_assessment('soil-health/batch', sample, {
+                    'health_score': health_score,
+                    'health_class': classify_health(health_score),
+                    'disease_risk': disease_risk
+                })
+                
+                results.append({
+                    'soil_health': {
+                        'score': round(health_score, 2),
+                        'class': classify_health(health_score),
+                        'percentage': f"{health_score:.1f}%"
+                    },
+                    'disease_risk': {
+                        'class': disease_risk['risk_class'],
+                        'probabilities': disease_risk['probabilities']
+                    },
+                    'recommendations': get_soil_recommendations(health_score, disease_risk, sample)
+                })
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'count': len(results),
+                'results': results
+            }
+        })
+    
+    except Exception as e:
+        print(f"Error in batch soil health prediction: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/predict/soil-health/sweep', methods=['POST'])
+def predict_soil_health_sweep():
+    """
+    What-if sweep: score a base sample over a grid of 1-3 parameter ranges
+    Expects: JSON data {"sample": {<soil parameters>},
+                        "parameters": [{"name": "ph", "min": 5.5, "max": 7.5, "steps": 21}, ...],
+                        "target": {"health_class": "High", "risk_class": "Low"} (optional),
+                        "costs": {"ph": 2.0, ...} (optional, cost per unit of change)}
+    Returns the health score and risk surfaces and the cheapest change reaching the target
+    """
+    try:
+        data = request.get_json(silent=True)
+        sample = data.get('sample') if isinstance(data, dict) else None
+        
+        if not isinstance(sample, dict):
+            return jsonify({
+                'status': 'error',
+                'message': 'No sample provided'
+            }), 400
+        
+        target = data.get('target')
+        costs = data.get('costs')
+        try:
+            axes = parse_axes(
+                data.get('parameters'),
+                max_steps=Config.SOIL_SWEEP_MAX_STEPS,
+                max_points=Config.SOIL_SWEEP_MAX_POINTS
+            )
+            if target is not None and not isinstance(target, dict):
+                raise ValueError('target must be an object')
+            if costs is not None and not isinstance(costs, dict):
+                raise ValueError('costs must be an object')
+            with metrics.stage('prepare_soil_data'):
+                base_row = prepare_soil_batch([sample])[0]
+            # Sweeps are hypothetical, so they are not recorded in the assessment history
+            with metrics.stage('soil_sweep'):
+                sweep = sweep_soil(model_manager, base_row, axes, target, costs)
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        return jsonify({
+            'status': 'success',
+            'data': sweep
+        })
+    
+    except Exception as e:
+        print(f"Error in soil health sweep: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
 @app.route('/api/predict/integrated', methods=['POST'])
 def integrated_analysis():
     """
     Endpoint for integrated analysis (both crop and soil)
     Expects: multipart/form-data with 'image' file and 'soilData' JSON string
     """
+    if not model_manager.crop_enabled:
+        return crop_model_disabled()
+    
     try:
         # Check for image
         if 'image' not in request.files:
@@ -159,7 +908,6 @@ def integrated_analysis():
         image_file = request.files['image']
         
         # Get soil data from form
-        import json
         soil_data_str = request.form.get('soilData')
         if not soil_data_str:
             return jsonify({
@@ -167,45 +915,108 @@ def integrated_analysis():
                 'message': 'No soil data provided'
             }), 400
         
-        soil_data = json.loads(soil_data_str)
+        # Bad soilData is a client error: validate it here, not in the soil half
+        try:
+            soil_data = json.loads(soil_data_str)
+            if not isinstance(soil_data, dict):
+                raise ValueError('soilData must be a JSON object')
+            with metrics.stage('prepare_soil_data'):
+                soil_features = prepare_soil_sample(soil_data)
+        except Exception as e:  # JSONDecodeError, ValueError, or a field prepare_soil_sample rejected
+            return jsonify({
+                'status': 'error',
+                'message': f"Invalid soilData: {e}"
+            }), 400
+        
+        try:
+            with metrics.stage('upload_check'):
+                check_image_upload(image_file.stream)
+        except ImageRejected as e:
+            return image_rejected(e)
+        use_cache = not cache_bypassed()
+        
+        # Image half and soil half are independent until the insights step
+        # (the upload stream stays open until this request has finished)
+        crop_future = submit_with_context(image_executor, analyze_crop_half, image_file.stream, use_cache)
+        soil_future = submit_with_context(soil_executor, analyze_soil_half, soil_data, soil_features)
+        
+        errors = {}
+        crop_analysis = soil_analysis = None
+        try:
+            crop_analysis = crop_future.result()
+        except Exception as e:
+            print(f"Error in integrated analysis (crop): {str(e)}")
+            traceback.print_exc()
+            errors['crop_analysis'] = str(e)
+        try:
+            soil_analysis = soil_future.result()
+        except Exception as e:
+            print(f"Error in integrated analysis (soil): {str(e)}")
+            traceback.print_exc()
+            errors['soil_analysis'] = str(e)
+        
+        if crop_analysis is not None or soil_analysis is not None:
+            record_assessment(
+                'integrated',
+                soil_analysis['soil_data'] if soil_analysis is not None else {},
+                soil_analysis,
+                crop_analysis['prediction'] if crop_analysis is not None else None
+            )
+        
+        if crop_analysis is None and soil_analysis is None:
+            return jsonify({
+                'status': 'error',
+                'message': '; '.join(f"{half}: {message}" for half, message in errors.items()),
+                'errors': errors
+            }), 500
+        
+        data = {
+            'crop_analysis': None,
+            'soil_analysis': None,
+            'integrated_insights': None
+        }
         
-        # Process image
-        processed_image = preprocess_image(image_file)
-        crop_prediction = model_manager.predict_crop_disease(processed_image)
-        crop_recommendations = get_treatment_recommendations(crop_prediction['class_name'])
+        if crop_analysis is not None:
+            crop_prediction = crop_analysis['prediction']
+            data['crop_analysis'] = {
+                'disease': crop_prediction['class_name'],
+                'confidence': crop_prediction['confidence'],
+                'recommendations': crop_analysis['recommendations'],
+                'cached': crop_analysis['cached'],
+                'near_duplicate_of': crop_prediction.get('near_duplicate_of')
+            }
+        
+        if soil_analysis is not None:
+            data['soil_analysis'] = {
+                'health_score': round(soil_analysis['health_score'], 2),
+                'health_class': soil_analysis['health_class'],
+                'disease_risk': soil_analysis['disease_risk']['risk_class'],
+                'recommendations': soil_analysis['recommendations']
+            }
         
-        # Process soil data
-        soil_features = prepare_soil_data(soil_data)
-        health_score = model_manager.predict_soil_health(soil_features)
-        disease_risk = model_manager.predict_soil_disease_risk(soil_features)
-        health_class = classify_health(health_score)
-        soil_recommendations = get_soil_recommendations(health_score, disease_risk, soil_data)
+        # One half failed: return the other half's result with the error
+        if errors:
+            return jsonify({
+                'status': 'partial',
+                'message': '; '.join(f"{half}: {message}" for half, message in errors.items()),
+                'errors': errors,
+                'data': data
+            })
         
         # Generate integrated insights
-        integrated_insights = generate_integrated_insights(
-            crop_prediction,
-            health_score,
-            disease_risk
+        data['integrated_insights'] = generate_integrated_insights(
+            crop_analysis['prediction'],
+            soil_analysis['health_score'],
+            soil_analysis['disease_risk']
         )
         
         return jsonify({
             'status': 'success',
-            'data': {
-                'crop_analysis': {
-                    'disease': crop_prediction['class_name'],
-                    'confidence': crop_prediction['confidence'],
-                    'recommendations': crop_recommendations
-                },
-                'soil_analysis': {
-                    'health_score': round(health_score, 2),
-                    'health_class': health_class,
-                    'disease_risk': disease_risk['risk_class'],
-                    'recommendations': soil_recommendations
-                },
-                'integrated_insights': integrated_insights
-            }
+            'data': data
         })
     
+    except RequestEntityTooLarge:
+        raise  # answered by request_too_large
     except Exception as e:
         print(f"Error in integrated analysis: {str(e)}")
         traceback.print_exc()
@@ -215,6 +1026,32 @@ def integrated_analysis():
         }), 500
 
 
+def analyze_crop_half(image_stream, use_cache):
+    """Image half of the integrated analysis: decode, predict, recommend"""
+    prediction, cached = predict_crop_from_upload(image_stream, use_cache)
+    with metrics.stage('crop_recommendations'):
+        recommendations = get_treatment_recommendations(prediction['class_name'])
+    return {
+        'prediction': prediction,
+        'cached': cached,
+        'recommendations': recommendations
+    }
+
+
+def analyze_soil_half(soil_data, soil_features):
+    """Soil half of the integrated analysis: score, recommend (input already validated)"""
+    with metrics.stage('soil_assess'):
+        assessment = model_manager.assess_soil(soil_features)
+    with metrics.stage('soil_recommendations'):
+        assessment['recommendations'] = get_soil_recommendations(
+            assessment['health_score'],
+            assessment['disease_risk'],
+            soil_data
+        )
+    assessment['soil_data'] = soil_data
+    return assessment
+
+
 def generate_integrated_insights(crop_prediction, health_score, disease_risk):
     """Generate combined insights from crop and soil analysis"""
     insights = []
@@ -245,5 +1082,11 @@ def generate_integrated_insights(crop_prediction, health_score, disease_risk):
     return insights
 
 
+# Map index: built in the background now, unless the app is preloaded in a
+# gunicorn master (then each worker starts it from post_worker_init)
+if not Config.MODEL_PRELOAD:
+    start_spatial_index_build()
+
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Benchmark: combined soil assessment vs. separate health + risk calls
+
+Run from the backend directory:
+    python benchmarks/bench_assess_soil.py
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.model_loader import ModelManager
+from utils.preprocessor import prepare_soil_data
+
+SAMPLE = {
+    'temperature': 27.5, 'humidity': 68.0, 'moisture': 62.0, 'soil_type': 'Clayey',
+    'nitrogen': 210.0, 'phosphorous': 32.0, 'potassium': 190.0, 'ph': 6.4,
+    'ec': 1.4, 'organic_carbon': 1.8, 'pathogen_presence': 0,
+    'salinity_class': 'Normal', 'latitude': 18.52, 'longitude': 73.85
+}
+ITERATIONS = 20000
+
+
+def separate_calls(manager, features):
+    """What the endpoints did before assess_soil"""
+    manager.predict_soil_health(features)
+    manager.predict_soil_disease_risk(features)
+
+
+def combined_call(manager, features):
+    manager.assess_soil(features)
+
+
+def count_risk_computations(manager, fn, features):
+    """Number of disease risk evaluations made by one request"""
+    calls = [0]
+    original = manager._soil_disease_risk
+    
+    def counting(extracted):
+        calls[0] += 1
+        return original(extracted)
+    
+    manager._soil_disease_risk = counting
+    try:
+        fn(manager, features)
+    finally:
+        del manager._soil_disease_risk
+    return calls[0]
+
+
+def time_per_call(manager, fn, features):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn(manager, features)
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+def main():
+    # Model loading and per-request debug output are not part of the measurement
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = ModelManager()
+        features = prepare_soil_data(SAMPLE)
+        
+        separate_risk = count_risk_computations(manager, separate_calls, features)
+        combined_risk = count_risk_computations(manager, combined_call, features)
+        
+        separate = time_per_call(manager, separate_calls, features)
+        combined = time_per_call(manager, combined_call, features)
+    
+    print(f"Iterations per path:           {ITERATIONS}")
+    print(f"Risk computations per request: separate={separate_risk}  assess_soil={combined_risk}")
+    print(f"Time per request:              separate={separate * 1e6:.1f} µs  assess_soil={combined * 1e6:.1f} µs")
+    print(f"Saved per request:             {(separate - combined) * 1e6:.1f} µs ({(1 - combined / separate) * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
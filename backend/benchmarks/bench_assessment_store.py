@@ -0,0 +1,94 @@
+"""
+Benchmark: assessment history store
+
+1. /api/predict/soil-health latency with the store disabled vs enabled
+   (recording only queues the result, so the difference should be noise)
+2. Background write throughput for a burst of records
+3. Per-field time-series query latency on a large table
+
+Run from the backend directory:
+    python benchmarks/bench_assessment_store.py
+"""
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.assessment_store import AssessmentStore
+from utils.soil_synth import generate_location_based_soil_data
+
+REQUESTS = 2000
+BURST = 100000
+FIELDS = 2000
+
+
+def soil_samples(count, seed=0):
+    rng = random.Random(seed)
+    return [generate_location_based_soil_data(rng.uniform(8, 35), rng.uniform(68, 97), month=6)
+            for _ in range(count)]
+
+
+def endpoint_latency(client, samples):
+    latencies = []
+    for sample in samples:
+        start = time.perf_counter()
+        client.post('/api/predict/soil-health', json=sample)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['ASSESSMENT_DB_PATH'] = os.path.join(tmp, 'endpoint.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as app_module
+        client = app_module.app.test_client()
+        samples = soil_samples(200)
+        requests = [samples[i % len(samples)] for i in range(REQUESTS)]
+
+        print(f"/api/predict/soil-health, {REQUESTS} requests")
+        endpoint_latency(client, requests[:200])  # warm up
+        for enabled in (False, True, False, True):
+            app_module.Config.ASSESSMENT_STORE_ENABLED = enabled
+            p50, p99 = endpoint_latency(client, requests)
+            print(f"  store {'on ' if enabled else 'off'}: p50 {p50:7.1f} us  p99 {p99:7.1f} us")
+        app_module.assessment_store.flush()
+        print(f"  rows written: {app_module.assessment_store.stats()['written']}")
+
+        # Queue large enough for the whole burst, to measure the writer alone
+        store = AssessmentStore(os.path.join(tmp, 'burst.db'), max_queue=BURST)
+        rng = random.Random(1)
+        assessment = {'health_score': 61.5, 'health_class': 'Good',
+                      'disease_risk': {'risk_class': 'Low', 'probabilities': {'Low': 0.7, 'Medium': 0.2, 'High': 0.1}}}
+        inputs = [dict(sample, field_id=f"field-{rng.randrange(FIELDS)}") for sample in soil_samples(500, seed=2)]
+
+        start = time.perf_counter()
+        for i in range(BURST):
+            store.record('soil-health', inputs[i % len(inputs)], assessment, recorded_at=1.7e9 + i)
+        queued = time.perf_counter() - start
+        store.flush(timeout=120)
+        total = time.perf_counter() - start
+        stats = store.stats()
+        print(f"\nBurst of {BURST} records")
+        print(f"  record() cost:     {queued / BURST * 1e6:6.2f} us per call (request path)")
+        print(f"  write throughput:  {stats['written'] / total:8.0f} rows/sec in {stats['batches']} batches "
+              f"({stats['dropped']} dropped)")
+
+        field = inputs[0]['field_id']
+        store.field_history(field)
+        start = time.perf_counter()
+        for _ in range(200):
+            history = store.field_history(field)
+        per_query = (time.perf_counter() - start) / 200
+        print(f"\nPer-field query on {stats['written']} rows: {per_query * 1000:.2f} ms for {len(history)} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Benchmark: crop inference backends (utils/crop_backends.py)
+
+Converts the crop model to TFLite (float32, float16 and int8) and reports,
+against the float32 Keras model on a held-out image set:
+1. Accuracy drift: top-1 agreement, how often the Keras top-1 stays in the
+   top 5, mean and max absolute change of the class probabilities, and
+   accuracy when the images are labelled (PlantVillage class subfolders)
+2. Latency per image at batch 1 and at --batch-size for each --threads
+   setting, each in a fresh process
+3. File size, and load time and peak RSS of a fresh process that loads the
+   backend and predicts once (the TFLite backend needs no TensorFlow when
+   LiteRT or tflite-runtime is installed)
+
+Without Config.CROP_MODEL_H5 (or --model) a small stand-in model is used: a
+five-layer CNN (38 classes) trained for a few epochs on synthetic leaf-like
+images. Its held-out and calibration images come from the same
+generator, so drift numbers are indicative only; rerun with the real model
+and real held-out photos before switching backends.
+
+Needs TensorFlow (see requirements.txt). Run from the backend directory:
+    python benchmarks/bench_crop_backends.py
+    python benchmarks/bench_crop_backends.py --model models/best_finetuned_model.h5 \\
+        --images heldout/ --calibration models/calibration/
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+
+from config import Config
+from utils.crop_backends import TFLITE_QUANTIZATIONS, convert_to_tflite, load_crop_backend, tflite_path_for
+from utils.model_loader import CROP_CLASS_NAMES
+from utils.preprocessor import load_image_pixels, normalize_image
+
+NUM_CLASSES = len(CROP_CLASS_NAMES)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def synthetic_images(count, seed):
+    """
+    Leaf-like 224x224 images of 38 classes: each class has its own background
+    and blob layout, jittered per image in position, size, brightness and noise
+    Returns: (pixels uint8 (N, 224, 224, 3), labels)
+    """
+    width, height = Config.IMAGE_SIZE
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    templates = []
+    for label in range(NUM_CLASSES):
+        rng = np.random.default_rng(1000 + label)
+        templates.append((rng.uniform(30, 200, 3), rng.uniform(0.2, 0.8, (4, 2)), rng.uniform(15, 50, 4),
+                          rng.uniform(-90, 90, (4, 3))))
+
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, NUM_CLASSES, count)
+    pixels = np.empty((count, height, width, 3), dtype=np.uint8)
+    for i, label in enumerate(labels):
+        background, centres, radii, colours = templates[label]
+        image = np.empty((height, width, 3), dtype=np.float32)
+        image[:] = background
+        shift = rng.uniform(-0.08, 0.08, 2)
+        for (cx, cy), radius, colour in zip(centres, radii, colours):
+            cx, cy = (cx + shift[0]) * width, (cy + shift[1]) * height
+            radius *= rng.uniform(0.85, 1.15)
+            image += np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * radius ** 2))[..., None] * colour
+        image = image * rng.uniform(0.85, 1.15) + rng.normal(0, 6, image.shape)
+        pixels[i] = np.clip(image, 0, 255).astype(np.uint8)
+    return pixels, labels
+
+
+def build_stand_in(path, epochs):
+    """Train the stand-in model on synthetic images and save it as .h5"""
+    import tensorflow as tf
+
+    train_pixels, train_labels = synthetic_images(NUM_CLASSES * 30, seed=1)
+    width, height = Config.IMAGE_SIZE
+    layers = [tf.keras.Input((height, width, 3))]
+    for filters in (32, 64, 128, 256):
+        layers.append(tf.keras.layers.Conv2D(filters, 3, strides=2, padding='same', activation='relu'))
+    layers += [tf.keras.layers.GlobalAveragePooling2D(), tf.keras.layers.Dense(NUM_CLASSES, activation='softmax')]
+    model = tf.keras.Sequential(layers)
+    model.compile(optimizer=tf.keras.optimizers.Adam(2e-3), loss='sparse_categorical_crossentropy',
+                  metrics=['accuracy'])
+    start = time.perf_counter()
+    model.fit(normalize_image(train_pixels), train_labels, batch_size=32, epochs=epochs, verbose=0)
+    model.save(path)
+    print(f"Stand-in CNN trained for {epochs} epochs on {len(train_labels)} synthetic images "
+          f"in {time.perf_counter() - start:.0f} s")
+    return normalize_image(train_pixels[:Config.CROP_CALIBRATION_IMAGES])
+
+
+def load_held_out(directory, limit):
+    """Preprocessed images of a folder; labels from PlantVillage class subfolder names (or None)"""
+    paths = []
+    for folder, _, files in os.walk(directory):
+        paths.extend(os.path.join(folder, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+    paths = sorted(paths)[:limit]
+    if not paths:
+        sys.exit(f"No images found in {directory}")
+    images = normalize_image(np.stack([load_image_pixels(path) for path in paths]))
+    folders = [os.path.basename(os.path.dirname(path)) for path in paths]
+    labels = np.array([CROP_CLASS_NAMES.index(name) for name in folders]) if all(
+        name in CROP_CLASS_NAMES for name in folders) else None
+    return images, labels
+
+
+def predict_all(backend, images, batch_size):
+    return np.concatenate([backend.predict(images[i:i + batch_size]) for i in range(0, len(images), batch_size)])
+
+
+def drift_report(reference, scores, labels):
+    top5 = np.argsort(-scores, axis=1)[:, :5]
+    reference_top1 = reference.argmax(axis=1)
+    change = np.abs(scores - reference)
+    report = {
+        'top1_agreement': float((scores.argmax(axis=1) == reference_top1).mean()),
+        'in_top5': float((top5 == reference_top1[:, None]).any(axis=1).mean()),
+        'mean_abs_change': float(change.mean()),
+        'max_abs_change': float(change.max())
+    }
+    if labels is not None:
+        report['accuracy'] = float((scores.argmax(axis=1) == labels).mean())
+    return report
+
+
+def peak_rss_mb():
+    # VmHWM, not ru_maxrss: the latter survives exec and would report the parent's peak
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(backend, keras_path, tflite_path, threads, images_path, batch_size, repeats):
+    """Runs in a fresh process: load time, peak RSS and latency of one backend"""
+    images = np.load(images_path, mmap_mode='r')  # Only the images used count towards RSS
+    start = time.perf_counter()
+    model = load_crop_backend(backend, keras_path=keras_path, tflite_path=tflite_path, threads=threads)
+    model.predict(images[:1])
+    load_seconds = time.perf_counter() - start
+    rss_mb = peak_rss_mb()
+
+    def per_image_ms(size):
+        batches = [images[i:i + size] for i in range(0, len(images) - size + 1, size)][:repeats]
+        model.predict(batches[0])
+        samples = []
+        for batch in batches:
+            start = time.perf_counter()
+            model.predict(batch)
+            samples.append((time.perf_counter() - start) * 1000 / size)
+        return statistics.median(samples)
+
+    print(json.dumps({
+        'load_s': load_seconds,
+        'rss_mb': rss_mb,
+        'tensorflow_loaded': 'tensorflow' in sys.modules,
+        'batch1_ms': per_image_ms(1),
+        'batch_ms': per_image_ms(batch_size)
+    }))
+
+
+def measure_in_subprocess(backend, keras_path, tflite_path, threads, images_path, args):
+    command = [sys.executable, os.path.abspath(__file__), '--measure', backend, '--model', keras_path,
+               '--tflite', tflite_path or '', '--threads', str(threads), '--images-npy', images_path,
+               '--batch-size', str(args.batch_size), '--repeats', str(args.repeats)]
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+    output = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', help='Keras .h5 crop model (default: Config.CROP_MODEL_H5, or a stand-in)')
+    parser.add_argument('--images', help='held-out image folder (default: synthetic images)')
+    parser.add_argument('--calibration', help='int8 calibration image folder (default: Config.CROP_CALIBRATION_DIR)')
+    parser.add_argument('--count', type=int, default=300, help='held-out images to use')
+    parser.add_argument('--threads', default=','.join(map(str, sorted({1, os.cpu_count() or 1}))),
+                        help='comma-separated intra-op thread counts to time')
+    parser.add_argument('--batch-size', type=int, default=Config.CROP_BATCH_MAX_SIZE)
+    parser.add_argument('--repeats', type=int, default=30, help='timed calls per batch size')
+    parser.add_argument('--epochs', type=int, default=8, help='stand-in training epochs')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    parser.add_argument('--tflite', help=argparse.SUPPRESS)
+    parser.add_argument('--images-npy', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.model, args.tflite or None, int(args.threads), args.images_npy,
+                args.batch_size, args.repeats)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='crop-backends-')
+    keras_path = args.model or Config.CROP_MODEL_H5
+    calibration = None
+    if not os.path.exists(keras_path):
+        keras_path = os.path.join(workdir, 'stand_in.h5')
+        calibration = build_stand_in(keras_path, args.epochs)
+    if args.calibration:
+        calibration = normalize_image(np.stack([load_image_pixels(os.path.join(folder, name))
+                                                for folder, _, files in os.walk(args.calibration)
+                                                for name in sorted(files) if name.lower().endswith(IMAGE_EXTENSIONS)]))
+    elif calibration is None and not os.path.isdir(Config.CROP_CALIBRATION_DIR):
+        print(f"No calibration images in {Config.CROP_CALIBRATION_DIR}; int8 is calibrated on synthetic images")
+        calibration = normalize_image(synthetic_images(Config.CROP_CALIBRATION_IMAGES, seed=1)[0])
+
+    if args.images:
+        images, labels = load_held_out(args.images, args.count)
+    else:
+        pixels, labels = synthetic_images(args.count, seed=2)
+        images = normalize_image(pixels)
+    images_path = os.path.join(workdir, 'held_out.npy')
+    np.save(images_path, images)
+
+    variants = [('keras', 'float32', None)]
+    for quantization in TFLITE_QUANTIZATIONS:
+        tflite_path = tflite_path_for(os.path.join(workdir, os.path.basename(keras_path)), quantization)
+        start = time.perf_counter()
+        convert_to_tflite(keras_path, tflite_path, quantization, calibration)
+        print(f"Converted to TFLite {quantization} in {time.perf_counter() - start:.1f} s")
+        variants.append(('tflite', 'float32' if quantization == 'none' else quantization, tflite_path))
+
+    reference = None
+    print(f"\nDrift against the Keras float32 model on {len(images)} held-out images"
+          f"{'' if labels is not None else ' (unlabelled)'}")
+    print(f"  {'backend':<16}{'size MB':>9}{'top-1 agree':>13}{'in top-5':>10}{'mean |dp|':>11}"
+          f"{'max |dp|':>10}{'accuracy':>10}")
+    for backend, precision, tflite_path in variants:
+        model = load_crop_backend(backend, keras_path=keras_path, tflite_path=tflite_path, threads=0)
+        scores = predict_all(model, images, args.batch_size)
+        reference = scores if reference is None else reference
+        report = drift_report(reference, scores, labels)
+        accuracy = f"{report['accuracy']:.3f}" if 'accuracy' in report else '-'
+        print(f"  {backend + ' ' + precision:<16}{model.size_bytes / 1e6:>9.2f}{report['top1_agreement']:>13.3f}"
+              f"{report['in_top5']:>10.3f}{report['mean_abs_change']:>11.5f}{report['max_abs_change']:>10.4f}"
+              f"{accuracy:>10}")
+
+    print(f"\nLatency per image (median of {args.repeats} calls), fresh process per row")
+    print(f"  {'backend':<16}{'threads':>8}{'batch 1 ms':>12}{f'batch {args.batch_size} ms':>13}"
+          f"{'load s':>8}{'peak RSS MB':>13}{'TensorFlow':>12}")
+    for backend, precision, tflite_path in variants:
+        for threads in (int(value) for value in args.threads.split(',')):
+            result = measure_in_subprocess(backend, keras_path, tflite_path, threads, images_path, args)
+            print(f"  {backend + ' ' + precision:<16}{threads:>8}{result['batch1_ms']:>12.2f}"
+                  f"{result['batch_ms']:>13.2f}{result['load_s']:>8.2f}{result['rss_mb']:>13.0f}"
+                  f"{'loaded' if result['tensorflow_loaded'] else 'no':>12}")
+
+
+if __name__ == '__main__':
+    main()
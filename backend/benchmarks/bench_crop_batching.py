@@ -0,0 +1,94 @@
+"""
+Benchmark: crop disease micro-batching with a small stand-in model
+
+The stand-in model has a fixed per-call cost plus a smaller per-image cost,
+like a CNN forward pass on CPU. Concurrent clients submit single images with
+and without the MicroBatcher in front of it.
+
+Run from the backend directory:
+    python benchmarks/bench_crop_batching.py
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config import Config
+from utils.batching import MicroBatcher
+
+CLIENTS = 16
+REQUESTS_PER_CLIENT = 25
+NUM_CLASSES = 38
+
+
+class StandInCropModel:
+    """Tiny 'CNN': global average pool + dense layer, with per-call overhead"""
+
+    CALL_OVERHEAD_S = 0.008
+    PER_IMAGE_S = 0.001
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        self.weights = rng.normal(size=(3, NUM_CLASSES)).astype(np.float32)
+        self.lock = threading.Lock()  # one forward pass at a time, like a CPU-bound model
+        self.calls = 0
+
+    def predict(self, images):
+        with self.lock:
+            self.calls += 1
+            time.sleep(self.CALL_OVERHEAD_S + self.PER_IMAGE_S * len(images))
+            logits = images.mean(axis=(1, 2)) @ self.weights
+            probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs /= probs.sum(axis=1, keepdims=True)
+            return [int(row.argmax()) for row in probs]
+
+
+def run_clients(predict_one, images):
+    def client(offset):
+        for i in range(REQUESTS_PER_CLIENT):
+            predict_one(images[(offset + i) % len(images)])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        list(pool.map(client, range(CLIENTS)))
+    return time.perf_counter() - start
+
+
+def main():
+    rng = np.random.default_rng(1)
+    images = rng.random((32, 1, *Config.IMAGE_SIZE, 3), dtype=np.float32)
+    total = CLIENTS * REQUESTS_PER_CLIENT
+
+    # Unbatched: one forward pass per request
+    model = StandInCropModel()
+    unbatched = run_clients(lambda image: model.predict(image)[0], images)
+    unbatched_calls = model.calls
+
+    # Batched: requests share forward passes
+    model = StandInCropModel()
+    batcher = MicroBatcher(model.predict, Config.CROP_BATCH_MAX_SIZE, Config.CROP_BATCH_MAX_WAIT_MS)
+    batched = run_clients(batcher.predict, images)
+    stats = batcher.stats()
+
+    # Batched results must match unbatched ones
+    reference = StandInCropModel()
+    for image in images[:8]:
+        assert batcher.predict(image) == reference.predict(image)[0]
+
+    print(f"Clients: {CLIENTS}, requests: {total}, "
+          f"max batch {Config.CROP_BATCH_MAX_SIZE}, max wait {Config.CROP_BATCH_MAX_WAIT_MS} ms")
+    print(f"Unbatched: {total / unbatched:8.1f} req/s  ({unbatched_calls} forward passes)")
+    print(f"Batched:   {total / batched:8.1f} req/s  ({stats['batches']} forward passes, "
+          f"mean batch {stats['mean_batch_size']})")
+    print("Batch-size distribution:")
+    for size, count in stats['batch_sizes'].items():
+        print(f"  {size:>3}: {count:5d} {'#' * min(60, count)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: per-request allocation of crop predictions by output mode
+
+Compares the default response (class and confidence only), top-k pairs and
+the full 38-class distribution, measuring time per prediction and the peak
+Python allocation per prediction with tracemalloc.
+
+Run from the backend directory:
+    python benchmarks/bench_crop_topk.py
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config import Config
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from utils.model_loader import ModelManager
+
+IMAGES = 64
+TIMED_ROUNDS = 20
+MODES = {
+    'default': {},
+    'top_k=3': {'top_k': 3},
+    'top_k=5': {'top_k': 5},
+    'full_distribution': {'full_distribution': True}
+}
+
+
+def peak_allocation(manager, images, options):
+    """Mean peak bytes allocated while building one prediction"""
+    peaks = []
+    for image in images:
+        tracemalloc.start()
+        manager.predict_crop_disease(image, **options)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def retained_size(manager, images, options):
+    """Mean bytes still held by the returned prediction dicts"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [manager.predict_crop_disease(image, **options) for image in images]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / len(images)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    images = rng.random((IMAGES, 1, *Config.IMAGE_SIZE, 3), dtype=np.float32)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = ModelManager()
+        manager.warmup()
+
+    # Top-k pairs must agree with the full distribution
+    for image in images[:8]:
+        full = manager.predict_crop_disease(image, top_k=5, full_distribution=True)
+        expected = sorted(full['all_probabilities'], reverse=True)[:5]
+        assert [probability for _, probability in full['top_k']] == expected
+
+    print(f"{IMAGES} images, {TIMED_ROUNDS} timed rounds")
+    print(f"{'mode':<18} | {'us/pred':>8} {'peak KB/pred':>12} {'kept B/pred':>11}")
+    kept_by_mode = {}
+    for name, options in MODES.items():
+        start = time.perf_counter()
+        for _ in range(TIMED_ROUNDS):
+            for image in images:
+                manager.predict_crop_disease(image, **options)
+        per_call_us = (time.perf_counter() - start) / (TIMED_ROUNDS * IMAGES) * 1e6
+
+        peak = peak_allocation(manager, images, options)
+        kept = retained_size(manager, images, options)
+        kept_by_mode[name] = kept
+        print(f"{name:<18} | {per_call_us:8.1f} {peak / 1024:12.2f} {kept:11.0f}")
+
+    # Before top-k mode every prediction carried the full distribution
+    full = kept_by_mode['full_distribution']
+    print("Saved per response vs always building the full distribution:")
+    for name in ('default', 'top_k=3', 'top_k=5'):
+        print(f"  {name:<8} {full - kept_by_mode[name]:6.0f} B ({1 - kept_by_mode[name] / full:.0%})")
+
+
+if __name__ == '__main__':
+    main()
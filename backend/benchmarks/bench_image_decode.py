@@ -0,0 +1,127 @@
+"""
+Benchmark: draft-mode uint8 image decode vs. the original full-resolution decode
+
+Generates large JPEG "phone photos" and measures per-image latency and peak
+resident memory for both paths. Each measurement runs in a fresh process so
+peak RSS is not shared between paths.
+
+Run from the backend directory:
+    python benchmarks/bench_image_decode.py
+"""
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+from PIL import Image
+
+from config import Config
+from utils.preprocessor import preprocess_image
+
+# (width, height) of the generated sample photos
+RESOLUTIONS = [(2048, 1536), (4032, 3024), (6000, 4000)]
+ITERATIONS = 10
+
+
+def legacy_preprocess_image(image_file):
+    """The original preprocess_image: full decode, float32 up front"""
+    image_bytes = image_file.read()
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image = image.resize(Config.IMAGE_SIZE)
+    img_array = np.array(image, dtype=np.float32) / 255.0
+    return np.expand_dims(img_array, axis=0)
+
+
+PATHS = {
+    'legacy': legacy_preprocess_image,
+    'draft': preprocess_image
+}
+
+
+def make_photo(path, size):
+    """Smooth gradients plus noise - compresses roughly like a real leaf photo"""
+    width, height = size
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[..., 0] = (120 * x + 60 * y + 40).astype(np.uint8)
+    pixels[..., 1] = (80 + 100 * np.sin(6 * x) * np.cos(4 * y) + 60).astype(np.uint8)
+    pixels[..., 2] = (50 * y + 30).astype(np.uint8)
+    pixels = np.clip(pixels + rng.integers(-12, 12, pixels.shape), 0, 255).astype(np.uint8)
+    Image.fromarray(pixels).save(path, 'JPEG', quality=90)
+
+
+def peak_rss_kb():
+    """
+    Peak RSS of this process image
+    VmHWM is reset on exec; ru_maxrss can carry over the parent's peak
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(path_name, photo):
+    """Runs in a child process: latency samples and peak RSS growth"""
+    with open(photo, 'rb') as f:
+        data = f.read()
+    fn = PATHS[path_name]
+    baseline_kb = peak_rss_kb()
+
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        fn(io.BytesIO(data))
+        timings.append(time.perf_counter() - start)
+
+    peak_kb = peak_rss_kb()
+    print(json.dumps({
+        'median_ms': statistics.median(timings) * 1000,
+        'peak_mb': (peak_kb - baseline_kb) / 1024
+    }))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'photo':>12} {'MP':>5} | {'legacy ms':>9} {'draft ms':>9} {'speedup':>7} | {'legacy MB':>9} {'draft MB':>9}")
+        for size in RESOLUTIONS:
+            photo = os.path.join(tmp, f'{size[0]}x{size[1]}.jpg')
+            make_photo(photo, size)
+
+            results = {}
+            for path_name in PATHS:
+                output = subprocess.run(
+                    [sys.executable, __file__, '--measure', path_name, photo],
+                    capture_output=True, text=True, check=True, cwd=BACKEND_DIR
+                ).stdout
+                results[path_name] = json.loads(output.strip().splitlines()[-1])
+
+            legacy, draft = results['legacy'], results['draft']
+            print(f"{size[0]:>5}x{size[1]:<6} {size[0] * size[1] / 1e6:>5.1f} | "
+                  f"{legacy['median_ms']:>9.1f} {draft['median_ms']:>9.1f} "
+                  f"{legacy['median_ms'] / draft['median_ms']:>6.1f}x | "
+                  f"{legacy['peak_mb']:>9.1f} {draft['peak_mb']:>9.1f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--measure':
+        measure(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,172 @@
+"""
+Benchmark: near-duplicate photo index (utils/near_duplicates.py)
+
+1. dHash distances of re-shot variants of the same synthetic leaf photo
+   (tighter/looser crop, exposure, JPEG re-encode) against unrelated photos,
+   computed from the same 224x224 pixels preprocess_image produces
+2. Lookup time and hit rate as the index grows to 1M entries, against a
+   brute-force Hamming scan over the same hashes
+3. Hit rate and wrong-leaf matches per max distance on upload streams
+   where every leaf is photographed 3 times
+
+Run from the backend directory:
+    python benchmarks/bench_near_duplicates.py
+"""
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from config import Config
+from utils.near_duplicates import NearDuplicateIndex, _popcount, dhash
+from utils.preprocessor import load_image_pixels
+
+PHOTOS = 40
+LOOKUPS = 2000
+STREAM_SEEDS = (2, 3, 4, 5)
+
+
+def synthetic_photo(rng, size=(1200, 900)):
+    """Smooth blotchy image: a few dozen coloured blobs on a random background"""
+    width, height = size
+    y, x = np.mgrid[0:height:4, 0:width:4].astype(np.float32)
+    image = np.empty(x.shape + (3,), dtype=np.float32)
+    image[:] = rng.uniform(40, 200, 3)
+    for _ in range(30):
+        cx, cy, radius = rng.uniform(0, width), rng.uniform(0, height), rng.uniform(40, 300)
+        weight = np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * radius ** 2))[..., None]
+        image += weight * rng.uniform(-80, 80, 3)
+    small = Image.fromarray(np.clip(image, 0, 255).astype(np.uint8))
+    return small.resize(size, Image.BILINEAR)
+
+
+def pixels_of(image, quality=92):
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    buffer.seek(0)
+    return load_image_pixels(buffer)
+
+
+def variants(image):
+    width, height = image.size
+    return {
+        'crop 5%': image.crop((width // 20, height // 20, width - width // 20, height - height // 20)),
+        'crop 10% one side': image.crop((width // 10, 0, width, height)),
+        'exposure +20%': ImageEnhance.Brightness(image).enhance(1.2),
+        'exposure -20%': ImageEnhance.Brightness(image).enhance(0.8),
+        'contrast +20%': ImageEnhance.Contrast(image).enhance(1.2),
+        'JPEG q=60': image,
+        'crop 5% + exposure': ImageEnhance.Brightness(image.crop((width // 20, 0, width, height))).enhance(1.15)
+    }
+
+
+def hash_distances():
+    rng = np.random.default_rng(0)
+    photos = [synthetic_photo(rng) for _ in range(PHOTOS)]
+    hashes = [dhash(pixels_of(photo)) for photo in photos]
+
+    print(f"dHash distance (of 64 bits) to the original, {PHOTOS} photos "
+          f"(match threshold {Config.NEAR_DUPLICATE_MAX_DISTANCE})")
+    print(f"  {'variant':<22}{'median':>8}{'p90':>6}{'max':>6}{'matched':>10}")
+    for name in variants(photos[0]):
+        distances = []
+        for photo, original in zip(photos, hashes):
+            quality = 60 if name == 'JPEG q=60' else 92
+            distances.append(bin(dhash(pixels_of(variants(photo)[name], quality)) ^ original).count('1'))
+        matched = sum(d <= Config.NEAR_DUPLICATE_MAX_DISTANCE for d in distances)
+        print(f"  {name:<22}{statistics.median(distances):>8.0f}{np.percentile(distances, 90):>6.0f}"
+              f"{max(distances):>6}{matched:>7}/{PHOTOS}")
+
+    unrelated = [bin(a ^ b).count('1') for i, a in enumerate(hashes) for b in hashes[i + 1:]]
+    false = sum(d <= Config.NEAR_DUPLICATE_MAX_DISTANCE for d in unrelated)
+    print(f"  {'unrelated pairs':<22}{statistics.median(unrelated):>8.0f}{np.percentile(unrelated, 10):>6.0f}"
+          f"{min(unrelated):>6}{false:>7}/{len(unrelated)}  (p10 and min shown)\n")
+
+
+def index_scaling():
+    rng = np.random.default_rng(1)
+    print(f"Lookups at distance {Config.NEAR_DUPLICATE_MAX_DISTANCE}, {LOOKUPS} queries per size "
+          f"(half are stored hashes with up to {Config.NEAR_DUPLICATE_MAX_DISTANCE} bits flipped)")
+    print(f"  {'entries':>9}{'build s':>9}{'index us':>10}{'brute us':>10}{'hit rate':>10}{'agree':>7}")
+    for size in (10000, 100000, 1000000):
+        hashes = rng.integers(0, 2 ** 63, size, dtype=np.uint64) * np.uint64(2) + rng.integers(0, 2, size, dtype=np.uint64)
+        index = NearDuplicateIndex(max_distance=Config.NEAR_DUPLICATE_MAX_DISTANCE, max_entries=size)
+        start = time.perf_counter()
+        for i, value in enumerate(hashes.tolist()):
+            index.add(value, i)
+        build = time.perf_counter() - start
+
+        near = hashes[rng.integers(0, size, LOOKUPS // 2)]
+        for _ in range(Config.NEAR_DUPLICATE_MAX_DISTANCE):
+            flip = rng.integers(0, 64, LOOKUPS // 2)
+            near = np.where(rng.random(LOOKUPS // 2) < 0.5, near ^ (np.uint64(1) << flip.astype(np.uint64)), near)
+        queries = np.concatenate([near, rng.integers(0, 2 ** 63, LOOKUPS // 2, dtype=np.uint64)]).tolist()
+
+        start = time.perf_counter()
+        found = [index.lookup(query) for query in queries]
+        index_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        sample = queries[::20]
+        start = time.perf_counter()
+        brute = [int(_popcount(hashes ^ np.uint64(query)).min()) for query in sample]
+        brute_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+        agree = all((match is not None) == (distance <= Config.NEAR_DUPLICATE_MAX_DISTANCE)
+                    and (match is None or match[1] == distance)
+                    for match, distance in zip(found[::20], brute))
+        hit_rate = sum(match is not None for match in found) / len(found)
+        print(f"  {size:>9,}{build:>9.2f}{index_us:>10.1f}{brute_us:>10.1f}{hit_rate:>10.2f}{'yes' if agree else 'NO':>7}")
+    print()
+
+
+def reshoot_stream(seed):
+    """(leaf, dhash) of 100 leaves x 3 shots (random crop and exposure), shuffled"""
+    rng = np.random.default_rng(seed)
+    uploads = []
+    for leaf in range(100):
+        photo = synthetic_photo(rng)
+        width, height = photo.size
+        for shot in range(3):
+            margin = int(rng.integers(0, width // 25 + 1))
+            shifted = photo.crop((margin, margin, width - margin, height - margin))
+            uploads.append((leaf, ImageEnhance.Brightness(shifted).enhance(rng.uniform(0.85, 1.15))))
+    rng.shuffle(uploads)
+    return [(leaf, dhash(pixels_of(image))) for leaf, image in uploads]
+
+
+def reshoot_streams():
+    streams = [reshoot_stream(seed) for seed in STREAM_SEEDS]
+    print(f"Re-shot streams: {len(streams)} x 300 uploads of 100 leaves (3 shots each); "
+          f"best possible hit rate {200 / 300:.2f}")
+    print(f"  {'distance':>8}{'hit rate':>10}{'wrong leaf':>12}")
+    for max_distance in range(0, 9):
+        lookups = hits = wrong = 0
+        for hashes in streams:
+            index = NearDuplicateIndex(max_distance=max_distance)
+            for leaf, image_hash in hashes:
+                match = index.lookup(image_hash)
+                if match is None:
+                    index.add(image_hash, leaf)
+                else:
+                    wrong += match[0] != leaf
+            stats = index.stats()
+            lookups += stats['lookups']
+            hits += stats['hits']
+        marker = '  <- Config.NEAR_DUPLICATE_MAX_DISTANCE' if max_distance == Config.NEAR_DUPLICATE_MAX_DISTANCE else ''
+        print(f"  {max_distance:>8}{hits / lookups:>10.2f}{wrong:>12}{marker}")
+
+
+def main():
+    hash_distances()
+    index_scaling()
+    reshoot_streams()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark: soil endpoint CPU path with a DataFrame vs. a SoilSample
+
+Run from the backend directory:
+    python benchmarks/bench_soil_prepare.py
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.model_loader import ModelManager
+from utils.preprocessor import prepare_soil_data, prepare_soil_sample
+
+SAMPLE = {
+    'temperature': 27.5, 'humidity': 68.0, 'moisture': 62.0, 'soil_type': 'Clayey',
+    'nitrogen': 210.0, 'phosphorous': 32.0, 'potassium': 190.0, 'ph': 6.4,
+    'ec': 1.4, 'organic_carbon': 1.8, 'pathogen_presence': 0,
+    'salinity_class': 'Normal', 'latitude': 18.52, 'longitude': 73.85
+}
+ITERATIONS = 5000
+
+
+def time_per_call(fn):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = ModelManager()
+        
+        prepare_frame = time_per_call(lambda: prepare_soil_data(SAMPLE))
+        prepare_sample = time_per_call(lambda: prepare_soil_sample(SAMPLE))
+        frame_path = time_per_call(lambda: manager.assess_soil(prepare_soil_data(SAMPLE)))
+        sample_path = time_per_call(lambda: manager.assess_soil(prepare_soil_sample(SAMPLE)))
+    
+    print(f"Iterations per path:        {ITERATIONS}")
+    print(f"Prepare only:               DataFrame={prepare_frame * 1e6:.1f} µs  SoilSample={prepare_sample * 1e6:.1f} µs")
+    print(f"Prepare + assess_soil:      DataFrame={frame_path * 1e6:.1f} µs  SoilSample={sample_path * 1e6:.1f} µs")
+    print(f"Speedup (prepare + assess): {frame_path / sample_path:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
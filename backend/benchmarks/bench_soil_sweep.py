@@ -0,0 +1,102 @@
+"""
+Benchmark: what-if sweeps (/api/predict/soil-health/sweep)
+
+1. A 100x100 pH x moisture grid through the endpoint (one vectorized pass)
+   against the same grid as individual /api/predict/soil-health calls
+   (timed on a sample of the calls and extrapolated)
+2. Agreement of the sweep surface with model_manager.assess_soil per point
+3. Larger grids up to Config.SOIL_SWEEP_MAX_POINTS
+
+Run from the backend directory:
+    python benchmarks/bench_soil_sweep.py
+"""
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('ASSESSMENT_STORE_ENABLED', '0')
+
+BASE_SAMPLE = {
+    'temperature': 28.0, 'humidity': 65.0, 'moisture': 45.0, 'soil_type': 'Black',
+    'nitrogen': 160.0, 'phosphorous': 18.0, 'potassium': 210.0, 'ph': 8.1, 'ec': 1.2,
+    'organic_carbon': 0.45, 'salinity_class': 'Slightly Saline', 'pathogen_presence': 0,
+    'latitude': 18.52, 'longitude': 73.86
+}
+SINGLE_CALLS = 500
+
+
+def timed(fn, repeats=20):
+    fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as app_module
+    from utils.preprocessor import prepare_soil_sample
+    client = app_module.app.test_client()
+
+    request_body = {
+        'sample': BASE_SAMPLE,
+        'parameters': [
+            {'name': 'ph', 'min': 5.0, 'max': 9.0, 'steps': 100},
+            {'name': 'moisture', 'min': 10.0, 'max': 80.0, 'steps': 100}
+        ],
+        'target': {'risk_class': 'Low'}
+    }
+    response = client.post('/api/predict/soil-health/sweep', json=request_body)
+    sweep = response.get_json()['data']
+    sweep_ms = timed(lambda: client.post('/api/predict/soil-health/sweep', json=request_body))
+    print(f"100x100 sweep: {sweep_ms:.1f} ms, {len(response.data) / 1024:.0f} KB response")
+
+    ph_values, moisture_values = (axis['values'] for axis in sweep['axes'])
+    grid = [(i, j) for i in range(len(ph_values)) for j in range(len(moisture_values))]
+    rng = random.Random(0)
+    sampled = rng.sample(grid, SINGLE_CALLS)
+
+    start = time.perf_counter()
+    mismatches = 0
+    for i, j in sampled:
+        sample = dict(BASE_SAMPLE, ph=ph_values[i], moisture=moisture_values[j])
+        single = client.post('/api/predict/soil-health', json=sample).get_json()['data']
+        mismatches += single['soil_health']['score'] != sweep['health_scores'][i][j]
+        assessment = app_module.model_manager.assess_soil(prepare_soil_sample(sample))
+        mismatches += sweep['risk_classes'][sweep['risk_idx'][i][j]] != assessment['disease_risk']['risk_class']
+    per_call_ms = (time.perf_counter() - start) * 1000 / SINGLE_CALLS
+    print(f"Same grid as single calls: ~{per_call_ms * len(grid):.0f} ms "
+          f"({per_call_ms:.2f} ms x {len(grid)} points, from {SINGLE_CALLS} sampled calls)")
+    print(f"Surface vs single-sample scoring on {SINGLE_CALLS} points: "
+          f"{'match' if not mismatches else f'{mismatches} mismatches'}")
+    print(f"Cheapest change to Low risk: {sweep['cheapest_change']}")
+
+    print("\nLarger grids")
+    for steps in ((200, 200), (60, 60, 60), (200, 1000)):
+        body = {
+            'sample': BASE_SAMPLE,
+            'parameters': [
+                {'name': name, 'min': low, 'max': high, 'steps': count}
+                for (name, low, high), count in zip(
+                    (('ph', 5.0, 9.0), ('moisture', 10.0, 80.0), ('nitrogen', 50.0, 350.0)), steps
+                )
+            ]
+        }
+        status = client.post('/api/predict/soil-health/sweep', json=body).status_code
+        if status != 200:
+            print(f"  {'x'.join(map(str, steps)):<10} rejected ({status})")
+            continue
+        print(f"  {'x'.join(map(str, steps)):<10} {timed(lambda: client.post('/api/predict/soil-health/sweep', json=body), 5):8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
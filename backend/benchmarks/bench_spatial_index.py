@@ -0,0 +1,122 @@
+"""
+Benchmark: spatial index and /api/map/aggregate
+
+1. Aggregation latency over POINTS scored samples for viewports from the
+   whole country down to a district, at the matching map zoom
+2. The same through the endpoint (Flask test client, JSON included)
+3. Agreement of the per-cell mean, percentiles and risk counts with a
+   direct numpy computation
+
+Run from the backend directory:
+    python benchmarks/bench_spatial_index.py
+"""
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.spatial_index import SCORE_BIN_WIDTH, SpatialIndex, cell_degrees_for_zoom
+
+POINTS = 1_000_000
+REPEATS = 50
+
+# (name, south, west, north, east, zoom)
+VIEWPORTS = [
+    ('India', 8.0, 68.0, 35.0, 97.0, 5),
+    ('Maharashtra', 15.6, 72.6, 22.1, 80.9, 7),
+    ('Pune district', 17.9, 73.3, 19.4, 75.2, 9),
+    ('Pune city', 18.42, 73.75, 18.62, 73.98, 12)
+]
+
+
+def synthetic_points(count, seed=0):
+    """Samples clustered around farming regions, with scores correlated to location"""
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform([8, 68], [35, 97], size=(200, 2))
+    which = rng.integers(0, len(centres), count)
+    lat = np.clip(centres[which, 0] + rng.normal(0, 0.8, count), 8, 35)
+    lng = np.clip(centres[which, 1] + rng.normal(0, 0.8, count), 68, 97)
+    health = np.clip(55 + (lat - 20) * 0.8 + rng.normal(0, 10, count), 0, 100)
+    risk = np.where(health >= 60, 0, np.where(health >= 45, 1, 2))
+    return lat, lng, health, risk
+
+
+def time_ms(fn):
+    fn()
+    samples = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95)]
+
+
+def check_against_numpy(index, lat, lng, health, risk):
+    south, west, north, east, zoom = VIEWPORTS[2][1:]
+    cell = cell_degrees_for_zoom(zoom)
+    result = index.aggregate(south, north, west, east, cell)
+    worst_mean = worst_pct = 0.0
+    risk_ok = True
+    for entry in result['cells']:
+        s, w, n, e = entry['bounds']
+        mask = (lat >= s) & (lat < n) & (lng >= w) & (lng < e)
+        expected = health[mask].astype(np.float32)
+        if len(expected) != entry['count']:
+            continue  # boundary rounding; compared on exact cells only
+        worst_mean = max(worst_mean, abs(expected.mean() - entry['mean_health']))
+        for p in (50, 90):
+            # The index reports nearest-rank percentiles (to the bin width)
+            expected_pct = np.percentile(expected, p, method='inverted_cdf')
+            worst_pct = max(worst_pct, abs(expected_pct - entry['percentiles'][f'p{p}']))
+        counts = np.bincount(risk[mask], minlength=3).tolist()
+        risk_ok &= counts == list(entry['risk_counts'].values())
+    print(f"\nCheck on {len(result['cells'])} cells of {VIEWPORTS[2][0]}: "
+          f"max mean error {worst_mean:.3f}, max percentile error {worst_pct:.3f} "
+          f"(bin width {SCORE_BIN_WIDTH}), risk counts {'match' if risk_ok else 'DIFFER'}")
+
+
+def main():
+    lat, lng, health, risk = synthetic_points(POINTS)
+
+    index = SpatialIndex()
+    start = time.perf_counter()
+    for i in range(0, POINTS, 10000):
+        index.add_many(lat[i:i + 10000], lng[i:i + 10000], health[i:i + 10000], risk[i:i + 10000])
+    print(f"Loaded {len(index)} points in {time.perf_counter() - start:.2f} s")
+
+    print(f"\n{'viewport':<16}{'zoom':>5}{'points':>10}{'cells':>7}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, south, west, north, east, zoom in VIEWPORTS:
+        cell = cell_degrees_for_zoom(zoom)
+        result = index.aggregate(south, north, west, east, cell)
+        p50, p95 = time_ms(lambda: index.aggregate(south, north, west, east, cell))
+        print(f"{name:<16}{zoom:>5}{result['points']:>10}{len(result['cells']):>7}{p50:>9.2f}{p95:>9.2f}")
+
+    check_against_numpy(index, lat, lng, health, risk)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['ASSESSMENT_DB_PATH'] = os.path.join(tmp, 'history.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as app_module
+        app_module.Config.ASSESSMENT_STORE_ENABLED = False
+        app_module.spatial_index = index
+        client = app_module.app.test_client()
+
+        print(f"\nGET /api/map/aggregate over {len(index)} points")
+        for name, south, west, north, east, zoom in VIEWPORTS:
+            url = f"/api/map/aggregate?bbox={south},{west},{north},{east}&zoom={zoom}"
+            response = client.get(url)
+            p50, p95 = time_ms(lambda: client.get(url))
+            print(f"  {name:<16} {response.status_code}  {len(response.data) / 1024:7.1f} KB  "
+                  f"p50 {p50:6.2f} ms  p95 {p95:6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Startup-time budget for a soil-only deployment
+
+Starts the app in fresh interpreters with ENABLE_CROP_MODEL=0 and measures
+the import time of app.py and the time until /ready reports ready. A soil
+request is then served to check that neither TensorFlow nor Pillow was
+imported along the way. Exits non-zero if the budget is exceeded.
+
+Run from the backend directory:
+    python benchmarks/bench_startup.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNS = 5
+IMPORT_BUDGET_MS = 1500.0
+READY_BUDGET_MS = 3000.0
+FORBIDDEN_MODULES = ('tensorflow', 'keras', 'PIL')
+REPORTED_MODULES = ('pandas', 'sklearn', 'xgboost', 'tensorflow', 'PIL')
+
+CHILD = r'''
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+    imported = time.perf_counter()
+    client = app.app.test_client()
+    while client.get('/ready').status_code != 200:
+        time.sleep(0.005)
+    ready = time.perf_counter()
+    response = client.post('/api/predict/soil-health', json={
+        'temperature': 26, 'humidity': 60, 'moisture': 45, 'nitrogen': 210,
+        'phosphorous': 30, 'potassium': 180, 'ph': 6.5, 'ec': 1.2, 'organic_carbon': 1.4
+    })
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'ready_ms': (ready - start) * 1000,
+    'soil_status': response.status_code,
+    'modules': [name for name in %r if name in sys.modules]
+}))
+''' % (REPORTED_MODULES,)
+
+
+def main():
+    # Benchmark requests must not land in the real assessment history
+    env = dict(os.environ, ENABLE_CROP_MODEL='0', MODEL_WARMUP='1', ASSESSMENT_STORE_ENABLED='0')
+    runs = []
+    for _ in range(RUNS):
+        output = subprocess.run(
+            [sys.executable, '-c', CHILD], capture_output=True, text=True,
+            check=True, cwd=BACKEND_DIR, env=env
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    ready_ms = statistics.median(run['ready_ms'] for run in runs)
+    modules = sorted({name for run in runs for name in run['modules']})
+    forbidden = [name for name in modules if name in FORBIDDEN_MODULES]
+
+    print(f"Soil-only startup over {RUNS} runs (median)")
+    print(f"  import app:  {import_ms:7.1f} ms  (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    print(f"  /ready:      {ready_ms:7.1f} ms  (budget {READY_BUDGET_MS:.0f} ms)")
+    print(f"  soil request status: {runs[-1]['soil_status']}")
+    print(f"  heavy modules imported: {', '.join(modules) or 'none'}")
+
+    failures = []
+    if import_ms > IMPORT_BUDGET_MS:
+        failures.append('import time over budget')
+    if ready_ms > READY_BUDGET_MS:
+        failures.append('time to ready over budget')
+    if forbidden:
+        failures.append(f"imported {', '.join(forbidden)}")
+    if any(run['soil_status'] != 200 for run in runs):
+        failures.append('soil request failed')
+
+    if failures:
+        print(f"FAIL: {'; '.join(failures)}")
+        sys.exit(1)
+    print("OK: within startup budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Memory report: per-worker RSS/PSS under gunicorn with 1, 4 and 8 workers
+
+Compares three model loading modes using stand-in soil model pickles with
+large numpy weights (the real models are used instead if MODELS_DIR has them
+and --real-models is given):
+    per-worker  every worker unpickles its own copy (MODEL_PRELOAD=0)
+    preload     loaded once in the master, shared copy-on-write (MODEL_PRELOAD=1)
+    mmap        memory-mapped joblib copies shared via the page cache (MODEL_MMAP=1)
+
+PSS splits shared pages between the processes that map them, so the PSS total
+is the real memory cost of the whole server. Linux only (/proc/<pid>/smaps_rollup).
+
+Run from the backend directory:
+    python benchmarks/bench_worker_memory.py
+"""
+import os
+import pickle
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+
+WORKER_COUNTS = (1, 4, 8)
+MODES = {
+    'per-worker': {'MODEL_PRELOAD': '0', 'MODEL_MMAP': '0'},
+    'preload': {'MODEL_PRELOAD': '1', 'MODEL_MMAP': '0'},
+    'mmap': {'MODEL_PRELOAD': '0', 'MODEL_MMAP': '1'}
+}
+STAND_IN_MODEL_MB = 64
+
+
+def make_stand_in_model(path, megabytes, seed):
+    """A pickled 'model' whose weights are a large float64 array"""
+    rng = np.random.default_rng(seed)
+    model = {
+        'kind': 'stand-in soil model',
+        'weights': rng.random(megabytes * 1024 * 1024 // 8),
+        'bias': rng.random(16)
+    }
+    with open(path, 'wb') as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def child_pids(parent):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent:
+            children.append(int(entry))
+    return children
+
+
+def memory_kb(pid):
+    """(Rss, Pss) in kB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values['Rss'], values['Pss']
+
+
+def wait_until_ready(port, workers, timeout=120):
+    """Poll /ready until every worker has answered ready a few times"""
+    deadline = time.monotonic() + timeout
+    ok = 0
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/ready', timeout=5) as response:
+                ok = ok + 1 if response.status == 200 else 0
+        except Exception:
+            ok = 0
+            time.sleep(0.1)
+        if ok >= workers * 4:
+            return
+    raise TimeoutError('server did not become ready')
+
+
+def measure(mode, workers, env):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app'],
+        cwd=BACKEND_DIR, env=dict(env, **MODES[mode]),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(port, workers)
+        # Touch the soil path in every worker, then let things settle
+        for _ in range(workers * 4):
+            urllib.request.urlopen(urllib.request.Request(
+                f'http://127.0.0.1:{port}/api/predict/soil-health',
+                data=b'{"ph": 6.5, "nitrogen": 200}', headers={'Content-Type': 'application/json'}
+            ), timeout=5).read()
+        time.sleep(1.0)
+
+        master_rss, master_pss = memory_kb(server.pid)
+        worker_memory = [memory_kb(pid) for pid in child_pids(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    worker_rss = [rss for rss, _ in worker_memory]
+    worker_pss = [pss for _, pss in worker_memory]
+    return {
+        'worker_rss_mb': sum(worker_rss) / len(worker_rss) / 1024,
+        'worker_pss_mb': sum(worker_pss) / len(worker_pss) / 1024,
+        'total_pss_mb': (master_pss + sum(worker_pss)) / 1024,
+        'workers_seen': len(worker_memory)
+    }
+
+
+def main():
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        sys.exit('This report needs Linux /proc/<pid>/smaps_rollup')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, MODEL_WARMUP='1', ENABLE_CROP_MODEL='1', MODEL_MMAP_DIR=os.path.join(tmp, 'mmap'),
+                   ASSESSMENT_STORE_ENABLED='0')
+        if '--real-models' not in sys.argv:
+            env['SOIL_HEALTH_MODEL'] = os.path.join(tmp, 'soil_health.pkl')
+            env['SOIL_DISEASE_MODEL'] = os.path.join(tmp, 'soil_disease.pkl')
+            make_stand_in_model(env['SOIL_HEALTH_MODEL'], STAND_IN_MODEL_MB, 1)
+            make_stand_in_model(env['SOIL_DISEASE_MODEL'], STAND_IN_MODEL_MB, 2)
+            print(f"Stand-in models: 2 x {STAND_IN_MODEL_MB} MB of weights")
+
+        print(f"{'mode':<11} {'workers':>7} | {'RSS/worker MB':>13} {'PSS/worker MB':>13} {'total PSS MB':>12}")
+        for mode in MODES:
+            for workers in WORKER_COUNTS:
+                result = measure(mode, workers, env)
+                print(f"{mode:<11} {workers:>7} | {result['worker_rss_mb']:>13.1f} "
+                      f"{result['worker_pss_mb']:>13.1f} {result['total_pss_mb']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
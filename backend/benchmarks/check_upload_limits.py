@@ -0,0 +1,177 @@
+"""
+Check: upload limits keep worker memory bounded
+
+Starts the backend under gunicorn with one 4-thread worker, records the
+worker's peak RSS (VmHWM) after normal uploads, then sends oversized and
+malicious uploads concurrently: a 30 MB TIFF, a TIFF under the byte limit,
+a 20000x20000 PNG decompression bomb (~400 KB on the wire), a JPEG header
+claiming 60000x60000 pixels, a corrupt JPEG and a 30 MB chunked upload
+without Content-Length. Every one
+must be refused with the expected status and peak RSS must not grow by more
+than --budget-mb.
+
+Run from the backend directory:
+    python benchmarks/check_upload_limits.py
+"""
+import argparse
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# One worker, so every request is measured in the same process. (The Flask
+# development server is not used: it discards unread request bodies in 10 MB
+# reads, which shows up in RSS regardless of the app.)
+SERVER = ['-m', 'gunicorn', '--workers', '1', '--threads', '4', '--bind', '127.0.0.1:{port}', 'app:app']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def worker_pid(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as children:
+        return int(children.read().split()[0])
+
+
+def peak_rss_mb(pid):
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def encoded(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def jpeg_claiming(width, height):
+    """Small valid JPEG with its frame header rewritten to claim huge dimensions"""
+    data = bytearray(encoded(Image.new('RGB', (64, 64), 'green'), 'JPEG'))
+    sof = data.index(b'\xff\xc0')
+    data[sof + 5:sof + 9] = height.to_bytes(2, 'big') + width.to_bytes(2, 'big')
+    return bytes(data)
+
+
+def legit_uploads():
+    rng = np.random.default_rng(0)
+    photo = Image.fromarray(rng.integers(0, 255, (200, 300, 3), dtype=np.uint8)).resize((3000, 2000))
+    return [
+        ('3000x2000 JPEG', encoded(photo, 'JPEG', quality=90), 'leaf.jpg'),
+        ('1024x768 PNG', encoded(photo.resize((1024, 768)), 'PNG'), 'leaf.png')
+    ]
+
+
+def malicious_uploads():
+    rng = np.random.default_rng(1)
+    big_tiff = encoded(Image.fromarray(rng.integers(0, 255, (3200, 3200, 3), dtype=np.uint8)), 'TIFF')
+    small_tiff = encoded(Image.fromarray(rng.integers(0, 255, (1500, 1500, 3), dtype=np.uint8)), 'TIFF')
+    bomb = encoded(Image.new('L', (20000, 20000)), 'PNG')
+    return [
+        (f'{len(big_tiff) >> 20} MB TIFF', big_tiff, 'scan.tif', 413),
+        (f'{len(small_tiff) >> 20} MB TIFF', small_tiff, 'scan.tif', 415),
+        (f'PNG bomb ({len(bomb) >> 10} KB)', bomb, 'bomb.png', 413),
+        ('JPEG claiming 60000x60000', jpeg_claiming(60000, 60000), 'huge.jpg', 413),
+        ('corrupt JPEG', b'\xff\xd8\xff\xe0' + bytes(2 * 1024 * 1024), 'broken.jpg', 400)
+    ]
+
+
+def chunked_upload(url, size):
+    """Multipart body streamed with Transfer-Encoding: chunked (no Content-Length)"""
+    boundary = 'limitcheck'
+
+    def body():
+        yield (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="big.jpg"\r\n'
+               f'Content-Type: image/jpeg\r\n\r\n').encode() + b'\xff\xd8\xff'
+        chunk = bytes(1 << 20)
+        for _ in range(size >> 20):
+            yield chunk
+        yield f'\r\n--{boundary}--\r\n'.encode()
+
+    try:
+        response = requests.post(url, data=body(), timeout=60,
+                                 headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+        return response.status_code
+    except requests.ConnectionError:
+        return 'closed'  # server stopped reading and closed the connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-mb', type=float, default=32.0, help='allowed peak RSS growth')
+    parser.add_argument('--rounds', type=int, default=5, help='times each malicious upload is sent')
+    args = parser.parse_args()
+
+    port = free_port()
+    env = dict(os.environ, ASSESSMENT_STORE_ENABLED='0')
+    server = subprocess.Popen([sys.executable] + [arg.format(port=port) for arg in SERVER], cwd=BACKEND_DIR,
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    url = f'{base}/api/predict/crop-disease?cache=false'
+    failures = 0
+    try:
+        for _ in range(100):
+            try:
+                requests.get(base, timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        worker = worker_pid(server.pid)
+
+        for name, data, filename in legit_uploads():
+            for _ in range(3):
+                status = requests.post(url, files={'image': (filename, data)}, timeout=60).status_code
+            print(f"  {name:<28} {status}")
+            failures += status != 200
+        baseline = peak_rss_mb(worker)
+        print(f"Peak RSS after normal uploads: {baseline:.1f} MB\n")
+
+        uploads = malicious_uploads()
+
+        def send(upload):
+            name, data, filename, expected = upload
+            status = requests.post(url, files={'image': (filename, data)}, timeout=60).status_code
+            return name, expected, status
+
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(send, uploads * args.rounds))
+            chunked = list(pool.map(lambda _: chunked_upload(url, 30 << 20), range(args.rounds)))
+
+        for name, _, _, expected in uploads:
+            statuses = sorted({status for n, _, status in results if n == name})
+            ok = statuses == [expected]
+            failures += not ok
+            print(f"  {name:<28} expected {expected}, got {statuses}  {'ok' if ok else 'FAIL'}")
+        ok = all(status in (413, 'closed') for status in chunked)
+        failures += not ok
+        print(f"  {'30 MB chunked upload':<28} expected 413, got {sorted(set(map(str, chunked)))}  "
+              f"{'ok' if ok else 'FAIL'}")
+
+        peak = peak_rss_mb(worker)
+        grew = peak - baseline
+        within = grew <= args.budget_mb
+        failures += not within
+        print(f"\nPeak RSS after malicious uploads: {peak:.1f} MB (+{grew:.1f} MB, budget {args.budget_mb:.0f} MB)"
+              f"  {'ok' if within else 'FAIL'}")
+    finally:
+        server.terminate()
+        server.wait()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
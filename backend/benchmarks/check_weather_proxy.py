@@ -0,0 +1,115 @@
+"""
+Check of the weather proxy against the local Open-Meteo stub
+
+Verifies that concurrent identical lookups make one upstream call, that
+nearby points are answered from the cell cache, that failures and slow
+responses fall back to the latitude estimate (and a failed cell is not
+retried until its failure TTL ends), and that /api/weather works end to end.
+Prints upstream vs cached latency. Exits non-zero on any failed check.
+
+Run from the backend directory:
+    python benchmarks/check_weather_proxy.py
+"""
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Benchmark requests must not land in the real assessment history
+os.environ.setdefault('ASSESSMENT_STORE_ENABLED', '0')
+
+from stub_open_meteo import StubOpenMeteo
+from utils.soil_synth import estimate_humidity, estimate_temperature
+from utils.weather import WeatherProxy
+
+UPSTREAM_DELAY_S = 0.2
+CLIENTS = 50
+
+failures = []
+
+
+def check(condition, message):
+    print(f"  {'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def main():
+    stub = StubOpenMeteo(delay_seconds=UPSTREAM_DELAY_S).start()
+    try:
+        proxy = WeatherProxy(stub.url, timeout_seconds=1.0, cell_degrees=0.05, failure_ttl_seconds=0.5)
+
+        print(f"{CLIENTS} concurrent lookups of one point (upstream delay {UPSTREAM_DELAY_S * 1000:.0f} ms)")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+            results = list(pool.map(lambda _: proxy.current_weather(18.5204, 73.8567), range(CLIENTS)))
+        elapsed = time.perf_counter() - start
+        check(stub.requests == 1, f"one upstream call (got {stub.requests})")
+        check(all(r['temperature'] == results[0]['temperature'] for r in results), "all callers got the same weather")
+        check(results[0]['source'] == 'open-meteo', "served from upstream")
+        check(elapsed < UPSTREAM_DELAY_S * 3, f"finished in {elapsed * 1000:.0f} ms")
+
+        print("Nearby point in the same cell")
+        nearby = proxy.current_weather(18.5100, 73.8600)
+        check(stub.requests == 1 and nearby['cached'], "answered from the cell cache")
+
+        print("Latency: upstream miss vs cached hit")
+        misses, hits = [], []
+        for i in range(10):
+            lat = 10 + i
+            start = time.perf_counter()
+            proxy.current_weather(lat, 77.0)
+            misses.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            proxy.current_weather(lat + 0.01, 77.01)
+            hits.append((time.perf_counter() - start) * 1000)
+        print(f"  upstream: median {statistics.median(misses):7.2f} ms, cached: median {statistics.median(hits):7.3f} ms")
+
+        print("Upstream failure")
+        stub.fail = True
+        calls_before = stub.requests
+        failed = proxy.current_weather(-33.87, 151.21, month=6)
+        check(failed['source'] == 'estimate', "falls back to the estimate")
+        check(failed['temperature'] == estimate_temperature(-33.87, 6) and
+              failed['humidity'] == estimate_humidity(-33.87), "estimate matches the frontend formula")
+        proxy.current_weather(-33.87, 151.21)
+        check(stub.requests == calls_before + 1, "failed cell is not retried within its failure TTL")
+        time.sleep(0.6)
+        stub.fail = False
+        recovered = proxy.current_weather(-33.87, 151.21)
+        check(recovered['source'] == 'open-meteo', "retried after the failure TTL")
+
+        print("Slow upstream")
+        stub.delay_seconds = 1.5
+        start = time.perf_counter()
+        slow = proxy.current_weather(51.5, -0.12)
+        elapsed = time.perf_counter() - start
+        check(slow['source'] == 'estimate' and elapsed < 1.4, f"timed out to the estimate in {elapsed * 1000:.0f} ms")
+        stub.delay_seconds = 0.0
+
+        print("/api/weather through the Flask app")
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as app_module
+            app_module.weather_proxy = WeatherProxy(stub.url, timeout_seconds=1.0)
+            client = app_module.app.test_client()
+            response = client.get('/api/weather?lat=28.61&lng=77.21')
+            bad = client.get('/api/weather?lat=abc&lng=77.21')
+        data = response.get_json()['data']
+        check(response.status_code == 200 and data['source'] == 'open-meteo', "returns upstream weather")
+        check(bad.status_code == 400, "rejects invalid coordinates")
+    finally:
+        stub.stop()
+
+    if failures:
+        print(f"FAIL: {len(failures)} check(s) failed")
+        sys.exit(1)
+    print("OK: weather proxy behaves as expected")
+
+
+if __name__ == '__main__':
+    main()
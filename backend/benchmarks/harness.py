@@ -0,0 +1,115 @@
+"""
+Small benchmark harness used by benchmarks/run.py
+
+Each case is a zero-argument callable. It is timed call by call after a
+warmup, so the report has ops/sec and latency percentiles, and it is run
+again under tracemalloc to measure the memory allocated per call.
+"""
+import gc
+import statistics
+import time
+import tracemalloc
+
+
+class BenchmarkCase:
+    """A named zero-argument callable, run `iterations` times per measurement"""
+
+    def __init__(self, group, name, fn, iterations=1000, warmup=None):
+        self.group = group
+        self.name = name
+        self.fn = fn
+        self.iterations = iterations
+        self.warmup = warmup if warmup is not None else max(1, iterations // 10)
+
+    @property
+    def key(self):
+        return f"{self.group}/{self.name}"
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure_time(fn, iterations, warmup):
+    """Per-call latencies in microseconds, sorted"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()  # collections land in random calls and blur the percentiles
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter_ns()
+            fn()
+            samples.append((time.perf_counter_ns() - start) / 1000)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    samples.sort()
+    return samples
+
+
+def measure_allocations(fn, iterations):
+    """
+    Mean peak bytes allocated during a call (temporaries included) and mean
+    bytes still held after it returns, traced with tracemalloc
+    """
+    iterations = max(1, min(iterations, 200))  # tracing is slow
+    fn()
+    total_peak = total_retained = 0
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            fn()
+            after, peak = tracemalloc.get_traced_memory()
+            total_peak += peak - before
+            total_retained += after - before
+    finally:
+        tracemalloc.stop()
+    return {
+        'peak_bytes': total_peak / iterations,
+        'retained_bytes': total_retained / iterations
+    }
+
+
+def run_case(case, allocations=True):
+    """Timing (and optionally allocation) results of one case as a dict"""
+    samples = measure_time(case.fn, case.iterations, case.warmup)
+    mean_us = statistics.fmean(samples)
+    result = {
+        'iterations': case.iterations,
+        'ops_per_sec': 1e6 / mean_us if mean_us else float('inf'),
+        'mean_us': mean_us,
+        'p50_us': percentile(samples, 0.50),
+        'p95_us': percentile(samples, 0.95),
+        'p99_us': percentile(samples, 0.99)
+    }
+    if allocations:
+        result.update(measure_allocations(case.fn, case.iterations))
+    return result
+
+
+def compare(results, baseline, threshold):
+    """
+    Cases whose p50 latency or peak allocation grew by more than `threshold`
+    (a fraction, e.g. 0.2 = 20%) relative to the baseline
+    Returns: list of (key, metric, baseline value, current value)
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in ('p50_us', 'peak_bytes'):
+            if metric not in current or metric not in previous:
+                continue
+            # Ignore noise on tiny values (sub-microsecond, sub-kilobyte)
+            floor = 1.0 if metric == 'p50_us' else 1024.0
+            if current[metric] > max(previous[metric], floor) * (1 + threshold):
+                regressions.append((key, metric, previous[metric], current[metric]))
+    return regressions
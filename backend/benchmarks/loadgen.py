@@ -0,0 +1,325 @@
+"""
+Load generator for a running AgriSense-MRV server
+
+Sends realistic mixed traffic: soil samples come from the location-based
+synthesizer (utils/soil_synth.py, the port of the frontend's soilDataAPI.js)
+at random points in a region, and crop/integrated requests carry generated
+leaf images of a configurable resolution and format.
+
+Two modes:
+    --rps N          open loop: requests start on a fixed schedule; latency is
+                     measured from the scheduled start, so a slow server is not
+                     hidden by the generator backing off
+    --concurrency N  closed loop: N clients send back-to-back requests
+
+Reports throughput, p50/p95/p99 latency and error rate per endpoint.
+
+Start the server first (e.g. gunicorn -c gunicorn.conf.py app:app), then from
+the backend directory:
+    python benchmarks/loadgen.py --rps 50 --duration 30
+    python benchmarks/loadgen.py --concurrency 16 --mix soil=1 --duration 20
+    python benchmarks/loadgen.py --rps 10 --mix crop=1,integrated=1 --image-size 3000x2000
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from utils.soil_synth import generate_location_based_soil_data
+
+ENDPOINTS = {
+    'soil': '/api/predict/soil-health',
+    'crop': '/api/predict/crop-disease',
+    'integrated': '/api/predict/integrated'
+}
+DEFAULT_MIX = 'soil=6,crop=2,integrated=2'
+DEFAULT_REGION = (8.0, 35.0, 68.0, 97.0)  # lat_min, lat_max, lng_min, lng_max (India)
+
+
+def parse_mix(text):
+    """'soil=6,crop=2' -> {'soil': 6.0, 'crop': 2.0}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{name}' (use {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def parse_size(text):
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height)
+
+
+def make_leaf_image(size, image_format, seed):
+    """Encoded leaf-like image: green gradient, noise and a few brown lesions"""
+    from PIL import Image
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    y, x = np.ogrid[0:height, 0:width]
+    pixels = np.empty((height, width, 3), dtype=np.float32)
+    pixels[..., 0] = 50 + 40 * x / width
+    pixels[..., 1] = 110 + 90 * y / height
+    pixels[..., 2] = 40
+    for _ in range(int(rng.integers(3, 12))):
+        cy, cx = rng.integers(0, height), rng.integers(0, width)
+        radius = rng.uniform(0.01, 0.05) * min(width, height)
+        spot = (y - cy) ** 2 + (x - cx) ** 2 < radius ** 2
+        pixels[spot] = (120, 80, 30)
+    pixels += rng.normal(0, 10, pixels.shape)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(
+        buffer, image_format, **({'quality': 90} if image_format == 'JPEG' else {})
+    )
+    return buffer.getvalue()
+
+
+def multipart_body(fields, files):
+    """(body, content type) for multipart/form-data; files: {name: (filename, bytes, mime)}"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, data, mime) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {mime}\r\n\r\n'.encode() + data + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class TrafficMix:
+    """Builds (endpoint name, path, body, content type) requests according to the mix"""
+
+    def __init__(self, mix, images, image_format, region, bypass_cache, seed):
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.images = images
+        self.image_mime = 'image/jpeg' if image_format == 'JPEG' else 'image/png'
+        self.image_ext = 'jpg' if image_format == 'JPEG' else 'png'
+        self.region = region
+        self.query = '?cache=false' if bypass_cache else ''
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def soil_sample(self, rng):
+        lat_min, lat_max, lng_min, lng_max = self.region
+        return generate_location_based_soil_data(rng.uniform(lat_min, lat_max), rng.uniform(lng_min, lng_max))
+
+    def next_request(self):
+        with self.lock:
+            name = self.rng.choices(self.names, self.weights)[0]
+            rng = random.Random(self.rng.random())
+        path = ENDPOINTS[name]
+
+        if name == 'soil':
+            return name, path, json.dumps(self.soil_sample(rng)).encode(), 'application/json'
+
+        image = self.images[rng.randrange(len(self.images))]
+        files = {'image': (f'leaf.{self.image_ext}', image, self.image_mime)}
+        fields = {'soilData': json.dumps(self.soil_sample(rng))} if name == 'integrated' else {}
+        body, content_type = multipart_body(fields, files)
+        return name, path + self.query, body, content_type
+
+
+class Recorder:
+    """Per-endpoint latencies and errors"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.error_samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, latency_ms, error=None):
+        with self.lock:
+            self.latencies.setdefault(name, []).append(latency_ms)
+            if error is not None:
+                self.errors[name] = self.errors.get(name, 0) + 1
+                self.error_samples.setdefault(name, error)
+
+
+class Client:
+    """Keep-alive HTTP connection per thread"""
+
+    def __init__(self, base_url, timeout):
+        url = urllib.parse.urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == 'https' else 80)
+        self.connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def post(self, path, body, content_type):
+        """Returns the status code; reconnects once on a dropped keep-alive connection"""
+        for attempt in range(2):
+            connection = getattr(self.local, 'connection', None)
+            if connection is None:
+                connection = self.local.connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+            try:
+                connection.request('POST', path, body=body, headers={'Content-Type': content_type})
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+
+
+def send(client, traffic, recorder, scheduled=None):
+    name, path, body, content_type = traffic.next_request()
+    start = scheduled if scheduled is not None else time.perf_counter()
+    error = None
+    try:
+        status = client.post(path, body, content_type)
+        if status >= 400:
+            error = f"HTTP {status}"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    recorder.record(name, (time.perf_counter() - start) * 1000, error)
+
+
+def run_open_loop(client, traffic, recorder, rps, duration, max_workers):
+    """Start requests on a fixed schedule of `rps` per second"""
+    interval = 1.0 / rps
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        start = time.perf_counter()
+        sent = 0
+        while True:
+            scheduled = start + sent * interval
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, client, traffic, recorder, scheduled)
+            sent += 1
+    return time.perf_counter() - start
+
+
+def run_closed_loop(client, traffic, recorder, concurrency, duration):
+    """`concurrency` clients sending back-to-back for `duration` seconds"""
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            send(client, traffic, recorder)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(recorder, elapsed):
+    rows = {}
+    everything = []
+    for name in sorted(recorder.latencies):
+        latencies = sorted(recorder.latencies[name])
+        everything.extend(latencies)
+        rows[name] = {'latencies': latencies, 'errors': recorder.errors.get(name, 0)}
+    if everything:
+        rows['all'] = {'latencies': sorted(everything), 'errors': sum(recorder.errors.values())}
+
+    report = {}
+    for name, row in rows.items():
+        latencies = row['latencies']
+        report[name] = {
+            'requests': len(latencies),
+            'throughput_rps': len(latencies) / elapsed,
+            'error_rate': row['errors'] / len(latencies),
+            'mean_ms': statistics.fmean(latencies),
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed-traffic load generator for the AgriSense-MRV API')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='server base URL')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--rps', type=float, help='open loop: target requests per second')
+    mode.add_argument('--concurrency', type=int, help='closed loop: number of concurrent clients')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of load')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'endpoint weights (default {DEFAULT_MIX})')
+    parser.add_argument('--image-size', type=parse_size, default=(1024, 768), help='image resolution WxH')
+    parser.add_argument('--image-format', choices=('jpeg', 'png'), default='jpeg')
+    parser.add_argument('--image-pool', type=int, default=16, help='number of distinct images to cycle through')
+    parser.add_argument('--bypass-cache', action='store_true', help='send ?cache=false on image requests')
+    parser.add_argument('--region', type=float, nargs=4, default=DEFAULT_REGION,
+                        metavar=('LAT_MIN', 'LAT_MAX', 'LNG_MIN', 'LNG_MAX'), help='where soil samples come from')
+    parser.add_argument('--max-workers', type=int, default=64, help='open loop: max requests in flight')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the report to this JSON file')
+    args = parser.parse_args()
+    if args.rps is None and args.concurrency is None:
+        args.concurrency = 8
+
+    image_format = args.image_format.upper()
+    images = []
+    if any(name != 'soil' for name in args.mix):
+        images = [make_leaf_image(args.image_size, image_format, args.seed + i) for i in range(args.image_pool)]
+        mean_kb = statistics.fmean(len(image) for image in images) / 1024
+        print(f"Images: {args.image_pool} x {args.image_size[0]}x{args.image_size[1]} "
+              f"{args.image_format}, mean payload {mean_kb:.1f} KB")
+
+    traffic = TrafficMix(args.mix, images, image_format, args.region, args.bypass_cache, args.seed)
+    client = Client(args.url, args.timeout)
+    recorder = Recorder()
+
+    if args.rps:
+        print(f"Open loop at {args.rps:g} req/s for {args.duration:g} s against {args.url}")
+        elapsed = run_open_loop(client, traffic, recorder, args.rps, args.duration, args.max_workers)
+    else:
+        print(f"Closed loop with {args.concurrency} clients for {args.duration:g} s against {args.url}")
+        elapsed = run_closed_loop(client, traffic, recorder, args.concurrency, args.duration)
+
+    report = summarize(recorder, elapsed)
+    print(f"\n{'endpoint':<12} {'requests':>8} {'req/s':>8} {'errors':>7} "
+          f"{'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, row in report.items():
+        print(f"{name:<12} {row['requests']:>8} {row['throughput_rps']:>8.1f} {row['error_rate']:>7.1%} "
+              f"{row['mean_ms']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+    for name, sample in recorder.error_samples.items():
+        print(f"  first {name} error: {sample}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': {k: v for k, v in vars(args).items() if k != 'json'}, 'report': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
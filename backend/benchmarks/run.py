@@ -0,0 +1,222 @@
+"""
+Microbenchmark suite for the preprocessing, scoring and recommendation hot paths
+
+Inputs are fixed: soil samples come from a seeded generator and test images
+are generated (seeded) as JPEG and PNG at several resolutions, so runs are
+comparable across commits. Every case reports ops/sec, p50/p95/p99 latency
+and per-call allocation (tracemalloc). Endpoint cases go through the Flask
+test client.
+
+Run from the backend directory:
+    python benchmarks/run.py                         # run and print
+    python benchmarks/run.py --save-baseline         # also store results as the baseline
+    python benchmarks/run.py --compare               # flag regressions against the baseline
+    python benchmarks/run.py --compare --threshold 0.3 --filter soil
+
+With --compare the exit status is 1 if any case got slower (p50) or
+allocated more (peak) than the threshold allows.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+# Benchmark requests must not land in the real assessment history
+os.environ.setdefault('ASSESSMENT_STORE_ENABLED', '0')
+
+import numpy as np
+from PIL import Image
+
+from harness import BenchmarkCase, compare, run_case
+
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, 'results', 'baseline.json')
+SEED = 20240601
+SOIL_SAMPLES = 64
+IMAGE_RESOLUTIONS = ((256, 256), (1024, 768), (3000, 2000))
+SOIL_TYPES = ('Sandy', 'Loamy', 'Black', 'Red', 'Clayey')
+SALINITY_CLASSES = ('Normal', 'Slightly Saline', 'Moderately Saline', 'Highly Saline')
+
+
+def make_soil_samples(count=SOIL_SAMPLES, seed=SEED):
+    """Fixed synthetic soil samples in the request format of /api/predict/soil-health"""
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(count):
+        samples.append({
+            'temperature': round(float(rng.uniform(15, 40)), 1),
+            'humidity': round(float(rng.uniform(30, 90)), 1),
+            'moisture': round(float(rng.uniform(20, 80)), 1),
+            'soil_type': SOIL_TYPES[int(rng.integers(len(SOIL_TYPES)))],
+            'nitrogen': round(float(rng.uniform(80, 400)), 1),
+            'phosphorous': round(float(rng.uniform(5, 70)), 1),
+            'potassium': round(float(rng.uniform(60, 400)), 1),
+            'ph': round(float(rng.uniform(4.5, 9.0)), 2),
+            'ec': round(float(rng.uniform(0.1, 5.0)), 2),
+            'organic_carbon': round(float(rng.uniform(0.2, 3.0)), 2),
+            'salinity_class': SALINITY_CLASSES[int(rng.integers(len(SALINITY_CLASSES)))],
+            'pathogen_presence': int(rng.integers(2)),
+            'latitude': round(float(rng.uniform(8, 35)), 4),
+            'longitude': round(float(rng.uniform(68, 97)), 4)
+        })
+    return samples
+
+
+def make_image(size, image_format, seed=SEED):
+    """Encoded leaf-like test image (smooth green gradient plus noise)"""
+    width, height = size
+    rng = np.random.default_rng(seed + width * height)
+    y, x = np.mgrid[0:height, 0:width]
+    pixels = np.empty((height, width, 3), dtype=np.float32)
+    pixels[..., 0] = 60 + 40 * x / width
+    pixels[..., 1] = 120 + 80 * y / height
+    pixels[..., 2] = 50
+    pixels += rng.normal(0, 12, pixels.shape)
+    buffer = io.BytesIO()
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    image.save(buffer, image_format, **({'quality': 90} if image_format == 'JPEG' else {}))
+    return buffer.getvalue()
+
+
+def cycle(items):
+    """Endless round-robin over items (one per benchmark call)"""
+    state = {'i': 0}
+
+    def next_item():
+        item = items[state['i'] % len(items)]
+        state['i'] += 1
+        return item
+    return next_item
+
+
+def build_cases(quick=False):
+    from utils.model_loader import ModelManager
+    from utils.preprocessor import (
+        preprocess_image, prepare_soil_sample, prepare_soil_data, prepare_soil_batch
+    )
+    from utils.recommendations import get_soil_recommendations, get_treatment_recommendations
+
+    scale = 0.1 if quick else 1.0
+
+    def n(iterations):
+        return max(10, int(iterations * scale))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = ModelManager()
+        manager.warmup()
+        import app as app_module
+    client = app_module.app.test_client()
+
+    samples = make_soil_samples()
+    sample = cycle(samples)
+    soil_objects = [prepare_soil_sample(raw) for raw in samples]
+    soil_object = cycle(soil_objects)
+    assessments = [manager.assess_soil(obj) for obj in soil_objects]
+    assessed = cycle(list(zip(samples, assessments)))
+    batch_matrix = prepare_soil_batch(samples)
+
+    cases = [
+        BenchmarkCase('soil', 'prepare_soil_sample', lambda: prepare_soil_sample(sample()), n(20000)),
+        BenchmarkCase('soil', 'prepare_soil_data', lambda: prepare_soil_data(sample()), n(2000)),
+        BenchmarkCase('soil', 'prepare_soil_batch[64]', lambda: prepare_soil_batch(samples), n(2000)),
+        BenchmarkCase('soil', 'predict_soil_health', lambda: manager.predict_soil_health(soil_object()), n(20000)),
+        BenchmarkCase('soil', 'predict_soil_disease_risk',
+                      lambda: manager.predict_soil_disease_risk(soil_object()), n(20000)),
+        BenchmarkCase('soil', 'assess_soil', lambda: manager.assess_soil(soil_object()), n(20000)),
+        BenchmarkCase('soil', 'score_soil_batch[64]', lambda: manager.score_soil_batch(batch_matrix), n(5000)),
+        BenchmarkCase('recommendations', 'get_soil_recommendations',
+                      lambda: (lambda raw, a: get_soil_recommendations(a['health_score'], a['disease_risk'], raw))(
+                          *assessed()), n(20000)),
+        BenchmarkCase('recommendations', 'get_treatment_recommendations',
+                      lambda: get_treatment_recommendations('Tomato___Late_blight'), n(20000)),
+        BenchmarkCase('endpoint', 'POST /api/predict/soil-health',
+                      lambda: client.post('/api/predict/soil-health', json=sample()), n(1000)),
+        BenchmarkCase('endpoint', 'POST /api/predict/soil-health/batch[64]',
+                      lambda: client.post('/api/predict/soil-health/batch', json={'samples': samples}), n(200))
+    ]
+
+    for size in IMAGE_RESOLUTIONS:
+        label = f"{size[0]}x{size[1]}"
+        iterations = n(300 if size[0] <= 1024 else 40)
+        for image_format in ('JPEG', 'PNG'):
+            data = make_image(size, image_format)
+            cases.append(BenchmarkCase(
+                'image', f"preprocess_image[{image_format.lower()} {label}]",
+                lambda data=data: preprocess_image(io.BytesIO(data)), iterations
+            ))
+        data = make_image(size, 'JPEG')
+        # ?cache=false so every call decodes and predicts
+        cases.append(BenchmarkCase(
+            'endpoint', f"POST /api/predict/crop-disease[jpeg {label}]",
+            lambda data=data: client.post(
+                '/api/predict/crop-disease?cache=false',
+                data={'image': (io.BytesIO(data), 'leaf.jpg')}, content_type='multipart/form-data'
+            ), max(10, iterations // 2)
+        ))
+    return cases
+
+
+def print_result(key, result):
+    line = (f"{key:<52} {result['ops_per_sec']:>10.1f} {result['p50_us']:>10.1f} "
+            f"{result['p95_us']:>10.1f} {result['p99_us']:>10.1f}")
+    if 'peak_bytes' in result:
+        line += f" {result['peak_bytes'] / 1024:>10.1f}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON path')
+    parser.add_argument('--save-baseline', action='store_true', help='write these results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='flag regressions against the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed growth before a case is flagged (0.25 = 25%%)')
+    parser.add_argument('--filter', default=None, help='only run cases whose name matches this regex')
+    parser.add_argument('--no-alloc', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--quick', action='store_true', help='10%% of the iterations (smoke run)')
+    args = parser.parse_args()
+
+    cases = build_cases(quick=args.quick)
+    if args.filter:
+        pattern = re.compile(args.filter)
+        cases = [case for case in cases if pattern.search(case.key)]
+
+    print(f"{'case':<52} {'ops/sec':>10} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} "
+          f"{'' if args.no_alloc else 'peak KB':>10}")
+    results = {}
+    for case in cases:
+        results[case.key] = run_case(case, allocations=not args.no_alloc)
+        print_result(case.key, results[case.key])
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results
+            }, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            sys.exit(f"No baseline at {args.baseline} (run with --save-baseline first)")
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for key, metric, before, after in regressions:
+                print(f"  {key}: {metric} {before:.1f} -> {after:.1f} ({after / max(before, 1e-9) - 1:+.0%})")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Concurrency stress test for crop disease prediction
+
+Many threads predict the same set of images over and over, directly on the
+ModelManager and through the Flask app (with and without micro-batching),
+while another thread keeps reseeding the global random / numpy.random state.
+Every result must equal the single-threaded reference for that image.
+Exits non-zero on any mismatch.
+
+Run from the backend directory:
+    python benchmarks/stress_crop_threads.py
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Benchmark requests must not land in the real assessment history
+os.environ.setdefault('ASSESSMENT_STORE_ENABLED', '0')
+
+import numpy as np
+from PIL import Image
+
+THREADS = 32
+ROUNDS = 20
+IMAGES = 24
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+    from utils.model_loader import ModelManager
+
+
+def make_uploads():
+    rng = np.random.default_rng(0)
+    uploads = []
+    for _ in range(IMAGES):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 255, (64, 64, 3), dtype=np.uint8)).save(buffer, 'PNG')
+        uploads.append(buffer.getvalue())
+    return uploads
+
+
+def global_state_noise(stop):
+    """Keeps disturbing the global generators the old code depended on"""
+    while not stop.is_set():
+        random.seed()
+        random.random()
+        np.random.seed()
+        np.random.dirichlet(np.ones(38))
+
+
+def run_threads(check):
+    """Run check(i) for every image from THREADS threads, ROUNDS times; returns mismatches"""
+    jobs = [i % IMAGES for i in range(THREADS * ROUNDS)]
+    stop = threading.Event()
+    noise = threading.Thread(target=global_state_noise, args=(stop,), daemon=True)
+    noise.start()
+    try:
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            return sum(1 for ok in pool.map(check, jobs) if not ok)
+    finally:
+        stop.set()
+        noise.join()
+
+
+def main():
+    from utils.preprocessor import preprocess_image
+
+    uploads = make_uploads()
+    images = [preprocess_image(io.BytesIO(data)) for data in uploads]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = ModelManager()
+        reference = [manager.predict_crop_disease(image) for image in images]
+
+        # A second manager must agree too (seeds do not depend on process state)
+        other = ModelManager()
+        assert [other.predict_crop_disease(image) for image in images] == reference
+
+    failures = 0
+
+    mismatches = run_threads(lambda i: manager.predict_crop_disease(images[i]) == reference[i])
+    print(f"ModelManager.predict_crop_disease: {THREADS * ROUNDS} predictions, {mismatches} mismatches")
+    failures += mismatches
+
+    def via_endpoint(i):
+        client = app.app.test_client()
+        response = client.post(
+            '/api/predict/crop-disease?cache=false',
+            data={'image': (io.BytesIO(uploads[i]), 'leaf.png')},
+            content_type='multipart/form-data'
+        )
+        data = response.get_json()['data']
+        return data['disease'] == reference[i]['class_name'] and data['confidence'] == reference[i]['confidence']
+
+    for batching in (False, True):
+        # Forced on: the app only batches real backends, this runs the mock
+        app.crop_batching_enabled = lambda: batching
+        mismatches = run_threads(via_endpoint)
+        print(f"/api/predict/crop-disease (batching={'on' if batching else 'off'}): "
+              f"{THREADS * ROUNDS} requests, {mismatches} mismatches")
+        failures += mismatches
+
+    if failures:
+        print("FAIL: identical images produced different results under concurrency")
+        sys.exit(1)
+    print("OK: identical images give identical results under concurrency")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Local stand-in for the Open-Meteo forecast API
+
+Answers GET /v1/forecast?latitude=..&longitude=..&current=.. with a
+deterministic 'current' block derived from the coordinates, after an optional
+delay, and can be switched to fail. Used instead of the real service when
+exercising the weather proxy.
+
+Standalone (then start the backend with OPEN_METEO_URL=http://127.0.0.1:8081/v1/forecast):
+    python benchmarks/stub_open_meteo.py --port 8081 --delay-ms 200
+"""
+import argparse
+import json
+import math
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_current(lat, lng):
+    """Deterministic weather for a point"""
+    return {
+        'time': '2024-06-01T12:00',
+        'interval': 900,
+        'temperature_2m': round(28 - abs(lat) * 0.3 + math.sin(lng) * 2, 1),
+        'relative_humidity_2m': round(60 + math.cos(lat) * 20),
+        'soil_temperature_0cm': round(30 - abs(lat) * 0.3, 1),
+        'soil_moisture_0_to_1cm': round(0.2 + abs(math.sin(lat + lng)) * 0.2, 3)
+    }
+
+
+class StubOpenMeteo:
+    """Threaded stub server; `delay_seconds` and `fail` can be changed while running"""
+
+    def __init__(self, host='127.0.0.1', port=0, delay_seconds=0.0):
+        self.delay_seconds = delay_seconds
+        self.fail = False
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                query = urllib.parse.parse_qs(url.query)
+                with stub._lock:
+                    stub.requests += 1
+                if stub.delay_seconds:
+                    time.sleep(stub.delay_seconds)
+
+                if stub.fail:
+                    self._reply(500, {'error': True, 'reason': 'stub failure'})
+                elif url.path != '/v1/forecast' or 'latitude' not in query or 'longitude' not in query:
+                    self._reply(400, {'error': True, 'reason': 'latitude and longitude required'})
+                else:
+                    lat, lng = float(query['latitude'][0]), float(query['longitude'][0])
+                    self._reply(200, {'latitude': lat, 'longitude': lng, 'current': stub_current(lat, lng)})
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up (e.g. timed out)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1/forecast"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Open-Meteo forecast API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--delay-ms', type=float, default=0.0, help='delay before every response')
+    parser.add_argument('--fail', action='store_true', help='answer every request with HTTP 500')
+    args = parser.parse_args()
+
+    stub = StubOpenMeteo(args.host, args.port, args.delay_ms / 1000)
+    stub.fail = args.fail
+    print(f"Stub Open-Meteo listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Offline batch classifier for folders of leaf photos
+
+Decodes and resizes images in a process pool straight into a shared-memory
+(N, 224, 224, 3) uint8 buffer (only paths and slot numbers cross process
+boundaries, never pixel arrays), feeds the crop disease model in fixed-size
+batches from the main process and appends the predictions to a CSV file as
+each batch finishes. Decoding of the next batches overlaps with inference.
+Predictions are the same as /api/predict/crop-disease for the same file.
+
+Usage (from the backend directory):
+    python classify_images.py photos/ predictions.csv
+    python classify_images.py photos/ predictions.csv --batch-size 64 --workers 8 --top-k 3
+    python classify_images.py photos/ predictions.csv --max-pixels 100000000
+
+Files are trusted local photos, so the pixel limit is Config.CLI_MAX_IMAGE_PIXELS
+(150 MP), not the 25 MP upload limit.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from config import Config
+from utils.preprocessor import load_image_pixels, normalize_image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+DEFAULT_BATCH_SIZE = 32
+BATCHES_IN_FLIGHT = 3  # Buffer slots hold this many batches: one predicting, the rest decoding
+
+_worker_buffer = None
+_worker_max_pixels = None
+
+
+def find_images(root):
+    """Image files under a directory (recursive, sorted) or a single file"""
+    if os.path.isfile(root):
+        return [root]
+    paths = []
+    for directory, _, files in os.walk(root):
+        paths.extend(os.path.join(directory, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(paths)
+
+
+def _attach_buffer(name, shape, max_pixels):
+    """Pool initializer: map the shared pixel buffer once per worker"""
+    global _worker_buffer, _worker_max_pixels
+    memory = shared_memory.SharedMemory(name=name)
+    _worker_buffer = (memory, np.ndarray(shape, dtype=np.uint8, buffer=memory.buf))
+    _worker_max_pixels = max_pixels
+
+
+def _decode_into_slot(task):
+    """Decode one image into its buffer slot; returns (error or None, seconds)"""
+    slot, path = task
+    start = time.perf_counter()
+    try:
+        _worker_buffer[1][slot] = load_image_pixels(path, max_pixels=_worker_max_pixels)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return error, time.perf_counter() - start
+
+
+class PredictionWriter:
+    """Appends one CSV row per image and flushes after every batch"""
+
+    def __init__(self, path, top_k=None):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.top_k = top_k
+        header = ['path', 'class_idx', 'class_name', 'confidence']
+        if top_k:
+            header.append('top_predictions')
+        self.writer.writerow(header + ['error'])
+
+    def write_batch(self, paths, predictions, errors):
+        """predictions: one dict per successfully decoded path, in order"""
+        results = iter(predictions)
+        for path, error in zip(paths, errors):
+            if error is not None:
+                row = [path, '', '', '']
+                if self.top_k:
+                    row.append('')
+                self.writer.writerow(row + [error])
+                continue
+            prediction = next(results)
+            row = [path, prediction['class_idx'], prediction['class_name'], round(prediction['confidence'], 6)]
+            if self.top_k:
+                row.append(';'.join(f"{label}:{prob:.6f}" for label, prob in prediction['top_k']))
+            self.writer.writerow(row + [''])
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def classify_images(paths, output_path, batch_size=DEFAULT_BATCH_SIZE, workers=None, top_k=None,
+                    model_manager=None, max_pixels=None):
+    """
+    Classify image files in batches
+    max_pixels: largest image accepted (default Config.CLI_MAX_IMAGE_PIXELS)
+    Returns: dict with image/error counts and per-stage seconds and images/sec
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pixels = max_pixels or Config.CLI_MAX_IMAGE_PIXELS
+    width, height = Config.IMAGE_SIZE
+    slots = batch_size * BATCHES_IN_FLIGHT
+    shape = (slots, height, width, 3)
+    memory = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+    buffer = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf)
+
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    stage_seconds = {'decode': 0.0, 'decode_wait': 0.0, 'normalize': 0.0, 'predict': 0.0, 'write': 0.0}
+    errors_total = 0
+    writer = PredictionWriter(output_path, top_k)
+    start = time.perf_counter()
+    try:
+        # Start the pool before the model loads, so forked workers stay small
+        with Pool(workers, initializer=_attach_buffer, initargs=(memory.name, shape, max_pixels)) as pool:
+            if model_manager is None:
+                from utils.model_loader import ModelManager
+                model_manager = ModelManager()
+
+            in_flight = deque()
+
+            def submit(index):
+                first_slot = (index % BATCHES_IN_FLIGHT) * batch_size
+                tasks = [(first_slot + i, path) for i, path in enumerate(batches[index])]
+                in_flight.append((index, first_slot, pool.map_async(_decode_into_slot, tasks)))
+
+            for index in range(min(BATCHES_IN_FLIGHT, len(batches))):
+                submit(index)
+
+            while in_flight:
+                index, first_slot, pending = in_flight.popleft()
+                wait_start = time.perf_counter()
+                decoded = pending.get()
+                stage_seconds['decode_wait'] += time.perf_counter() - wait_start
+                stage_seconds['decode'] += sum(seconds for _, seconds in decoded)
+                errors = [error for error, _ in decoded]
+                ok = [i for i, error in enumerate(errors) if error is None]
+                errors_total += len(errors) - len(ok)
+
+                # Copy out of the slots, then hand them straight back to the decoders
+                step = time.perf_counter()
+                images = normalize_image(buffer[first_slot + np.array(ok, dtype=np.intp)]) if ok else None
+                stage_seconds['normalize'] += time.perf_counter() - step
+                if index + BATCHES_IN_FLIGHT < len(batches):
+                    submit(index + BATCHES_IN_FLIGHT)
+
+                step = time.perf_counter()
+                predictions = model_manager.predict_crop_disease_batch(images, top_k=top_k) if ok else []
+                stage_seconds['predict'] += time.perf_counter() - step
+
+                step = time.perf_counter()
+                writer.write_batch(batches[index], predictions, errors)
+                stage_seconds['write'] += time.perf_counter() - step
+                print(f"  classified {min((index + 1) * batch_size, len(paths))}/{len(paths)} images",
+                      file=sys.stderr)
+    finally:
+        writer.close()
+        del buffer
+        memory.close()
+        memory.unlink()
+
+    elapsed = time.perf_counter() - start
+    decoded_count = len(paths) - errors_total
+    return {
+        'images': len(paths),
+        'errors': errors_total,
+        'seconds': elapsed,
+        'images_per_sec': len(paths) / elapsed if elapsed > 0 else 0.0,
+        'workers': workers,
+        'stages': {
+            name: {
+                'seconds': seconds,
+                'images_per_sec': (len(paths) if name in ('decode', 'decode_wait', 'write') else decoded_count)
+                / seconds if seconds > 0 else 0.0
+            }
+            for name, seconds in stage_seconds.items()
+        }
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Classify a folder of leaf photos for crop disease')
+    parser.add_argument('input', help='image file or directory (searched recursively)')
+    parser.add_argument('output', help='output CSV file')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'images per model call (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='decode processes')
+    parser.add_argument('--top-k', type=int, help='also write the k most likely classes')
+    parser.add_argument('--max-pixels', type=int, default=Config.CLI_MAX_IMAGE_PIXELS,
+                        help=f'largest image accepted (default: {Config.CLI_MAX_IMAGE_PIXELS:,})')
+    args = parser.parse_args(argv)
+
+    if args.batch_size <= 0 or args.workers <= 0 or args.max_pixels <= 0:
+        parser.error('--batch-size, --workers and --max-pixels must be positive')
+    if args.top_k is not None and not 1 <= args.top_k <= 38:
+        parser.error('--top-k must be between 1 and 38')
+    if not os.path.exists(args.input):
+        parser.error(f'input not found: {args.input}')
+
+    paths = find_images(args.input)
+    if not paths:
+        parser.error(f'no images found in {args.input}')
+
+    summary = classify_images(paths, args.output, args.batch_size, args.workers, args.top_k,
+                              max_pixels=args.max_pixels)
+
+    print(f"Classified {summary['images']} images in {summary['seconds']:.2f} s "
+          f"({summary['images_per_sec']:,.1f} images/sec, {summary['errors']} unreadable)")
+    print(f"  {'stage':<12}{'seconds':>10}{'images/sec':>14}")
+    for name, stage in summary['stages'].items():
+        print(f"  {name:<12}{stage['seconds']:>10.2f}{stage['images_per_sec']:>14,.1f}")
+    print(f"  (decode is CPU time summed over {summary['workers']} workers; decode_wait is time the "
+          f"model waited for images)")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
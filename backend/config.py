@@ -8,12 +8,121 @@ class Config:
     MODELS_DIR = os.path.join(BASE_DIR, 'models')
     CROP_MODEL_H5 = os.path.join(MODELS_DIR, 'best_finetuned_model.h5')
     CROP_MODEL_PKL = os.path.join(MODELS_DIR, 'crop_disease_model_finetuned.pkl')
-    SOIL_HEALTH_MODEL = os.path.join(MODELS_DIR, 'soil_health_regression.pkl')
-    SOIL_DISEASE_MODEL = os.path.join(MODELS_DIR, 'soil_disease_risk.pkl')
+    SOIL_HEALTH_MODEL = os.environ.get('SOIL_HEALTH_MODEL', os.path.join(MODELS_DIR, 'soil_health_regression.pkl'))
+    SOIL_DISEASE_MODEL = os.environ.get('SOIL_DISEASE_MODEL', os.path.join(MODELS_DIR, 'soil_disease_risk.pkl'))
     LABEL_ENCODERS = os.path.join(MODELS_DIR, 'soil_label_encoders.pkl')
     
+    # Soil scoring bands (edit the JSON to retune, no code change needed)
+    SOIL_SCORING_RULES = os.environ.get(
+        'SOIL_SCORING_RULES',
+        os.path.join(BASE_DIR, 'rules', 'soil_scoring_rules.json')
+    )
+    
+    # Model loading: models load lazily on first use; warmup loads them in a
+    # background thread at startup. Set ENABLE_CROP_MODEL=0 for a soil-only
+    # deployment that never loads the crop model or its image libraries.
+    MODEL_WARMUP = os.environ.get('MODEL_WARMUP', '1') != '0'
+    CROP_MODEL_ENABLED = os.environ.get('ENABLE_CROP_MODEL', '1') != '0'
+    
+    # Sharing model memory between gunicorn workers (see gunicorn.conf.py):
+    # MODEL_PRELOAD=1 loads all models once in the master before it forks, so
+    # workers share the pages copy-on-write. MODEL_MMAP=1 loads the soil models
+    # from memory-mapped joblib copies, so workers share them via the page cache.
+    MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', '0') == '1'
+    MODEL_MMAP = os.environ.get('MODEL_MMAP', '0') == '1'
+    MODEL_MMAP_DIR = os.environ.get('MODEL_MMAP_DIR', os.path.join(MODELS_DIR, 'mmap'))
+    
     # Image processing
     IMAGE_SIZE = (224, 224)  # Model input size
+    IMAGE_RESIZE_FILTER = 'BICUBIC'  # Name of a PIL.Image.Resampling filter
+    IMAGE_REDUCING_GAP = 3.0  # Pre-shrink with Image.reduce() before resampling (None = off)
+    IMAGE_DRAFT_DECODE = True  # Let the JPEG decoder downscale during decode
+    
+    # Upload limits, enforced before decoding. Requests over MAX_CONTENT_LENGTH
+    # are refused from their Content-Length before the body is read
+    MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+    MAX_CONTENT_LENGTH = MAX_UPLOAD_BYTES + 1024 * 1024  # Room for soilData and multipart overhead
+    MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 25_000_000))  # ~25 MP, checked from the header
+    ALLOWED_IMAGE_FORMATS = ('JPEG', 'PNG', 'WEBP')  # Sniffed from the leading bytes
+    # classify_images.py reads trusted local files (e.g. 48 MP field photos);
+    # kept under Pillow's own hard limit of 2x its MAX_IMAGE_PIXELS (~179 MP)
+    CLI_MAX_IMAGE_PIXELS = int(os.environ.get('CLI_MAX_IMAGE_PIXELS', 150_000_000))
+    
+    # Crop inference backend: 'mock' (no model file), 'keras' (the float32 .h5
+    # through TensorFlow) or 'tflite' (the .h5 converted once to a quantized
+    # TFLite file next to it, or CROP_MODEL_TFLITE, run by the TFLite runtime).
+    # int8 calibrates on the images in CROP_CALIBRATION_DIR. Intra-op threads
+    # per worker default to the cores divided among the gunicorn workers
+    CROP_INFERENCE_BACKEND = os.environ.get('CROP_INFERENCE_BACKEND', 'mock')
+    CROP_TFLITE_QUANTIZATION = os.environ.get('CROP_TFLITE_QUANTIZATION', 'float16')  # 'none', 'float16' or 'int8'
+    CROP_MODEL_TFLITE = os.environ.get('CROP_MODEL_TFLITE')
+    CROP_CALIBRATION_DIR = os.environ.get('CROP_CALIBRATION_DIR', os.path.join(MODELS_DIR, 'calibration'))
+    CROP_CALIBRATION_IMAGES = 200
+    CROP_INFERENCE_THREADS = int(os.environ.get(
+        'CROP_INFERENCE_THREADS',
+        max(1, (os.cpu_count() or 1) // int(os.environ.get('WEB_CONCURRENCY', 4)))
+    ))
+    
+    # Crop disease micro-batching (concurrent requests share one forward pass;
+    # keras/tflite backends only)
+    CROP_BATCHING_ENABLED = True
+    CROP_BATCH_MAX_SIZE = 8
+    CROP_BATCH_MAX_WAIT_MS = 10.0
+    
+    # Thread pools for the concurrent image / soil halves of /api/predict/integrated
+    INTEGRATED_IMAGE_WORKERS = 4
+    INTEGRATED_SOIL_WORKERS = 2
+    
+    # What-if sweeps (/api/predict/soil-health/sweep): grid size limits
+    SOIL_SWEEP_MAX_STEPS = 200  # Values per swept parameter
+    SOIL_SWEEP_MAX_POINTS = 250000  # Grid points per request (x 14 float64 features)
+    
+    # Crop prediction cache, keyed by a digest of the raw upload bytes
+    PREDICTION_CACHE_ENABLED = True
+    PREDICTION_CACHE_SIZE = 1024  # Max cached predictions (LRU)
+    PREDICTION_CACHE_TTL_SECONDS = 3600
+    
+    # Near-duplicate photos (same leaf, slightly different crop or exposure) reuse
+    # the prediction of an earlier upload within this many differing dHash bits.
+    # Opt-in: a reused diagnosis is marked with near_duplicate_of in responses.
+    # Distance 2 is the largest with no wrong-leaf matches in bench_near_duplicates
+    NEAR_DUPLICATE_ENABLED = os.environ.get('NEAR_DUPLICATE_ENABLED', '0') != '0'
+    NEAR_DUPLICATE_MAX_DISTANCE = int(os.environ.get('NEAR_DUPLICATE_MAX_DISTANCE', 2))  # of 64 bits
+    NEAR_DUPLICATE_MAX_ENTRIES = 1000000  # Oldest quarter dropped beyond this
+    
+    # Weather proxy (/api/weather): Open-Meteo lookups cached per grid cell
+    OPEN_METEO_URL = os.environ.get('OPEN_METEO_URL', 'https://api.open-meteo.com/v1/forecast')
+    WEATHER_TIMEOUT_SECONDS = 3.0  # Upstream timeout before falling back to the estimate
+    WEATHER_CELL_DEGREES = 0.05  # Cache grid (~5 km); nearby points share a lookup
+    WEATHER_CACHE_TTL_SECONDS = 600
+    WEATHER_FAILURE_TTL_SECONDS = 60  # How long a failed cell is served from the estimate
+    WEATHER_CACHE_SIZE = 4096
+    WEATHER_POOL_SIZE = 16  # Pooled upstream connections
+    
+    # Location-derived soil priors (/api/soil/location), memory-mapped 1x1 degree tiles
+    SOIL_TILE_DIR = os.environ.get('SOIL_TILE_DIR', os.path.join(BASE_DIR, 'tiles', 'soil'))
+    SOIL_TILE_CELLS_PER_DEGREE = 100  # 0.01 degree (~1 km) cells
+    SOIL_TILE_MAX_OPEN = 256  # Tiles kept mapped per process
+    
+    # Assessment history (MRV): soil and integrated results are appended to a
+    # SQLite database in WAL mode by a background writer, in batches
+    ASSESSMENT_STORE_ENABLED = os.environ.get('ASSESSMENT_STORE_ENABLED', '1') != '0'
+    ASSESSMENT_DB_PATH = os.environ.get('ASSESSMENT_DB_PATH', os.path.join(BASE_DIR, 'data', 'assessments.db'))
+    ASSESSMENT_BATCH_SIZE = 256  # Rows per write transaction
+    ASSESSMENT_FLUSH_INTERVAL_MS = 500.0  # Max time a result waits before being written
+    ASSESSMENT_QUEUE_SIZE = 10000  # Results beyond this are dropped instead of blocking requests
+    
+    # Spatial index of scored samples for /api/map/aggregate. With the assessment
+    # store enabled it is filled from the history (shared by all workers)
+    SPATIAL_INDEX_ENABLED = True
+    SPATIAL_INDEX_REFRESH_SECONDS = 1.0  # Min time between reads of new history rows
+    SPATIAL_SYNC_MAX_ROWS = 10000  # New history rows one map request may read
+    SPATIAL_INDEX_BUILD_PAGE_ROWS = 100000  # Rows per read when the index is built at worker start
+    SPATIAL_INDEX_MERGE_THRESHOLD = 50000  # Buffered points before re-sorting the index
+    SPATIAL_DEFAULT_CELLS = 32  # Cells across the box when no zoom is given
+    
+    # Observability: per-stage timings in a Server-Timing header, histograms on /metrics
+    SERVER_TIMING_ENABLED = True
     
     # CORS settings
     CORS_ORIGINS = ["http://localhost:3000", "http://localhost:3001"]
\ No newline at end of file
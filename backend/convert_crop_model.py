@@ -0,0 +1,42 @@
+"""
+Convert the Keras crop disease model to TFLite for the 'tflite' backend
+
+Run once before starting the server (and again whenever the .h5 changes):
+conversion needs TensorFlow, while the workers then only need a TFLite
+runtime. The file is written where load_crop_backend looks for it
+(Config.CROP_MODEL_TFLITE, or best_finetuned_model.<quantization>.tflite).
+
+Usage (from the backend directory):
+    python convert_crop_model.py                        # CROP_TFLITE_QUANTIZATION (float16)
+    python convert_crop_model.py --quantization int8 --calibration photos/
+"""
+import argparse
+import os
+import time
+
+from config import Config
+from utils.crop_backends import TFLITE_QUANTIZATIONS, calibration_images, convert_to_tflite, tflite_path_for
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=Config.CROP_MODEL_H5, help='Keras .h5 model')
+    parser.add_argument('--quantization', choices=TFLITE_QUANTIZATIONS, default=Config.CROP_TFLITE_QUANTIZATION)
+    parser.add_argument('--output', default=None, help='TFLite file (default: next to the .h5)')
+    parser.add_argument('--calibration', default=Config.CROP_CALIBRATION_DIR,
+                        help='leaf photos for int8 calibration')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        parser.error(f'model not found: {args.model}')
+    output = args.output or Config.CROP_MODEL_TFLITE or tflite_path_for(args.model, args.quantization)
+    calibration = calibration_images(args.calibration) if args.quantization == 'int8' else None
+
+    print(f"Converting {args.model} to TFLite ({args.quantization})...")
+    start = time.perf_counter()
+    convert_to_tflite(args.model, output, args.quantization, calibration)
+    print(f"Wrote {output} ({os.path.getsize(output) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+Gunicorn settings for AgriSense-MRV (picked up automatically from this directory)
+
+    gunicorn -w 4 app:app
+
+The app is preloaded in the master process: models are loaded once before
+forking and shared copy-on-write by all workers, so memory does not grow with
+the worker count. Set MODEL_PRELOAD=0 to load models separately per worker.
+
+Request handling is thread-safe (crop prediction uses per-call random
+generators), so each worker serves GUNICORN_THREADS requests concurrently.
+"""
+import os
+
+# Must be set before the app (and config) is imported by the master
+os.environ.setdefault('MODEL_PRELOAD', '1')
+
+preload_app = os.environ['MODEL_PRELOAD'] == '1'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '4'))
+
+# Threaded workers (gthread); concurrent requests also feed the crop micro-batcher
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+
+def post_worker_init(worker):
+    """Build the map's spatial index in each worker (threads do not survive fork)"""
+    import app
+    app.start_spatial_index_build()
@@ -0,0 +1,218 @@
+"""
+Offline bulk scoring for soil survey files
+
+Streams a CSV with the prepare_soil_data columns (Temparature, Nitrogen,
+EC_dS_m, ...) in fixed-size chunks through the vectorized soil health and
+disease risk scorers and appends the results to a CSV or NPY file, so memory
+use does not grow with the size of the survey.
+
+With --history the scored rows are also appended to the assessment history
+database, which is where the map aggregation (/api/map/aggregate) picks up
+bulk-loaded surveys.
+
+Usage (from the backend directory):
+    python score_survey.py survey.csv scores.csv
+    python score_survey.py survey.csv scores.npy --chunk-size 100000
+    python score_survey.py survey.csv scores.csv --history data/assessments.db
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.assessment_store import AssessmentStore
+from utils.model_loader import ModelManager
+from utils.preprocessor import SOIL_FEATURE_COLUMNS, classify_health_batch
+from utils.scoring_rules import RISK_CLASSES
+
+DEFAULT_CHUNK_ROWS = 50000
+
+# One record per scored survey row (NPY output)
+RESULT_DTYPE = np.dtype([
+    ('row', '<i8'),
+    ('health_score', '<f8'),
+    ('risk_idx', '<i1'),
+    ('prob_low', '<f8'),
+    ('prob_medium', '<f8'),
+    ('prob_high', '<f8')
+])
+
+
+class CsvResultWriter:
+    """Appends scored chunks to a CSV file"""
+
+    def __init__(self, path, id_column=None):
+        self.path = path
+        self.id_column = id_column
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.header_written = False
+
+    def write(self, first_row, scores, ids=None):
+        health_scores = scores['health_scores']
+        probs = scores['risk_probabilities']
+        frame = pd.DataFrame({
+            'row': np.arange(first_row, first_row + len(health_scores)),
+            'health_score': np.round(health_scores, 2),
+            'health_class': classify_health_batch(health_scores),
+            'risk_class': scores['risk_classes'],
+            'prob_low': probs[:, 0],
+            'prob_medium': probs[:, 1],
+            'prob_high': probs[:, 2]
+        })
+        if ids is not None:
+            frame.insert(1, self.id_column, ids)
+
+        frame.to_csv(self.file, header=not self.header_written, index=False)
+        self.header_written = True
+
+    def close(self):
+        self.file.close()
+
+
+class NpyResultWriter:
+    """
+    Appends scored chunks to a structured .npy file
+    The header reserves room for any row count and is rewritten on close
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.file = open(path, 'wb')
+        self.header_size = len(self._header(10 ** 18, pad_to=None))
+        self.file.write(self._header(0, pad_to=self.header_size))
+
+    def _header(self, rows, pad_to):
+        header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (
+            np.lib.format.dtype_to_descr(RESULT_DTYPE), rows
+        )
+        prefix = b'\x93NUMPY\x01\x00'
+        if pad_to is None:
+            # Pad so the data starts on a 64-byte boundary
+            total = len(prefix) + 2 + len(header) + 1
+            pad_to = -(-total // 64) * 64
+        header += ' ' * (pad_to - len(prefix) - 2 - len(header) - 1) + '\n'
+        return prefix + len(header).to_bytes(2, 'little') + header.encode('latin1')
+
+    def write(self, first_row, scores, ids=None):
+        records = np.empty(len(scores['health_scores']), dtype=RESULT_DTYPE)
+        records['row'] = np.arange(first_row, first_row + len(records))
+        records['health_score'] = scores['health_scores']
+        records['risk_idx'] = scores['risk_idx']
+        records['prob_low'] = scores['risk_probabilities'][:, 0]
+        records['prob_medium'] = scores['risk_probabilities'][:, 1]
+        records['prob_high'] = scores['risk_probabilities'][:, 2]
+
+        self.file.write(records.tobytes())
+        self.rows += len(records)
+
+    def close(self):
+        self.file.seek(0)
+        self.file.write(self._header(self.rows, pad_to=self.header_size))
+        self.file.close()
+
+
+def iter_feature_chunks(path, chunk_size, id_column=None):
+    """Yield (feature matrix, ids) chunks of at most chunk_size rows"""
+    wanted = set(SOIL_FEATURE_COLUMNS)
+    if id_column:
+        wanted.add(id_column)
+
+    reader = pd.read_csv(
+        path,
+        usecols=lambda column: column in wanted,
+        dtype={column: np.float64 for column in SOIL_FEATURE_COLUMNS},
+        chunksize=chunk_size
+    )
+    with reader:
+        for chunk in reader:
+            missing = [column for column in SOIL_FEATURE_COLUMNS if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"Survey file is missing columns: {', '.join(missing)}")
+            if id_column and id_column not in chunk.columns:
+                raise ValueError(f"Survey file has no '{id_column}' column")
+
+            features = chunk[list(SOIL_FEATURE_COLUMNS)].to_numpy(dtype=np.float64)
+            ids = chunk[id_column].to_numpy() if id_column else None
+            yield features, ids
+
+
+def score_survey(input_path, output_path, chunk_size=DEFAULT_CHUNK_ROWS, id_column=None, model_manager=None,
+                 history_path=None):
+    """
+    Score a survey CSV chunk by chunk
+    history_path: optional assessment database to also append the scored locations to
+    Returns: dict with rows, seconds and rows_per_sec
+    """
+    if model_manager is None:
+        model_manager = ModelManager()
+
+    if output_path.lower().endswith('.npy'):
+        if id_column:
+            raise ValueError("--id-column is only supported for CSV output")
+        writer = NpyResultWriter(output_path)
+    else:
+        writer = CsvResultWriter(output_path, id_column)
+
+    history = AssessmentStore(history_path) if history_path else None
+    latitude = SOIL_FEATURE_COLUMNS.index('Latitude')
+    longitude = SOIL_FEATURE_COLUMNS.index('Longitude')
+
+    rows = 0
+    score_seconds = 0.0
+    start = time.perf_counter()
+    try:
+        for features, ids in iter_feature_chunks(input_path, chunk_size, id_column):
+            chunk_start = time.perf_counter()
+            scores = model_manager.score_soil_batch(features)
+            score_seconds += time.perf_counter() - chunk_start
+
+            writer.write(rows, scores, ids)
+            if history is not None:
+                history.insert_scored('survey', features[:, latitude], features[:, longitude],
+                                      scores['health_scores'], scores['risk_classes'])
+            rows += len(features)
+            print(f"  scored {rows} rows", file=sys.stderr)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'seconds': elapsed,
+        'score_seconds': score_seconds,
+        'rows_per_sec': rows / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a soil survey CSV for soil health and disease risk')
+    parser.add_argument('input', help='survey CSV with the prepare_soil_data columns')
+    parser.add_argument('output', help='output file (.csv or .npy)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'rows per chunk (default: {DEFAULT_CHUNK_ROWS})')
+    parser.add_argument('--id-column', help='input column copied to the CSV output, e.g. a plot id')
+    parser.add_argument('--history', metavar='DB', help='also append the scored locations to this assessment database')
+    args = parser.parse_args(argv)
+
+    if args.chunk_size <= 0:
+        parser.error('--chunk-size must be positive')
+    if not os.path.exists(args.input):
+        parser.error(f'input file not found: {args.input}')
+
+    summary = score_survey(args.input, args.output, args.chunk_size, args.id_column, history_path=args.history)
+
+    print(f"Scored {summary['rows']} rows in {summary['seconds']:.2f} s "
+          f"({summary['rows_per_sec']:,.0f} rows/sec, scoring {summary['score_seconds']:.2f} s)")
+    print(f"Results written to {args.output}")
+    if args.history:
+        print(f"Locations appended to {args.history}")
+    if args.output.lower().endswith('.npy'):
+        print(f"Risk classes (risk_idx): {', '.join(f'{i}={name}' for i, name in enumerate(RISK_CLASSES))}")
+
+
+if __name__ == '__main__':
+    main()
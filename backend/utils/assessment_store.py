@@ -0,0 +1,267 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# One row per soil or integrated assessment
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    endpoint TEXT NOT NULL,
+    field_id TEXT,
+    latitude REAL,
+    longitude REAL,
+    health_score REAL,
+    health_class TEXT,
+    risk_class TEXT,
+    prob_low REAL,
+    prob_medium REAL,
+    prob_high REAL,
+    crop_class TEXT,
+    crop_confidence REAL,
+    inputs TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_assessments_field_time ON assessments (field_id, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_assessments_time ON assessments (recorded_at);
+"""
+
+COLUMNS = (
+    'recorded_at', 'endpoint', 'field_id', 'latitude', 'longitude', 'health_score', 'health_class',
+    'risk_class', 'prob_low', 'prob_medium', 'prob_high', 'crop_class', 'crop_confidence', 'inputs'
+)
+_INSERT = f"INSERT INTO assessments ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def field_key(inputs):
+    """
+    Field an assessment belongs to: the client's field_id, or else the
+    sample's coordinates rounded to 4 decimals (~11 m); None without either
+    """
+    field_id = inputs.get('field_id')
+    if field_id not in (None, ''):
+        return str(field_id)
+    try:
+        return f"{float(inputs['latitude']):.4f},{float(inputs['longitude']):.4f}"
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _float_or_none(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class AssessmentStore:
+    """
+    Append-only history of assessments in SQLite (WAL mode)
+
+    record() only puts the result on a queue, so the request path never
+    touches the database. A background thread drains the queue and writes
+    rows in batches of up to batch_size, one transaction per batch, at least
+    every flush_interval_ms. When the queue is full new records are dropped
+    (and counted) rather than blocking requests.
+    """
+
+    def __init__(self, path, batch_size=256, flush_interval_ms=500.0, max_queue=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_queue = max_queue
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._schema_ready = False
+        self._readers = threading.local()
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.last_batch_ms = 0.0
+
+    def record(self, endpoint, inputs, assessment=None, crop_prediction=None, recorded_at=None):
+        """
+        Queue one assessment for writing (never blocks)
+        inputs: the raw request parameters; assessment: dict with health_score,
+        health_class and disease_risk; crop_prediction: dict with class_name and confidence
+        """
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((
+                recorded_at if recorded_at is not None else time.time(),
+                endpoint, inputs, assessment, crop_prediction
+            ))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def flush(self, timeout=10.0):
+        """Wait until everything queued so far has been written"""
+        if self._worker is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def field_history(self, field_id, since=None, until=None, limit=1000):
+        """Assessments of one field in time order (uses the field/time index)"""
+        sql = "SELECT * FROM assessments WHERE field_id = ?"
+        params = [field_id]
+        if since is not None:
+            sql += " AND recorded_at >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND recorded_at < ?"
+            params.append(until)
+        sql += " ORDER BY recorded_at LIMIT ?"
+        params.append(limit)
+
+        rows = self._reader().execute(sql, params).fetchall()
+        history = []
+        for row in rows:
+            entry = dict(row)
+            entry['inputs'] = json.loads(entry['inputs']) if entry['inputs'] else None
+            history.append(entry)
+        return history
+
+    def scored_points(self, after_id=0, limit=100000):
+        """
+        (id, latitude, longitude, health_score, risk_class) rows with a
+        location and score, in id order after after_id (for the spatial index)
+        """
+        return self._reader().execute(
+            "SELECT id, latitude, longitude, health_score, risk_class FROM assessments "
+            "WHERE id > ? AND latitude IS NOT NULL AND longitude IS NOT NULL "
+            "AND health_score IS NOT NULL AND risk_class IS NOT NULL ORDER BY id LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+
+    def insert_scored(self, endpoint, latitude, longitude, health_scores, risk_classes, recorded_at=None):
+        """
+        Write bulk-scored samples directly, in one transaction (offline loads;
+        bypasses the queue). Takes parallel sequences; returns the row count
+        """
+        recorded_at = recorded_at if recorded_at is not None else time.time()
+        rows = [
+            (recorded_at, endpoint, f"{lat:.4f},{lng:.4f}", float(lat), float(lng), float(score), None, str(risk),
+             None, None, None, None, None, None)
+            for lat, lng, score, risk in zip(latitude, longitude, health_scores, risk_classes)
+        ]
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(_INSERT, rows)
+        finally:
+            connection.close()
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'written': self.written,
+                'dropped': self.dropped,
+                'batches': self.batches,
+                'last_batch_ms': round(self.last_batch_ms, 3),
+                'path': self.path
+            }
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            connection.executescript(SCHEMA)
+            self._schema_ready = True
+        return connection
+
+    def _reader(self):
+        """Read connection per thread (WAL readers do not block the writer)"""
+        connection = getattr(self._readers, 'connection', None)
+        if connection is None or self._readers.pid != os.getpid():
+            connection = self._connect()
+            connection.row_factory = sqlite3.Row
+            self._readers.connection = connection
+            self._readers.pid = os.getpid()
+        return connection
+
+    def _ensure_worker(self):
+        # Threads do not survive fork (e.g. gunicorn preload), so restart per process
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid:
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != pid:
+                if self._worker_pid != pid:
+                    self._queue = queue.Queue(maxsize=self.max_queue)
+                self._worker = threading.Thread(target=self._run, name='assessment-writer', daemon=True)
+                self._worker_pid = pid
+                self._worker.start()
+
+    def _collect(self):
+        """Block for the first record, then gather more until full or the flush interval passes"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        connection = self._connect()
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                with connection:
+                    connection.executemany(_INSERT, [self._row(*item) for item in batch])
+                with self._lock:
+                    self.written += len(batch)
+                    self.batches += 1
+                    self.last_batch_ms = (time.perf_counter() - start) * 1000
+            except Exception as e:
+                print(f"Error writing {len(batch)} assessments: {e}")
+                with self._lock:
+                    self.dropped += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _row(recorded_at, endpoint, inputs, assessment, crop_prediction):
+        inputs = inputs if isinstance(inputs, dict) else {}
+        assessment = assessment or {}
+        disease_risk = assessment.get('disease_risk') or {}
+        probabilities = disease_risk.get('probabilities') or {}
+        crop_prediction = crop_prediction or {}
+        return (
+            recorded_at,
+            endpoint,
+            field_key(inputs),
+            _float_or_none(inputs.get('latitude')),
+            _float_or_none(inputs.get('longitude')),
+            assessment.get('health_score'),
+            assessment.get('health_class'),
+            disease_risk.get('risk_class'),
+            probabilities.get('Low'),
+            probabilities.get('Medium'),
+            probabilities.get('High'),
+            crop_prediction.get('class_name'),
+            crop_prediction.get('confidence'),
+            json.dumps(inputs, default=str)
+        )
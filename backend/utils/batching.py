@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-image predictions into batches
+    A batch is run as soon as it holds max_batch_size images or the oldest
+    image has waited max_wait_ms. predict_fn(batch, **options) receives an
+    (N, H, W, C) array and must return one result per image; images submitted
+    with different options are run as separate groups of the same batch.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=8, max_wait_ms=10.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+        self._batch_sizes = Counter()
+        self._items = 0
+
+    def submit(self, image, **options):
+        """Queue one (1, H, W, C) or (H, W, C) image; returns a Future"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((image, options, future))
+        return future
+
+    def predict(self, image, timeout=None, **options):
+        """Submit one image and wait for its result"""
+        return self.submit(image, **options).result(timeout=timeout)
+
+    def stats(self):
+        """Batch-size distribution since startup"""
+        with self._lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                'batches': batches,
+                'items': self._items,
+                'mean_batch_size': round(self._items / batches, 2) if batches else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batch_sizes': {str(size): count for size, count in sorted(self._batch_sizes.items())}
+            }
+
+    def _ensure_worker(self):
+        # Threads do not survive fork (e.g. gunicorn preload), so restart per process
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid:
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != pid:
+                if self._worker_pid != pid:
+                    self._queue = queue.Queue()
+                self._worker = threading.Thread(target=self._run, name='crop-batcher', daemon=True)
+                self._worker_pid = pid
+                self._worker.start()
+
+    def _collect(self):
+        """Block for the first item, then gather more until full or timed out"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._items += len(batch)
+
+            # Group by options so each predict_fn call sees uniform arguments
+            groups = {}
+            for image, options, future in batch:
+                key = tuple(sorted(options.items()))
+                groups.setdefault(key, []).append((image, future))
+
+            for key, entries in groups.items():
+                futures = [future for _, future in entries]
+                try:
+                    images = np.concatenate(
+                        [image if image.ndim == 4 else image[np.newaxis] for image, _ in entries]
+                    )
+                    results = self.predict_fn(images, **dict(key))
+                    if len(results) != len(futures):
+                        raise RuntimeError(f"predict_fn returned {len(results)} results for {len(futures)} images")
+                    for future, result in zip(futures, results):
+                        future.set_result(result)
+                except Exception as e:
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
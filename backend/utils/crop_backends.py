@@ -0,0 +1,237 @@
+import importlib.util
+import os
+import threading
+
+import numpy as np
+
+from config import Config
+
+CROP_BACKENDS = ('mock', 'keras', 'tflite')
+TFLITE_QUANTIZATIONS = ('none', 'float16', 'int8')
+CALIBRATION_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def configure_tensorflow_threads(threads):
+    """
+    Cap TensorFlow's intra-op pool (inter-op to 1: the model is one graph)
+    Only possible before TensorFlow runs its first op; later calls are ignored
+    """
+    import tensorflow as tf
+
+    if not threads:
+        return
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError as e:
+        print(f"✗ TensorFlow already initialized, thread settings ignored: {e}")
+
+
+def calibration_images(directory, limit=None):
+    """
+    Preprocessed (1, 224, 224, 3) images for int8 calibration, one at a time
+    Should be real leaf photos from the training distribution
+    """
+    from utils.preprocessor import load_image_pixels, normalize_image
+
+    limit = limit or Config.CROP_CALIBRATION_IMAGES
+    paths = []
+    for folder, _, files in os.walk(directory):
+        paths.extend(os.path.join(folder, name) for name in files if name.lower().endswith(CALIBRATION_EXTENSIONS))
+    if not paths:
+        raise ValueError(f"int8 quantization needs calibration images in {directory}")
+
+    for path in sorted(paths)[:limit]:
+        yield normalize_image(load_image_pixels(path))
+
+
+def convert_to_tflite(keras_path, tflite_path, quantization='float16', calibration=None):
+    """
+    Convert a Keras model to a TFLite flatbuffer
+    quantization: 'none' (float32), 'float16' (half-size weights) or 'int8'
+    (int8 weights and activations, calibrated on `calibration`, an iterable of
+    preprocessed images; float input and output are kept)
+    The file is written under a temporary name and renamed into place
+    """
+    import tensorflow as tf
+
+    if quantization not in TFLITE_QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {quantization!r}; expected one of {', '.join(TFLITE_QUANTIZATIONS)}")
+
+    model = tf.keras.models.load_model(keras_path, compile=False)
+    # The model's input keeps its dynamic batch dimension in the TFLite file
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization != 'none':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        if calibration is None:
+            calibration = calibration_images(Config.CROP_CALIBRATION_DIR)
+        width, height = Config.IMAGE_SIZE
+        samples = [np.asarray(image, dtype=np.float32).reshape(1, height, width, 3) for image in calibration]
+        converter.representative_dataset = lambda: ([sample] for sample in samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    flatbuffer = converter.convert()
+
+    os.makedirs(os.path.dirname(os.path.abspath(tflite_path)), exist_ok=True)
+    tmp_path = f"{tflite_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(flatbuffer)
+    os.replace(tmp_path, tflite_path)
+    return tflite_path
+
+
+def _tflite_interpreter_class():
+    """The lightest available TFLite runtime: LiteRT, tflite-runtime, then TensorFlow"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+class KerasCropBackend:
+    """
+    The float32 Keras model, run through TensorFlow
+
+    TensorFlow is imported and the model built lazily per process, on the
+    first predict: TensorFlow's runtime threads do not survive fork, so none
+    of it may exist yet in a gunicorn master that preloads the app. Loading
+    only checks that TensorFlow is installed and the model file exists.
+    """
+
+    name = 'keras'
+
+    def __init__(self, model_path, threads=None):
+        if importlib.util.find_spec('tensorflow') is None:
+            raise ImportError("The keras crop backend needs TensorFlow installed")
+        self.model_path = model_path
+        self.threads = threads
+        self.size_bytes = os.path.getsize(model_path)
+        self._model = None
+        self._forward = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        import tensorflow as tf
+
+        configure_tensorflow_threads(self.threads)
+        model = tf.keras.models.load_model(self.model_path, compile=False)
+        # Traced once per batch size instead of dispatching every layer eagerly
+        self._forward = tf.function(lambda images: model(images, training=False), reduce_retracing=True)
+        self._model = model
+        self._pid = os.getpid()
+
+    def predict(self, images):
+        """(N, 224, 224, 3) preprocessed images -> (N, classes) float32 probabilities"""
+        images = np.asarray(images, dtype=np.float32)
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._load()
+        return np.asarray(self._forward(images), dtype=np.float32)
+
+
+class TFLiteCropBackend:
+    """
+    A converted (optionally quantized) TFLite model run by the TFLite
+    interpreter with num_threads intra-op threads; needs neither TensorFlow
+    nor Keras once the .tflite file exists
+
+    The runtime is imported and the interpreter created lazily per process,
+    on the first predict, so nothing of it exists in a gunicorn master that
+    preloads the app. The interpreter is not thread-safe, so
+    calls are serialized; the micro-batcher already funnels requests into
+    batched calls. The input tensor is resized only when the batch size changes.
+    """
+
+    name = 'tflite'
+
+    def __init__(self, model_path, threads=None):
+        self.model_path = model_path
+        self.threads = threads
+        self.size_bytes = os.path.getsize(model_path)
+        self._interpreter = None
+        self._pid = None
+        self._batch_size = None
+        self._lock = threading.Lock()
+
+    def _prepare(self, batch_size):
+        if self._interpreter is None or self._pid != os.getpid():
+            interpreter_class = _tflite_interpreter_class()
+            self._interpreter = interpreter_class(model_path=self.model_path, num_threads=self.threads or None)
+            self._pid = os.getpid()
+            self._batch_size = None
+        if batch_size != self._batch_size:
+            input_index = self._interpreter.get_input_details()[0]['index']
+            width, height = Config.IMAGE_SIZE
+            self._interpreter.resize_tensor_input(input_index, [batch_size, height, width, 3])
+            self._interpreter.allocate_tensors()
+            self._input = self._interpreter.get_input_details()[0]
+            self._output = self._interpreter.get_output_details()[0]
+            self._batch_size = batch_size
+
+    def predict(self, images):
+        """(N, 224, 224, 3) preprocessed images -> (N, classes) float32 probabilities"""
+        images = np.asarray(images, dtype=np.float32)
+        with self._lock:
+            self._prepare(len(images))
+            dtype = self._input['dtype']
+            if dtype != np.float32:
+                # Fully quantized input: map floats onto the input's integer scale
+                scale, zero_point = self._input['quantization']
+                info = np.iinfo(dtype)
+                images = np.clip(np.round(images / scale + zero_point), info.min, info.max).astype(dtype)
+            self._interpreter.set_tensor(self._input['index'], images)
+            self._interpreter.invoke()
+            scores = self._interpreter.get_tensor(self._output['index'])
+
+        if scores.dtype != np.float32:
+            scale, zero_point = self._output['quantization']
+            scores = (scores.astype(np.float32) - zero_point) * scale
+        return scores
+
+
+def tflite_path_for(keras_path, quantization):
+    """Default converted-model path next to the Keras model"""
+    return f"{os.path.splitext(keras_path)[0]}.{quantization}.tflite"
+
+
+def load_crop_backend(backend=None, keras_path=None, tflite_path=None, quantization=None, threads=None):
+    """
+    Crop inference backend selected by Config.CROP_INFERENCE_BACKEND
+    'mock' returns None (ModelManager keeps its mock predictions); 'tflite'
+    needs the file written by convert_crop_model.py. Nothing is converted or
+    run here, so this is safe in a gunicorn master before fork
+    """
+    backend = backend or Config.CROP_INFERENCE_BACKEND
+    keras_path = keras_path or Config.CROP_MODEL_H5
+    quantization = quantization or Config.CROP_TFLITE_QUANTIZATION
+    threads = Config.CROP_INFERENCE_THREADS if threads is None else threads
+
+    if backend not in CROP_BACKENDS:
+        raise ValueError(f"Unknown crop inference backend {backend!r}; expected one of {', '.join(CROP_BACKENDS)}")
+    if backend == 'mock':
+        return None
+    if backend == 'keras':
+        return KerasCropBackend(keras_path, threads)
+
+    tflite_path = tflite_path or Config.CROP_MODEL_TFLITE or tflite_path_for(keras_path, quantization)
+    if not os.path.exists(tflite_path):
+        raise FileNotFoundError(
+            f"{tflite_path} not found; convert the model first: "
+            f"python convert_crop_model.py --quantization {quantization}"
+        )
+    if os.path.exists(keras_path) and os.path.getmtime(tflite_path) < os.path.getmtime(keras_path):
+        print(f"✗ {os.path.basename(tflite_path)} is older than {os.path.basename(keras_path)}; "
+              f"rerun convert_crop_model.py")
+    return TFLiteCropBackend(tflite_path, threads)
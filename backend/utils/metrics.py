@@ -0,0 +1,135 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in milliseconds
+DEFAULT_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Stage timings of the request being handled: list of (stage, ms), or None
+# outside a request. Executor threads see it when run under copy_context()
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class Histogram:
+    """Thread-safe cumulative latency histogram (milliseconds)"""
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)  # last slot is +Inf
+        self._sum_ms = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        slot = bisect.bisect_left(self.buckets_ms, ms)
+        with self._lock:
+            self._counts[slot] += 1
+            self._sum_ms += ms
+            self._count += 1
+
+    def snapshot(self):
+        """(cumulative bucket counts incl. +Inf, sum_ms, count)"""
+        with self._lock:
+            counts = list(self._counts)
+            sum_ms, count = self._sum_ms, self._count
+        cumulative, total = [], 0
+        for n in counts:
+            total += n
+            cumulative.append(total)
+        return cumulative, sum_ms, count
+
+
+class Metrics:
+    """Latency histograms per processing stage and per endpoint"""
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._stages = {}
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, table, key):
+        histogram = table.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(key, Histogram(self.buckets_ms))
+        return histogram
+
+    def observe_stage(self, stage, ms):
+        self._histogram(self._stages, stage).observe(ms)
+
+    def observe_request(self, endpoint, status, ms):
+        self._histogram(self._requests, (endpoint, str(status))).observe(ms)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as stage `name`, for the histograms and the current request"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.observe_stage(name, ms)
+            timings = _request_timings.get()
+            if timings is not None:
+                timings.append((name, ms))
+
+    def render(self, gauges=None):
+        """
+        Prometheus text exposition of all histograms (in seconds)
+        gauges: optional {metric name: value} added as untyped samples
+        """
+        lines = []
+        lines += self._render_family(
+            'agrisense_stage_duration_seconds', 'Duration of request processing stages',
+            {(('stage', stage),): h for stage, h in sorted(self._stages.items())}
+        )
+        lines += self._render_family(
+            'agrisense_request_duration_seconds', 'Duration of HTTP requests',
+            {(('endpoint', endpoint), ('status', status)): h
+             for (endpoint, status), h in sorted(self._requests.items())}
+        )
+        for name, value in (gauges or {}).items():
+            lines.append(f"{name} {float(value):g}")
+        return '\n'.join(lines) + '\n'
+
+    def _render_family(self, name, help_text, histograms):
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for labels, histogram in histograms.items():
+            label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+            cumulative, sum_ms, count = histogram.snapshot()
+            bounds = [f"{b / 1000:g}" for b in histogram.buckets_ms] + ['+Inf']
+            for bound, n in zip(bounds, cumulative):
+                lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {n}')
+            lines.append(f"{name}_sum{{{label_text}}} {sum_ms / 1000:.6f}")
+            lines.append(f"{name}_count{{{label_text}}} {count}")
+        return lines
+
+
+def start_request_timings():
+    """Begin collecting stage timings for the request handled in this context"""
+    _request_timings.set([])
+
+
+def request_timings():
+    """Stage timings of the current request as (stage, ms) pairs"""
+    return _request_timings.get() or []
+
+
+def server_timing_header(timings, total_ms=None):
+    """
+    Server-Timing header value; repeated stages are summed
+    e.g. 'preprocess_image;dur=4.21, crop_predict;dur=1.05, total;dur=6.80'
+    """
+    merged = {}
+    for name, ms in timings:
+        merged[name] = merged.get(name, 0.0) + ms
+    if total_ms is not None:
+        merged['total'] = total_ms
+    return ', '.join(f"{name};dur={ms:.2f}" for name, ms in merged.items())
+
+
+# Process-wide registry used by the app
+metrics = Metrics()
@@ -1,23 +1,77 @@
+import hashlib
+import logging
+import os
 import pickle
+import sys
+import threading
+import time
 import numpy as np
-import pandas as pd
 import random
 from config import Config
+from utils.preprocessor import SOIL_FEATURE_COLUMNS, SoilSample, classify_health
+from utils.scoring_rules import RISK_CLASSES, load_scoring_rules
 import warnings
 
 # Suppress warnings
 warnings.filterwarnings('ignore', category=UserWarning)
 
-# Try to import XGBoost
-try:
-    import xgboost as xgb
-    XGBOOST_AVAILABLE = True
-except ImportError:
-    XGBOOST_AVAILABLE = False
+logger = logging.getLogger(__name__)
+
+# Crop disease classes (PlantVillage), indexed by class_idx
+CROP_CLASS_NAMES = (
+    'Apple___Apple_scab', 'Apple___Black_rot', 'Apple___Cedar_apple_rust', 'Apple___healthy',
+    'Blueberry___healthy',
+    'Cherry_(including_sour)___Powdery_mildew', 'Cherry_(including_sour)___healthy',
+    'Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot', 'Corn_(maize)___Common_rust_',
+    'Corn_(maize)___Northern_Leaf_Blight', 'Corn_(maize)___healthy',
+    'Grape___Black_rot', 'Grape___Esca_(Black_Measles)', 'Grape___Leaf_blight_(Isariopsis_Leaf_Spot)',
+    'Grape___healthy',
+    'Orange___Haunglongbing_(Citrus_greening)',
+    'Peach___Bacterial_spot', 'Peach___healthy',
+    'Pepper,_bell___Bacterial_spot', 'Pepper,_bell___healthy',
+    'Potato___Early_blight', 'Potato___Late_blight', 'Potato___healthy',
+    'Raspberry___healthy',
+    'Soybean___healthy',
+    'Squash___Powdery_mildew',
+    'Strawberry___Leaf_scorch', 'Strawberry___healthy',
+    'Tomato___Bacterial_spot', 'Tomato___Early_blight', 'Tomato___Late_blight', 'Tomato___Leaf_Mold',
+    'Tomato___Septoria_leaf_spot', 'Tomato___Spider_mites Two-spotted_spider_mite', 'Tomato___Target_Spot',
+    'Tomato___Tomato_Yellow_Leaf_Curl_Virus', 'Tomato___Tomato_mosaic_virus', 'Tomato___healthy'
+)
+
+# Models that scoring cannot work without (load errors are raised, not swallowed)
+REQUIRED_MODELS = ('scoring_rules',)
+
+
+class CropModelUnavailable(Exception):
+    """The configured crop inference backend failed to load (answered with 503)"""
+
+
+def load_memory_mapped(path):
+    """
+    Load a pickled model with its numpy arrays memory-mapped read-only
+    The pickle is converted once to a joblib file in Config.MODEL_MMAP_DIR;
+    every worker then maps the same file, so the weights live once in the
+    page cache instead of once per process
+    """
+    import joblib
+    
+    mmap_path = os.path.join(Config.MODEL_MMAP_DIR, os.path.basename(path) + '.joblib')
+    if not os.path.exists(mmap_path) or os.path.getmtime(mmap_path) < os.path.getmtime(path):
+        with open(path, 'rb') as f:
+            model = pickle.load(f)
+        os.makedirs(Config.MODEL_MMAP_DIR, exist_ok=True)
+        # Write under a per-process name, then rename, so concurrent workers never see a partial file
+        tmp_path = f"{mmap_path}.{os.getpid()}.tmp"
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, mmap_path)
+    
+    return joblib.load(mmap_path, mmap_mode='r')
+
 
 class ModelManager:
-    def __init__(self):
-        print("Loading models...")
+    def __init__(self, crop_enabled=None):
+        print("Initializing models (loaded on first use or by warmup)...")
         
         # Hardcoded disease list with realistic distribution
         self.disease_pool = [
@@ -59,288 +113,381 @@ class ModelManager:
             {'name': 'Strawberry___Leaf_scorch', 'confidence': 0.81},
         ]
         
-        # Try to load real soil models (keep these working)
+        # Soil-only deployments never load the crop model (or its libraries)
+        self.crop_enabled = Config.CROP_MODEL_ENABLED if crop_enabled is None else crop_enabled
+        
+        # Lazily loaded models: name -> loaded object, plus load status/timings
+        self.model_names = ['scoring_rules', 'soil_health_model', 'soil_disease_model']
+        if self.crop_enabled:
+            self.model_names.append('crop_model')
+        self._models = {}
+        self._model_status = {name: {'status': 'not_loaded'} for name in self.model_names}
+        self._model_locks = {name: threading.Lock() for name in self.model_names}
+        self._warmup_thread = None
+        self._warmup_started = False
+        self._warmup_ms = None
+    
+    @property
+    def scoring_rules(self):
+        """Soil scoring bands, compiled once into breakpoint lookups"""
+        return self._get_model('scoring_rules')
+    
+    @property
+    def soil_health_model(self):
+        return self._get_model('soil_health_model')
+    
+    @property
+    def soil_disease_model(self):
+        return self._get_model('soil_disease_model')
+    
+    def _get_model(self, name):
+        """Return a model, loading it (once, thread-safely) on first use"""
         try:
-            with open(Config.SOIL_HEALTH_MODEL, 'rb') as f:
-                self.soil_health_model = pickle.load(f)
-            print("✓ Soil health model loaded successfully")
-        except Exception as e:
-            print(f"✗ Error loading soil health model: {e}")
-            self.soil_health_model = None
+            return self._models[name]
+        except KeyError:
+            pass
+        
+        if name not in self._model_locks:
+            raise RuntimeError(f"Model '{name}' is not enabled in this deployment")
         
+        with self._model_locks[name]:
+            if name in self._models:
+                return self._models[name]
+            
+            status = self._model_status[name]
+            status['status'] = 'loading'
+            start = time.perf_counter()
+            try:
+                model = getattr(self, f'_load_{name}')()
+                status.update(status='loaded', error=None)
+            except Exception as e:
+                status.update(status='failed', error=str(e))
+                if name in REQUIRED_MODELS:
+                    status['load_ms'] = round((time.perf_counter() - start) * 1000, 2)
+                    raise
+                model = None
+            status['load_ms'] = round((time.perf_counter() - start) * 1000, 2)
+            
+            self._models[name] = model
+            return model
+    
+    def _load_scoring_rules(self):
+        rules = load_scoring_rules(Config.SOIL_SCORING_RULES)
+        print(f"✓ Soil scoring rules v{rules.version} loaded")
+        return rules
+    
+    def _load_pickle(self, path, label):
+        # Unpickling imports sklearn / xgboost only now, when the model is needed
         try:
-            with open(Config.SOIL_DISEASE_MODEL, 'rb') as f:
-                self.soil_disease_model = pickle.load(f)
-            print("✓ Soil disease risk model loaded successfully")
+            if Config.MODEL_MMAP:
+                model = load_memory_mapped(path)
+            else:
+                with open(path, 'rb') as f:
+                    model = pickle.load(f)
+            print(f"✓ {label} loaded successfully")
+            return model
         except Exception as e:
-            print(f"✗ Error loading soil disease model: {e}")
-            self.soil_disease_model = None
+            print(f"✗ Error loading {label.lower()}: {e}")
+            raise
+    
+    def _load_soil_health_model(self):
+        return self._load_pickle(Config.SOIL_HEALTH_MODEL, 'Soil health model')
+    
+    def _load_soil_disease_model(self):
+        return self._load_pickle(Config.SOIL_DISEASE_MODEL, 'Soil disease risk model')
+    
+    def _load_crop_model(self):
+        # Imported here so soil-only deployments never touch the crop runtimes
+        from utils.crop_backends import load_crop_backend
         
-        print("✓ Mock crop disease model initialized (using random selection)")
-        print("Backend ready!")
+        backend = load_crop_backend()
+        if backend is None:
+            print("✓ Mock crop disease model initialized (using random selection)")
+            return 'mock'
+        print(f"✓ Crop disease model loaded ({backend.name}, {backend.threads or 'default'} threads, "
+              f"{backend.size_bytes / 1e6:.1f} MB)")
+        return backend
+    
+    def warmup(self):
+        """Load every enabled model now (errors are recorded in model_status)"""
+        self._warmup_started = True
+        start = time.perf_counter()
+        for name in self.model_names:
+            try:
+                self._get_model(name)
+            except Exception as e:
+                print(f"✗ Warmup failed for {name}: {e}")
+        self._warmup_ms = round((time.perf_counter() - start) * 1000, 2)
+        print(f"Warmup finished in {self._warmup_ms:.0f} ms")
     
-    def predict_crop_disease(self, processed_image):
+    def start_warmup(self):
+        """Warm up in a background thread so startup is not blocked"""
+        if self._warmup_thread is None:
+            self._warmup_started = True
+            self._warmup_thread = threading.Thread(target=self.warmup, name='model-warmup', daemon=True)
+            self._warmup_thread.start()
+        return self._warmup_thread
+    
+    def required_models(self):
+        """Models the endpoints cannot serve without"""
+        # A real crop backend that failed to load makes the crop endpoints unusable
+        if self.crop_enabled and Config.CROP_INFERENCE_BACKEND != 'mock':
+            return REQUIRED_MODELS + ('crop_model',)
+        return REQUIRED_MODELS
+    
+    def load_required(self):
+        """Load the required models now (errors are recorded in model_status)"""
+        for name in self.required_models():
+            try:
+                self._get_model(name)
+            except Exception as e:
+                print(f"✗ Loading {name} failed: {e}")
+    
+    def model_status(self):
+        """
+        Per-model load status and timings, and overall readiness
+        Required models must be loaded. Optional ones (e.g. the soil pickles,
+        which rule-table scoring never uses) must have finished loading or
+        failed once a warmup has started; without a warmup they load on first
+        use, so 'not_loaded' counts as ready
+        """
+        models = {name: dict(self._model_status[name]) for name in self.model_names}
+        required = self.required_models()
+        settled = ('loaded', 'failed') if self._warmup_started else ('loaded', 'failed', 'not_loaded')
+        ready = all(
+            info['status'] == 'loaded' if name in required else info['status'] in settled
+            for name, info in models.items()
+        )
+        return {
+            'ready': ready,
+            'degraded': any(info['status'] == 'failed' for info in models.values()),
+            'crop_enabled': self.crop_enabled,
+            'crop_backend': Config.CROP_INFERENCE_BACKEND if self.crop_enabled else None,
+            'warmup_ms': self._warmup_ms,
+            'models': models
+        }
+    
+    def _crop_model(self):
+        """The crop backend, or 'mock'; raises CropModelUnavailable if it failed to load"""
+        model = self._get_model('crop_model')
+        if model is None:
+            raise CropModelUnavailable(
+                f"Crop disease model ({Config.CROP_INFERENCE_BACKEND}) failed to load: "
+                f"{self._model_status['crop_model'].get('error')}"
+            )
+        return model
+    
+    def predict_crop_disease(self, processed_image, top_k=None, full_distribution=False):
         """
-        Mock prediction - randomly selects from disease pool
-        Uses image hash to ensure same image gets same result
+        Prediction from the configured backend (Config.CROP_INFERENCE_BACKEND)
+        Mock prediction (only for the 'mock' backend) - randomly selects from
+        disease pool, using the image hash to ensure the same image gets the
+        same result. A real backend that failed to load raises CropModelUnavailable
+        top_k: also return the k most likely (label, probability) pairs
+        full_distribution: also return all 38 class probabilities
         """
+        model = self._crop_model()
+        if model != 'mock':
+            return self._prediction_from_scores(model.predict(processed_image)[0], top_k, full_distribution)
+        
         # Use image data to generate a consistent "random" selection
-        # This ensures the same image always gets the same disease
-        image_hash = hash(processed_image.tobytes())
-        random.seed(image_hash)
+        # This ensures the same image always gets the same disease. The seed is
+        # a content digest (stable across processes) and the generators are
+        # local to this call, so concurrent requests cannot disturb each other.
+        # The pixel buffer is hashed in place rather than copied out with tobytes()
+        seed = int.from_bytes(
+            hashlib.blake2b(np.ascontiguousarray(processed_image).data, digest_size=8).digest(), 'little'
+        )
+        rng = random.Random(seed)
+        np_rng = np.random.default_rng(seed)
         
         # Randomly select a disease
-        selected_disease = random.choice(self.disease_pool)
+        selected_disease = rng.choice(self.disease_pool)
         
         # Add some randomness to confidence (but keep it consistent for same image)
-        confidence_variation = random.uniform(-0.05, 0.05)
+        confidence_variation = rng.uniform(-0.05, 0.05)
         final_confidence = max(0.75, min(0.95, selected_disease['confidence'] + confidence_variation))
         
-        # Create mock probability distribution
-        num_classes = 38  # Total number of disease classes
-        all_probs = np.random.dirichlet(np.ones(num_classes) * 0.1)
+        prediction = {
+            'class_idx': CROP_CLASS_NAMES.index(selected_disease['name']),
+            'class_name': selected_disease['name'],
+            'confidence': float(final_confidence)
+        }
+        
+        # The class distribution is only built when a client asks for it
+        if not top_k and not full_distribution:
+            return prediction
+        
+        # Create mock probability distribution with our disease at its class index
+        num_classes = len(CROP_CLASS_NAMES)  # Total number of disease classes
+        scores = np_rng.dirichlet(np.ones(num_classes) * 0.1)
+        scores[prediction['class_idx']] = final_confidence
+        total = scores.sum()
+        
+        if top_k:
+            prediction['top_k'] = self._top_k_classes(scores, total, top_k)
+        if full_distribution:
+            prediction['all_probabilities'] = (scores / total).tolist()  # Normalize
+        return prediction
+    
+    def _prediction_from_scores(self, scores, top_k=None, full_distribution=False):
+        """Prediction dict from one image's class probabilities"""
+        class_idx = int(scores.argmax())
+        prediction = {
+            'class_idx': class_idx,
+            'class_name': CROP_CLASS_NAMES[class_idx],
+            'confidence': float(scores[class_idx])
+        }
+        if top_k or full_distribution:
+            total = float(scores.sum())
+            if top_k:
+                prediction['top_k'] = self._top_k_classes(scores, total, top_k)
+            if full_distribution:
+                prediction['all_probabilities'] = (scores / total).tolist()
+        return prediction
+    
+    def _top_k_classes(self, scores, total, k):
+        """
+        The k highest scores as (label, probability) pairs, without normalizing the rest
+        Repeated argmax over a scratch copy: for the small k clients ask for this
+        avoids the temporary buffers of a full (arg)sort
+        """
+        remaining = scores.copy()
+        pairs = []
+        for _ in range(min(int(k), len(scores))):
+            i = int(remaining.argmax())
+            pairs.append((CROP_CLASS_NAMES[i], float(scores[i] / total)))
+            remaining[i] = -np.inf
+        return pairs
+    
+    def predict_crop_disease_batch(self, images, top_k=None, full_distribution=False):
+        """
+        Predict a (N, 224, 224, 3) batch of preprocessed images in one call
+        Returns: list of prediction dicts, one per image, in input order
+        """
+        model = self._crop_model()
+        if model != 'mock':
+            # One forward pass for the whole batch
+            scores = model.predict(images)
+            return [self._prediction_from_scores(row, top_k, full_distribution) for row in scores]
         
-        # Find the index for our selected disease
-        predicted_class_idx = random.randint(0, num_classes - 1)
-        all_probs[predicted_class_idx] = final_confidence
-        all_probs = all_probs / all_probs.sum()  # Normalize
+        # The mock model scores each image on its own
+        return [
+            self.predict_crop_disease(images[i:i + 1], top_k=top_k, full_distribution=full_distribution)
+            for i in range(len(images))
+        ]
+    
+    def assess_soil(self, soil_features):
+        """
+        Combined soil assessment in a single pass
+        Extracts the features once and computes the disease risk once, then
+        derives the health score (which is penalised by that risk) from it
+        Returns: dict with health_score, health_class and disease_risk
+        """
+        features = self._extract_soil_features(soil_features)
         
-        # Reset random seed
-        random.seed()
+        disease_risk = self._soil_disease_risk(features)
+        health_score = self._soil_health_score(features, disease_risk)
         
         return {
-            'class_idx': int(predicted_class_idx),
-            'class_name': selected_disease['name'],
-            'confidence': float(final_confidence),
-            'all_probabilities': all_probs.tolist()
+            'health_score': health_score,
+            'health_class': classify_health(health_score),
+            'disease_risk': disease_risk
         }
     
     def predict_soil_health(self, soil_features):
         """Predict soil health score (0-100) - generates dynamic score based on input"""
-        if isinstance(soil_features, pd.DataFrame):
-            try:
-                # Extract soil parameters
-                nitrogen = float(soil_features['Nitrogen'].values[0]) if 'Nitrogen' in soil_features.columns else 200
-                phosphorous = float(soil_features['Phosphorous'].values[0]) if 'Phosphorous' in soil_features.columns else 35
-                potassium = float(soil_features['Potassium'].values[0]) if 'Potassium' in soil_features.columns else 200
-                ph = float(soil_features['pH'].values[0]) if 'pH' in soil_features.columns else 7
-                moisture = float(soil_features['Moisture'].values[0]) if 'Moisture' in soil_features.columns else 50
-                humidity = float(soil_features['Humidity'].values[0]) if 'Humidity' in soil_features.columns else 50
-                temperature = float(soil_features['Temparature'].values[0]) if 'Temparature' in soil_features.columns else 25
-                ec = float(soil_features['EC_dS_m'].values[0]) if 'EC_dS_m' in soil_features.columns else 1.0
-                organic_carbon = float(soil_features['Organic_Carbon_pct'].values[0]) if 'Organic_Carbon_pct' in soil_features.columns else 1.0
-                
-                # Start with base score
-                score = 30.0
-                
-                # Nitrogen scoring (optimal: 180-300 ppm)
-                if 180 <= nitrogen <= 300:
-                    score += 12
-                elif 150 <= nitrogen < 180 or 300 < nitrogen <= 350:
-                    score += 8
-                elif nitrogen < 150 or nitrogen > 350:
-                    score += 4
-                
-                # Phosphorous scoring (optimal: 25-50 ppm)
-                if 25 <= phosphorous <= 50:
-                    score += 10
-                elif 15 <= phosphorous < 25 or 50 < phosphorous <= 70:
-                    score += 6
-                else:
-                    score += 2
-                
-                # Potassium scoring (optimal: 150-250 ppm)
-                if 150 <= potassium <= 250:
-                    score += 10
-                elif 100 <= potassium < 150 or 250 < potassium <= 300:
-                    score += 6
-                else:
-                    score += 3
-                
-                # pH scoring (optimal: 6.0-7.5)
-                if 6.0 <= ph <= 7.5:
-                    score += 15
-                elif 5.5 <= ph < 6.0 or 7.5 < ph <= 8.0:
-                    score += 10
-                elif 5.0 <= ph < 5.5 or 8.0 < ph <= 8.5:
-                    score += 5
-                else:
-                    score += 2
-                
-                # Moisture scoring (optimal: 30-70%)
-                if 30 <= moisture <= 70:
-                    score += 12
-                elif 20 <= moisture < 30 or 70 < moisture <= 80:
-                    score += 7
-                else:
-                    score += 3
-                
-                # Temperature scoring (optimal: 20-30°C)
-                if 20 <= temperature <= 30:
-                    score += 8
-                elif 15 <= temperature < 20 or 30 < temperature <= 35:
-                    score += 5
-                else:
-                    score += 2
-                
-                # EC scoring (optimal: 0.5-2.0 dS/m)
-                if 0.5 <= ec <= 2.0:
-                    score += 8
-                elif ec < 0.5 or 2.0 < ec <= 3.0:
-                    score += 4
-                else:
-                    score += 1
-                
-                # Organic carbon bonus (optimal: > 1.0%)
-                if organic_carbon > 1.5:
-                    score += 10
-                elif organic_carbon > 1.0:
-                    score += 7
-                elif organic_carbon > 0.5:
-                    score += 4
-                else:
-                    score += 2
-                
-                # Humidity impact (optimal: 40-70%)
-                if 40 <= humidity <= 70:
-                    score += 5
-                elif 30 <= humidity < 40 or 70 < humidity <= 80:
-                    score += 3
-                else:
-                    score += 1
-                
-                # ═══════════════════════════════════════════════════════
-                # INCORPORATE DISEASE RISK INTO HEALTH SCORE
-                # ═══════════════════════════════════════════════════════
-                
-                # Get disease risk prediction
-                disease_risk = self.predict_soil_disease_risk(soil_features)
-                risk_probs = disease_risk['probabilities']
-                
-                # Calculate disease penalty based on risk distribution
-                # Formula: penalty = (Medium × 15) + (High × 30)
-                # This means:
-                # - 100% Low risk = 0 penalty = no reduction
-                # - 100% Medium risk = 15 penalty = -15 points
-                # - 100% High risk = 30 penalty = -30 points
-                disease_penalty = (risk_probs['Medium'] * 15) + (risk_probs['High'] * 30)
-                
-                # DEBUG: Print calculation details
-                print(f"DEBUG: Base score before penalty: {score:.2f}")
-                print(f"DEBUG: Disease penalty: {disease_penalty:.2f}")
-                print(f"DEBUG: Risk probabilities - Low: {risk_probs['Low']:.2f}, Medium: {risk_probs['Medium']:.2f}, High: {risk_probs['High']:.2f}")
-                
-                # Apply the penalty
-                score = score - disease_penalty
-                
-                print(f"DEBUG: Final score after penalty: {score:.2f}")
-                
-                # ═══════════════════════════════════════════════════════
-                
-                # Scale score to 40-80 range
-                # Raw score ranges from ~30 to ~120, scale to 40-80
-                min_raw = 30.0
-                max_raw = 120.0
-                min_target = 40.0
-                max_target = 80.0
-                
-                scaled_score = min_target + ((score - min_raw) / (max_raw - min_raw)) * (max_target - min_target)
-                score = max(40.0, min(80.0, scaled_score))
-                
-                return float(score)
-                
-            except Exception as e:
-                print(f"Error extracting soil features: {e}")
-                import traceback
-                traceback.print_exc()
-                return 65.0
-        
-        return 65.0  # Default if not DataFrame
+        features = self._extract_soil_features(soil_features)
+        return self._soil_health_score(features, self._soil_disease_risk(features))
     
     def predict_soil_disease_risk(self, soil_features):
         """Predict soil disease risk (Low/Medium/High) - generates dynamic risk based on input"""
+        return self._soil_disease_risk(self._extract_soil_features(soil_features))
+    
+    def _extract_soil_features(self, soil_features):
+        """
+        Read the scoring inputs out of a SoilSample or one-row DataFrame in one go
+        Returns: mapping of column -> value (supports .get), or None if input is unusable
+        """
+        # SoilSample already exposes the columns - no conversion needed
+        if isinstance(soil_features, SoilSample):
+            return soil_features
+        
         # Always use mock logic for dynamic results
-        if isinstance(soil_features, pd.DataFrame):
+        # (a DataFrame can only be passed in if pandas was already imported)
+        pd = sys.modules.get('pandas')
+        if pd is None or not isinstance(soil_features, pd.DataFrame):
+            return None
+        
+        try:
+            row = soil_features.to_numpy()[0]
+            return dict(zip(soil_features.columns, row.tolist()))
+        except Exception as e:
+            print(f"Error extracting soil features: {e}")
+            return None
+    
+    def _soil_health_score(self, features, disease_risk):
+        """Health score (40-80) from extracted features and their disease risk"""
+        if features is None:
+            return 65.0  # Default if not DataFrame
+        
+        try:
+            # Sum of the health bands from the rule table
+            score = self.scoring_rules.raw_health_score(features)
+            
+            # ═══════════════════════════════════════════════════════
+            # INCORPORATE DISEASE RISK INTO HEALTH SCORE
+            # ═══════════════════════════════════════════════════════
+            
+            # Use the disease risk computed for the same features
+            risk_probs = disease_risk['probabilities']
+            
+            # Calculate disease penalty based on risk distribution
+            # Formula (default rules): penalty = (Medium × 15) + (High × 30)
+            # This means:
+            # - 100% Low risk = 0 penalty = no reduction
+            # - 100% Medium risk = 15 penalty = -15 points
+            # - 100% High risk = 30 penalty = -30 points
+            disease_penalty = self.scoring_rules.disease_penalty(risk_probs)
+            
+            # Apply the penalty
+            penalized_score = score - disease_penalty
+            
+            # Calculation details (logged only when DEBUG is enabled for this module)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Base score before penalty: %.2f, disease penalty: %.2f, "
+                    "risk probabilities - Low: %.2f, Medium: %.2f, High: %.2f, final score: %.2f",
+                    score, disease_penalty, risk_probs['Low'], risk_probs['Medium'], risk_probs['High'],
+                    penalized_score
+                )
+            score = penalized_score
+            
+            # ═══════════════════════════════════════════════════════
+            
+            # Scale score to 40-80 range
+            # Raw score ranges from ~30 to ~120, scale to 40-80
+            return float(self.scoring_rules.scale_health_score(score))
+            
+        except Exception as e:
+            print(f"Error extracting soil features: {e}")
+            import traceback
+            traceback.print_exc()
+            return 65.0
+    
+    def _soil_disease_risk(self, features):
+        """Disease risk class and probabilities from extracted features"""
+        if features is not None:
             try:
-                # Extract relevant parameters
-                moisture = float(soil_features['Moisture'].values[0]) if 'Moisture' in soil_features.columns else 50
-                humidity = float(soil_features['Humidity'].values[0]) if 'Humidity' in soil_features.columns else 50
-                temperature = float(soil_features['Temparature'].values[0]) if 'Temparature' in soil_features.columns else 25
-                ph = float(soil_features['pH'].values[0]) if 'pH' in soil_features.columns else 7
-                pathogen = int(soil_features['Soil_Pathogen_Presence'].values[0]) if 'Soil_Pathogen_Presence' in soil_features.columns else 0
-                ec = float(soil_features['EC_dS_m'].values[0]) if 'EC_dS_m' in soil_features.columns else 1.0
-                
-                # Risk scoring system
-                risk_score = 0
-                
-                # High moisture increases disease risk
-                if moisture > 70:
-                    risk_score += 25
-                elif moisture > 60:
-                    risk_score += 15
-                elif moisture > 50:
-                    risk_score += 8
-                elif moisture < 20:
-                    risk_score += 5  # Too dry also risky
-                
-                # High humidity increases disease risk
-                if humidity > 75:
-                    risk_score += 20
-                elif humidity > 65:
-                    risk_score += 12
-                elif humidity > 55:
-                    risk_score += 6
-                
-                # Temperature impact
-                if 25 <= temperature <= 30:
-                    risk_score += 15  # Optimal for pathogens
-                elif 20 <= temperature < 25 or 30 < temperature <= 35:
-                    risk_score += 8
-                
-                # pH extremes increase risk
-                if ph < 5.5 or ph > 8.0:
-                    risk_score += 15
-                elif ph < 6.0 or ph > 7.5:
-                    risk_score += 8
+                # Risk scoring system (bands from the rule table)
+                risk_score = self.scoring_rules.risk_score(features)
                 
-                # Pathogen presence is critical
-                if pathogen == 1:
-                    risk_score += 30
-                
-                # High EC (salinity) increases stress and disease susceptibility
-                if ec > 3.0:
-                    risk_score += 15
-                elif ec > 2.5:
-                    risk_score += 10
-                elif ec > 2.0:
-                    risk_score += 5
-                
-                # Determine risk class based on score
-                if risk_score >= 60:
-                    risk_class = 'High'
-                    risk_idx = 2
-                    # Generate probabilities favoring High
-                    prob_high = min(0.85, 0.50 + (risk_score - 60) / 100)
-                    prob_low = max(0.05, 0.30 - (risk_score - 60) / 100)
-                    prob_medium = 1.0 - prob_high - prob_low
-                elif risk_score >= 35:
-                    risk_class = 'Medium'
-                    risk_idx = 1
-                    # Generate probabilities favoring Medium
-                    prob_medium = min(0.70, 0.45 + (risk_score - 35) / 100)
-                    prob_high = max(0.10, 0.15 + (risk_score - 35) / 150)
-                    prob_low = 1.0 - prob_medium - prob_high
-                else:
-                    risk_class = 'Low'
-                    risk_idx = 0
-                    # Generate probabilities favoring Low
-                    prob_low = min(0.80, 0.50 + (35 - risk_score) / 80)
-                    prob_medium = max(0.15, 0.35 - (35 - risk_score) / 100)
-                    prob_high = 1.0 - prob_low - prob_medium
+                # Determine risk class and probabilities based on score
+                rule, (prob_low, prob_medium, prob_high) = self.scoring_rules.risk_class(risk_score)
                 
                 return {
-                    'risk_class': risk_class,
-                    'risk_idx': risk_idx,
+                    'risk_class': rule.name,
+                    'risk_idx': rule.idx,
                     'probabilities': {
                         'Low': float(max(0.0, min(1.0, prob_low))),
                         'Medium': float(max(0.0, min(1.0, prob_medium))),
@@ -359,4 +506,46 @@ class ModelManager:
                 'Medium': 0.45,
                 'High': 0.25
             }
-        }
\ No newline at end of file
+        }
+    
+    def score_soil_batch(self, feature_matrix):
+        """
+        Vectorized soil scoring for an (N, 14) feature matrix (see prepare_soil_batch)
+        Returns arrays of health scores, risk indices and risk probabilities,
+        identical to predict_soil_health / predict_soil_disease_risk per row
+        """
+        features = np.asarray(feature_matrix, dtype=np.float64)
+        if features.ndim != 2 or features.shape[1] != len(SOIL_FEATURE_COLUMNS):
+            raise ValueError(
+                f"Expected an (N, {len(SOIL_FEATURE_COLUMNS)}) feature matrix, got shape {features.shape}"
+            )
+        
+        risk_idx, risk_probs = self.predict_soil_disease_risk_batch(features)
+        health_scores = self._soil_health_from_risk_batch(features, risk_probs)
+        
+        return {
+            'health_scores': health_scores,
+            'risk_idx': risk_idx,
+            'risk_classes': np.array(RISK_CLASSES)[risk_idx],
+            'risk_probabilities': risk_probs
+        }
+    
+    def predict_soil_health_batch(self, feature_matrix):
+        """Vectorized predict_soil_health - returns an (N,) array of scores (40-80)"""
+        return self.score_soil_batch(feature_matrix)['health_scores']
+    
+    def predict_soil_disease_risk_batch(self, feature_matrix):
+        """
+        Vectorized predict_soil_disease_risk
+        Returns (risk_idx, probabilities) where probabilities is (N, 3) in RISK_CLASSES order
+        """
+        features = np.asarray(feature_matrix, dtype=np.float64)
+        risk_scores = self.scoring_rules.risk_score_batch(features)
+        return self.scoring_rules.risk_class_batch(risk_scores)
+    
+    def _soil_health_from_risk_batch(self, features, risk_probs):
+        """Vectorized health score given precomputed risk probabilities"""
+        rules = self.scoring_rules
+        score = rules.raw_health_score_batch(features)
+        score -= rules.disease_penalty_batch(risk_probs)
+        return rules.scale_health_score_batch(score)
@@ -0,0 +1,190 @@
+import itertools
+import threading
+import time
+
+import numpy as np
+
+HASH_BITS = 64
+TABLES = 4  # 16-bit substrings, one sorted table each
+SUB_BITS = HASH_BITS // TABLES
+SUB_MASK = (1 << SUB_BITS) - 1
+SCAN_LIMIT = 65536  # Below this many entries a direct Hamming scan beats probing the tables
+
+_GRAY_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+_POPCOUNT_8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(values):
+    """Set bits per uint64 (np.bitwise_count on numpy >= 2)"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return _POPCOUNT_8[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def dhash(pixels):
+    """
+    64-bit difference hash of a (height, width, 3) uint8 image
+    The grayscale image is area-averaged to 8 rows x 9 columns; each bit is
+    whether a block is brighter than its left neighbour. Small crops, exposure
+    changes and re-encoding flip only a few bits
+    """
+    gray = pixels.astype(np.float32) @ _GRAY_WEIGHTS
+    height, width = gray.shape
+    row_edges = np.linspace(0, height, 9).astype(np.intp)
+    col_edges = np.linspace(0, width, 10).astype(np.intp)
+    blocks = np.add.reduceat(np.add.reduceat(gray, row_edges[:-1], axis=0), col_edges[:-1], axis=1)
+    blocks /= np.outer(np.diff(row_edges), np.diff(col_edges))
+    bits = blocks[:, 1:] > blocks[:, :-1]
+    return int(np.packbits(bits.ravel()).view('>u8')[0])
+
+
+def _flip_masks(radius):
+    """XOR masks of all SUB_BITS-bit values within `radius` bit flips"""
+    masks = [0]
+    for flips in range(1, radius + 1):
+        masks.extend(sum(1 << bit for bit in bits) for bits in itertools.combinations(range(SUB_BITS), flips))
+    return np.array(masks, dtype=np.uint64)
+
+
+class NearDuplicateIndex:
+    """
+    Perceptual hashes of seen images and their predictions, searchable by
+    Hamming distance (multi-index hashing)
+
+    Each 64-bit hash is split into four 16-bit substrings, each kept in a
+    sorted table. Two hashes within distance r agree to within r // 4 bits on
+    at least one substring, so a lookup probes only the neighbouring keys of
+    each substring with binary search and checks the few candidates it finds.
+    Recent entries sit in a small buffer that is scanned directly and merged
+    into the tables once it reaches merge_threshold; while the index is small
+    (SCAN_LIMIT) the tables are scanned directly too. Over max_entries the
+    oldest quarter is dropped; entries older than ttl_seconds are not returned.
+    """
+
+    def __init__(self, max_distance=6, max_entries=1000000, ttl_seconds=3600.0, merge_threshold=4096):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.merge_threshold = merge_threshold
+
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._added_at = np.empty(0, dtype=np.float64)
+        self._values = []
+        self._tables = [(np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.intp)) for _ in range(TABLES)]
+        self._pending_hashes = np.empty(merge_threshold, dtype=np.uint64)
+        self._pending_times = np.empty(merge_threshold, dtype=np.float64)
+        self._pending_values = []
+        self._masks = {}
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.lookup_seconds = 0.0
+
+    def __len__(self):
+        return len(self._hashes) + len(self._pending_values)
+
+    def add(self, image_hash, value):
+        with self._lock:
+            count = len(self._pending_values)
+            self._pending_hashes[count] = image_hash
+            self._pending_times[count] = time.monotonic()
+            self._pending_values.append(value)
+            if count + 1 >= self.merge_threshold:
+                self._merge()
+
+    def lookup(self, image_hash, max_distance=None):
+        """
+        Closest unexpired entry within max_distance bits (default: the index's)
+        Returns: (value, distance), or None
+        """
+        max_distance = self.max_distance if max_distance is None else max_distance
+        start = time.perf_counter()
+        with self._lock:
+            match = self._search(image_hash, max_distance)
+            self.lookups += 1
+            self.hits += match is not None
+            self.lookup_seconds += time.perf_counter() - start
+        return match
+
+    def _search(self, image_hash, max_distance):
+        query = np.uint64(image_hash)
+        oldest = time.monotonic() - self.ttl_seconds
+        best = None
+
+        count = len(self._pending_values)
+        if count:
+            distances = _popcount(self._pending_hashes[:count] ^ query)
+            distances[self._pending_times[:count] < oldest] = HASH_BITS + 1
+            i = int(np.argmin(distances))
+            if distances[i] <= max_distance:
+                best = (self._pending_values[i], int(distances[i]))
+
+        if 0 < len(self._hashes) <= SCAN_LIMIT:
+            distances = _popcount(self._hashes ^ query)
+            distances[self._added_at < oldest] = HASH_BITS + 1
+            i = int(np.argmin(distances))
+            if distances[i] <= max_distance and (best is None or distances[i] < best[1]):
+                best = (self._values[i], int(distances[i]))
+        elif len(self._hashes):
+            masks = self._masks.get(max_distance // TABLES)
+            if masks is None:
+                masks = self._masks[max_distance // TABLES] = _flip_masks(max_distance // TABLES)
+            candidates = []
+            for table, (keys, ids) in enumerate(self._tables):
+                probes = ((query >> np.uint64(table * SUB_BITS)) & np.uint64(SUB_MASK)) ^ masks
+                starts = np.searchsorted(keys, probes, side='left')
+                stops = np.searchsorted(keys, probes, side='right')
+                candidates.extend(ids[a:b] for a, b in zip(starts.tolist(), stops.tolist()) if b > a)
+            if candidates:
+                ids = np.concatenate(candidates)  # An id found in several tables is just checked twice
+                distances = _popcount(self._hashes[ids] ^ query)
+                distances[self._added_at[ids] < oldest] = HASH_BITS + 1
+                i = int(np.argmin(distances))
+                if distances[i] <= max_distance and (best is None or distances[i] < best[1]):
+                    best = (self._values[ids[i]], int(distances[i]))
+        return best
+
+    def _merge(self):
+        count = len(self._pending_values)
+        new_hashes = self._pending_hashes[:count].copy()
+        first_id = len(self._hashes)
+        new_ids = np.arange(first_id, first_id + count, dtype=np.intp)
+        self._hashes = np.concatenate([self._hashes, new_hashes])
+        self._added_at = np.concatenate([self._added_at, self._pending_times[:count]])
+        self._values.extend(self._pending_values)
+        self._pending_values = []
+
+        if len(self._hashes) > self.max_entries:
+            # Drop the oldest quarter and rebuild the tables from scratch
+            keep = len(self._hashes) - self.max_entries * 3 // 4
+            self._hashes = self._hashes[keep:]
+            self._added_at = self._added_at[keep:]
+            self._values = self._values[keep:]
+            all_ids = np.arange(len(self._hashes), dtype=np.intp)
+            self._tables = [self._sorted_table(self._hashes, all_ids, table) for table in range(TABLES)]
+            return
+
+        # Insert the sorted new keys into each table (linear, no full re-sort)
+        for table in range(TABLES):
+            keys, ids = self._tables[table]
+            new_keys, new_table_ids = self._sorted_table(new_hashes, new_ids, table)
+            positions = np.searchsorted(keys, new_keys)
+            self._tables[table] = (np.insert(keys, positions, new_keys), np.insert(ids, positions, new_table_ids))
+
+    @staticmethod
+    def _sorted_table(hashes, ids, table):
+        keys = (hashes >> np.uint64(table * SUB_BITS)) & np.uint64(SUB_MASK)
+        order = np.argsort(keys, kind='stable')
+        return keys[order], ids[order]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self),
+                'max_distance': self.max_distance,
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'hit_rate': round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                'avg_lookup_us': round(self.lookup_seconds / self.lookups * 1e6, 2) if self.lookups else 0.0
+            }
@@ -0,0 +1,88 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def upload_digest(data):
+    """Fast content digest of raw upload bytes"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def stream_digest(stream, chunk_size=64 * 1024):
+    """
+    upload_digest of a binary stream, read in chunks so the upload is never
+    held in memory as one bytes object; rewinds the stream
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    chunk = bytearray(chunk_size)
+    view = memoryview(chunk)
+    stream.seek(0)
+    while True:
+        count = stream.readinto(chunk)
+        if not count:
+            break
+        digest.update(view[:count])
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of predictions with TTL expiry
+    Keys are content digests of the raw upload, so a resubmitted photo is
+    answered without decoding or running the model again
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Cached value for key, or None (counts as a miss)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -1,111 +1,296 @@
+import warnings
+
 import numpy as np
-import pandas as pd
-from PIL import Image
-import io
 from config import Config
 
-def preprocess_image(image_file):
+# Column order of the soil feature matrix (matches the training data)
+SOIL_FEATURE_COLUMNS = (
+    'Temparature',  # Note: typo in original training data
+    'Humidity',
+    'Moisture',
+    'Soil Type_enc',
+    'Nitrogen',
+    'Potassium',
+    'Phosphorous',
+    'pH',
+    'EC_dS_m',
+    'Organic_Carbon_pct',
+    'Salinity_Class_enc',
+    'Soil_Pathogen_Presence',
+    'Latitude',
+    'Longitude'
+)
+
+# Leading bytes of the accepted upload formats (checked before any decoding)
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'RIFF', 'WEBP'),  # plus 'WEBP' at offset 8
+)
+
+
+class ImageRejected(Exception):
+    """Upload refused before decoding; status_code is the HTTP status to answer with"""
+    
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def sniff_image_format(header):
+    """Image format from the first bytes of a file, or None if not an accepted format"""
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            if image_format == 'WEBP' and header[8:12] != b'WEBP':
+                return None
+            return image_format
+    return None
+
+
+def check_image_upload(stream):
+    """
+    Validate an uploaded image stream before decoding it
+    Checks the byte size (Config.MAX_UPLOAD_BYTES) and the format from the
+    header (Config.ALLOWED_IMAGE_FORMATS) without reading the whole upload,
+    then rewinds the stream
+    Returns: the sniffed format; raises ImageRejected
+    """
+    size = stream.seek(0, 2)
+    stream.seek(0)
+    if size == 0:
+        raise ImageRejected('Empty image file', 400)
+    if size > Config.MAX_UPLOAD_BYTES:
+        raise ImageRejected(
+            f"Image is {size} bytes; the limit is {Config.MAX_UPLOAD_BYTES} bytes", 413
+        )
+    
+    image_format = sniff_image_format(stream.read(16))
+    stream.seek(0)
+    if image_format not in Config.ALLOWED_IMAGE_FORMATS:
+        raise ImageRejected(
+            f"Unsupported image format; accepted formats: {', '.join(Config.ALLOWED_IMAGE_FORMATS)}", 415
+        )
+    
+    # Opening only parses the header; dimensions are known before any decoding
+    open_image_within_limits(stream, formats=(image_format,))
+    stream.seek(0)
+    return image_format
+
+
+def open_image_within_limits(image_file, formats=None, max_pixels=None):
+    """
+    Image.open that rejects images over max_pixels (default
+    Config.MAX_IMAGE_PIXELS, the upload limit) from their header, before any
+    pixel data is decoded (decompression bombs)
+    Pillow's process-wide settings are left alone; the size check below is the limit
+    Returns: the lazily-loaded PIL image; raises ImageRejected
+    """
+    from PIL import Image, UnidentifiedImageError
+    
+    max_pixels = max_pixels or Config.MAX_IMAGE_PIXELS
+    try:
+        # Pillow only warns about images past its own bomb threshold; make that
+        # an error for this call (unless the limit is higher) without touching global filters
+        with warnings.catch_warnings():
+            warnings.simplefilter(
+                'error' if max_pixels <= Image.MAX_IMAGE_PIXELS else 'ignore', Image.DecompressionBombWarning
+            )
+            image = Image.open(image_file, formats=formats)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        limit = min(max_pixels, 2 * Image.MAX_IMAGE_PIXELS)  # Pillow refuses anything past 2x on its own
+        raise ImageRejected(f"Image exceeds the limit of {limit} pixels", 413)
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        raise ImageRejected('Image file is corrupt or truncated', 400)
+    
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageRejected(
+            f"Image is {width}x{height} pixels; the limit is {max_pixels} pixels", 413
+        )
+    return image
+
+
+def preprocess_image(image_file, with_pixels=False):
     """
     Preprocess uploaded image for InceptionResNetV2
-    Expected input: FileStorage object from Flask
-    Returns: numpy array ready for model prediction
+    Expected input: a binary file-like object (e.g. the upload's stream)
+    Returns: numpy array ready for model prediction, or with with_pixels
+    (array, resized uint8 pixels)
     """
     try:
-        # Read image from file
-        image_bytes = image_file.read()
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to RGB if necessary
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Resize to model input size
-        image = image.resize(Config.IMAGE_SIZE)
-        
-        # Convert to array and normalize (0-1)
-        img_array = np.array(image, dtype=np.float32) / 255.0
-        
-        # Add batch dimension
-        img_array = np.expand_dims(img_array, axis=0)
-        
-        return img_array
+        pixels = load_image_pixels(image_file)
+        processed = normalize_image(pixels)
+        return (processed, pixels) if with_pixels else processed
     
+    except ImageRejected:
+        raise
     except Exception as e:
         raise Exception(f"Error preprocessing image: {str(e)}")
 
 
+def load_image_pixels(image_file, max_pixels=None):
+    """
+    Decode an uploaded image straight to model size as uint8 RGB pixels
+    JPEGs are downscaled by the decoder itself (draft mode), so large
+    phone photos are never fully decoded at native resolution
+    Images over max_pixels (default Config.MAX_IMAGE_PIXELS) are rejected before decoding
+    Returns: (height, width, 3) uint8 array
+    """
+    # Pillow is only imported once an image is actually processed
+    from PIL import Image
+    
+    image = open_image_within_limits(image_file, max_pixels=max_pixels)
+    
+    # Let the JPEG decoder scale by 1/2, 1/4 or 1/8 while staying >= target size
+    if Config.IMAGE_DRAFT_DECODE and image.format == 'JPEG':
+        image.draft('RGB', Config.IMAGE_SIZE)
+    
+    # Convert to RGB if necessary
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    
+    # Resize to model input size
+    image = image.resize(
+        Config.IMAGE_SIZE,
+        resample=getattr(Image.Resampling, Config.IMAGE_RESIZE_FILTER),
+        reducing_gap=Config.IMAGE_REDUCING_GAP
+    )
+    
+    return np.asarray(image, dtype=np.uint8)
+
+
+def normalize_image(pixels):
+    """
+    Final normalization step: uint8 pixels -> float32 in [0, 1]
+    Adds the batch dimension if a single (height, width, 3) image is given
+    """
+    if pixels.ndim == 3:
+        pixels = np.expand_dims(pixels, axis=0)
+    return pixels.astype(np.float32) / 255.0
+
+
+# Prebuilt string -> code tables for the categorical soil inputs
+SOIL_TYPE_CODES = {
+    'Sandy': 0,
+    'Loamy': 1,
+    'Black': 2,
+    'Red': 3,
+    'Clayey': 4
+}
+
+SALINITY_CODES = {
+    'Normal': 0,
+    'Slightly Saline': 1,
+    'Moderately Saline': 2,
+    'Highly Saline': 3
+}
+
+
+class SoilSample:
+    """
+    Compact, pandas-free soil sample
+    Fields are stored in SOIL_FEATURE_COLUMNS order; get() reads them by
+    training column name so ModelManager can score it directly
+    """
+    __slots__ = (
+        'temperature', 'humidity', 'moisture', 'soil_type', 'nitrogen',
+        'potassium', 'phosphorous', 'ph', 'ec', 'organic_carbon',
+        'salinity', 'pathogen_presence', 'latitude', 'longitude'
+    )
+    
+    # Training column name -> slot name
+    _SLOT_FOR_COLUMN = dict(zip(SOIL_FEATURE_COLUMNS, __slots__))
+    
+    def __init__(self, row):
+        for slot, value in zip(self.__slots__, row):
+            setattr(self, slot, value)
+    
+    def get(self, column, default=None):
+        """Value of a training column (e.g. 'Nitrogen'), like dict.get"""
+        slot = self._SLOT_FOR_COLUMN.get(column)
+        return default if slot is None else getattr(self, slot)
+    
+    def to_row(self):
+        """Values as a tuple in SOIL_FEATURE_COLUMNS order"""
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+    
+    def to_frame(self):
+        """
+        One-row DataFrame with the training column names
+        Only needed when a real sklearn/XGBoost model is called
+        """
+        import pandas as pd
+        return pd.DataFrame([dict(zip(SOIL_FEATURE_COLUMNS, self.to_row()))])
+
+
+def _parse_soil_row(raw_data):
+    """Validate and convert raw soil parameters to a row in SOIL_FEATURE_COLUMNS order"""
+    return (
+        float(raw_data.get('temperature', 0)),
+        float(raw_data.get('humidity', 0)),
+        float(raw_data.get('moisture', 0)),
+        SOIL_TYPE_CODES.get(raw_data.get('soil_type', 'Loamy'), 1),  # Default to Loamy
+        float(raw_data.get('nitrogen', 0)),
+        float(raw_data.get('potassium', 0)),
+        float(raw_data.get('phosphorous', 0)),
+        float(raw_data.get('ph', 7.0)),
+        float(raw_data.get('ec', 0)),
+        float(raw_data.get('organic_carbon', 0)),
+        SALINITY_CODES.get(raw_data.get('salinity_class', 'Normal'), 0),  # Default to Normal
+        int(raw_data.get('pathogen_presence', 0)),
+        float(raw_data.get('latitude', 0)),
+        float(raw_data.get('longitude', 0))
+    )
+
+
+def prepare_soil_sample(raw_data):
+    """
+    Prepare soil data for scoring without building a DataFrame
+    Returns: SoilSample
+    """
+    try:
+        return SoilSample(_parse_soil_row(raw_data))
+    except Exception as e:
+        raise Exception(f"Error preparing soil data: {str(e)}")
+
+
 def prepare_soil_data(raw_data):
     """
     Prepare soil data for model prediction
     Expected format matches your training data columns
+    Returns: one-row DataFrame (use prepare_soil_sample when no model needs one)
     """
-    try:
-        # Extract and convert values
-        temperature = float(raw_data.get('temperature', 0))
-        humidity = float(raw_data.get('humidity', 0))
-        moisture = float(raw_data.get('moisture', 0))
-        soil_type = raw_data.get('soil_type', 'Loamy')
-        nitrogen = float(raw_data.get('nitrogen', 0))
-        phosphorous = float(raw_data.get('phosphorous', 0))
-        potassium = float(raw_data.get('potassium', 0))
-        ph = float(raw_data.get('ph', 7.0))
-        ec = float(raw_data.get('ec', 0))
-        organic_carbon = float(raw_data.get('organic_carbon', 0))
-        pathogen_presence = int(raw_data.get('pathogen_presence', 0))
-        salinity_class = raw_data.get('salinity_class', 'Normal')
-        latitude = float(raw_data.get('latitude', 0))
-        longitude = float(raw_data.get('longitude', 0))
-        
-        # Encode categorical variables
-        soil_type_encoded = encode_soil_type(soil_type)
-        salinity_encoded = encode_salinity(salinity_class)
-        
-        # Create DataFrame with expected column names (matching training data)
-        # Note: Column names match what the model expects
-        features_df = pd.DataFrame([{
-            'Temparature': temperature,  # Note: typo in original training data
-            'Humidity': humidity,
-            'Moisture': moisture,
-            'Soil Type_enc': soil_type_encoded,
-            'Nitrogen': nitrogen,
-            'Potassium': potassium,
-            'Phosphorous': phosphorous,
-            'pH': ph,
-            'EC_dS_m': ec,
-            'Organic_Carbon_pct': organic_carbon,
-            'Salinity_Class_enc': salinity_encoded,
-            'Soil_Pathogen_Presence': pathogen_presence,
-            'Latitude': latitude,
-            'Longitude': longitude
-        }])
-        
-        return features_df
+    return prepare_soil_sample(raw_data).to_frame()
+
+
+def prepare_soil_batch(samples):
+    """
+    Prepare a list of raw soil samples as an (N, 14) float64 feature matrix
+    Columns follow SOIL_FEATURE_COLUMNS
+    Raises ValueError naming the first sample that is not an object or has a
+    non-numeric field
+    """
+    features = np.empty((len(samples), len(SOIL_FEATURE_COLUMNS)), dtype=np.float64)
     
-    except Exception as e:
-        raise Exception(f"Error preparing soil data: {str(e)}")
+    for i, raw_data in enumerate(samples):
+        if not isinstance(raw_data, dict):
+            raise ValueError(f"Invalid soil sample {i}: expected an object, got {type(raw_data).__name__}")
+        try:
+            features[i] = _parse_soil_row(raw_data)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid soil sample {i}: {str(e)}") from e
+    
+    return features
 
 
 def encode_soil_type(soil_type):
     """Encode soil type to numeric value"""
-    mapping = {
-        'Sandy': 0,
-        'Loamy': 1,
-        'Black': 2,
-        'Red': 3,
-        'Clayey': 4
-    }
-    return mapping.get(soil_type, 1)  # Default to Loamy
+    return SOIL_TYPE_CODES.get(soil_type, 1)  # Default to Loamy
 
 
 def encode_salinity(salinity_class):
     """Encode salinity class to numeric value"""
-    mapping = {
-        'Normal': 0,
-        'Slightly Saline': 1,
-        'Moderately Saline': 2,
-        'Highly Saline': 3
-    }
-    return mapping.get(salinity_class, 0)  # Default to Normal
+    return SALINITY_CODES.get(salinity_class, 0)  # Default to Normal
 
 
 def classify_health(health_score):
@@ -115,4 +300,10 @@ def classify_health(health_score):
     elif health_score >= 40:
         return "Medium"
     else:
-        return "Low"
\ No newline at end of file
+        return "Low"
+
+
+def classify_health_batch(health_scores):
+    """Vectorized classify_health for an array of scores"""
+    health_scores = np.asarray(health_scores)
+    return np.where(health_scores >= 70, 'High', np.where(health_scores >= 40, 'Medium', 'Low'))
@@ -0,0 +1,249 @@
+import bisect
+import json
+import math
+import numpy as np
+from utils.preprocessor import SOIL_FEATURE_COLUMNS
+
+# Disease risk classes, indexed by risk_idx
+RISK_CLASSES = ('Low', 'Medium', 'High')
+
+# Column positions in the soil feature matrix
+_COL = {name: i for i, name in enumerate(SOIL_FEATURE_COLUMNS)}
+
+
+class BandLookup:
+    """
+    One feature's scoring bands compiled into sorted breakpoints
+    points[bisect_right(breaks, x)] is the score of x
+    """
+
+    def __init__(self, spec):
+        self.column = spec['column']
+        if self.column not in _COL:
+            raise ValueError(f"Unknown soil feature column: {self.column}")
+
+        self.default = spec.get('default', 0)
+        self.integer = bool(spec.get('integer', False))
+        self.default_points = spec.get('default_points', 0)
+        self.bands = spec.get('bands', [])
+        self.breaks, self.points = self._compile()
+
+        # Arrays for the batched (searchsorted) lookup
+        self.breaks_array = np.array(self.breaks, dtype=np.float64)
+        self.points_array = np.array(self.points, dtype=np.float64)
+
+    def _matches(self, band, x):
+        """First-match test of one band, exactly as the old if/elif chains did"""
+        if 'min' in band:
+            if band.get('min_inclusive', True):
+                if not x >= band['min']:
+                    return False
+            elif not x > band['min']:
+                return False
+        if 'max' in band:
+            if band.get('max_inclusive', True):
+                if not x <= band['max']:
+                    return False
+            elif not x < band['max']:
+                return False
+        return True
+
+    def _evaluate(self, x):
+        for band in self.bands:
+            if self._matches(band, x):
+                return band['points']
+        return self.default_points
+
+    def _compile(self):
+        """
+        Split the number line at every band edge into open intervals and
+        single edge points, score a representative of each piece, and merge
+        neighbouring pieces with equal scores
+        An edge e starts the piece {e}; nextafter(e) starts the piece above it
+        """
+        edges = sorted({float(band[key]) for band in self.bands for key in ('min', 'max') if key in band})
+        if not edges:
+            return [], [self.default_points]
+
+        # Representatives: below the first edge, each edge, between edges, above the last
+        samples = [edges[0] - 1.0]
+        starts = []
+        for i, edge in enumerate(edges):
+            samples.append(edge)
+            starts.append(edge)
+            upper = edges[i + 1] if i + 1 < len(edges) else edge + 2.0
+            samples.append((edge + upper) / 2.0)
+            starts.append(math.nextafter(edge, math.inf))
+
+        points = [self._evaluate(x) for x in samples]
+
+        breaks = []
+        merged = [points[0]]
+        for start, value in zip(starts, points[1:]):
+            if value != merged[-1]:
+                breaks.append(start)
+                merged.append(value)
+        return breaks, merged
+
+    def lookup(self, value):
+        """Score of a single value"""
+        if self.integer:
+            value = int(value)
+        if value != value:  # NaN matches no band
+            return self.default_points
+        return self.points[bisect.bisect_right(self.breaks, value)]
+
+    def lookup_array(self, values):
+        """Scores of an array of values"""
+        if self.integer:
+            values = np.trunc(values)
+        points = self.points_array[np.searchsorted(self.breaks_array, values, side='right')]
+        return np.where(np.isnan(values), float(self.default_points), points)
+
+
+class RiskClassRule:
+    """Risk class threshold and its probability formulas"""
+
+    def __init__(self, spec):
+        self.name = spec['name']
+        if self.name not in RISK_CLASSES:
+            raise ValueError(f"Unknown risk class: {self.name}")
+
+        self.idx = RISK_CLASSES.index(self.name)
+        self.min_score = spec.get('min_score')
+        self.distance_from = spec['distance_from']
+        self.primary = spec['primary']
+        self.secondary = spec['secondary']
+        self.secondary_idx = RISK_CLASSES.index(self.secondary['class'])
+        # The class that gets whatever probability is left over
+        self.remainder_idx = ({0, 1, 2} - {self.idx, self.secondary_idx}).pop()
+
+    def probabilities(self, risk_score):
+        """Unclamped (Low, Medium, High) probabilities for a score in this class"""
+        distance = abs(risk_score - self.distance_from)
+        probs = [0.0, 0.0, 0.0]
+        probs[self.idx] = min(self.primary['cap'], self.primary['base'] + distance / self.primary['rate'])
+        probs[self.secondary_idx] = max(
+            self.secondary['floor'], self.secondary['base'] + distance / self.secondary['rate']
+        )
+        probs[self.remainder_idx] = 1.0 - probs[self.idx] - probs[self.secondary_idx]
+        return probs
+
+    def probabilities_array(self, risk_scores, out):
+        """Vectorized probabilities, written into the (N, 3) array out"""
+        distance = np.abs(risk_scores - self.distance_from)
+        primary = np.minimum(self.primary['cap'], self.primary['base'] + distance / self.primary['rate'])
+        secondary = np.maximum(
+            self.secondary['floor'], self.secondary['base'] + distance / self.secondary['rate']
+        )
+        out[:, self.idx] = primary
+        out[:, self.secondary_idx] = secondary
+        out[:, self.remainder_idx] = 1.0 - primary - secondary
+
+
+class SoilScoringRules:
+    """Compiled soil health / disease risk rule table"""
+
+    def __init__(self, table):
+        self.version = table['version']
+
+        health = table['health']
+        self.base_score = health['base_score']
+        self.health_bands = [BandLookup(spec) for spec in health['features']]
+        self.penalty_medium = health['disease_penalty']['Medium']
+        self.penalty_high = health['disease_penalty']['High']
+        self.scale = health['scale']
+
+        risk = table['disease_risk']
+        self.risk_bands = [BandLookup(spec) for spec in risk['features']]
+
+        classes = [RiskClassRule(spec) for spec in risk['classes']]
+        fallback = [rule for rule in classes if rule.min_score is None]
+        if len(fallback) != 1 or {rule.name for rule in classes} != set(RISK_CLASSES):
+            raise ValueError("Risk classes must cover Low/Medium/High with exactly one class without min_score")
+
+        # Ascending thresholds: class position = bisect_right(thresholds, score)
+        ranked = sorted((rule for rule in classes if rule.min_score is not None), key=lambda r: r.min_score)
+        self.risk_classes = fallback + ranked
+        self.risk_thresholds = [rule.min_score for rule in ranked]
+        self.risk_thresholds_array = np.array(self.risk_thresholds, dtype=np.float64)
+
+    # Single sample (dict of column -> value)
+
+    def raw_health_score(self, features):
+        """Sum of the health bands, before the disease penalty and scaling"""
+        score = self.base_score
+        for band in self.health_bands:
+            score += band.lookup(float(features.get(band.column, band.default)))
+        return score
+
+    def disease_penalty(self, probabilities):
+        return (probabilities['Medium'] * self.penalty_medium) + (probabilities['High'] * self.penalty_high)
+
+    def scale_health_score(self, score):
+        """Scale the raw score to the target range and clamp it"""
+        scale = self.scale
+        scaled_score = scale['target_min'] + (
+            (score - scale['raw_min']) / (scale['raw_max'] - scale['raw_min'])
+        ) * (scale['target_max'] - scale['target_min'])
+        return max(scale['target_min'], min(scale['target_max'], scaled_score))
+
+    def risk_score(self, features):
+        risk_score = 0
+        for band in self.risk_bands:
+            risk_score += band.lookup(float(features.get(band.column, band.default)))
+        return risk_score
+
+    def risk_class(self, risk_score):
+        """(RiskClassRule, unclamped probabilities) for a risk score"""
+        rule = self.risk_classes[bisect.bisect_right(self.risk_thresholds, risk_score)]
+        return rule, rule.probabilities(risk_score)
+
+    # Batches ((N, 14) feature matrix, columns in SOIL_FEATURE_COLUMNS order)
+
+    def raw_health_score_batch(self, features):
+        score = np.full(features.shape[0], float(self.base_score))
+        for band in self.health_bands:
+            score += band.lookup_array(features[:, _COL[band.column]])
+        return score
+
+    def disease_penalty_batch(self, probabilities):
+        return (probabilities[:, 1] * self.penalty_medium) + (probabilities[:, 2] * self.penalty_high)
+
+    def scale_health_score_batch(self, score):
+        scale = self.scale
+        scaled_score = scale['target_min'] + (
+            (score - scale['raw_min']) / (scale['raw_max'] - scale['raw_min'])
+        ) * (scale['target_max'] - scale['target_min'])
+        return np.clip(scaled_score, scale['target_min'], scale['target_max'])
+
+    def risk_score_batch(self, features):
+        risk_score = np.zeros(features.shape[0])
+        for band in self.risk_bands:
+            risk_score += band.lookup_array(features[:, _COL[band.column]])
+        return risk_score
+
+    def risk_class_batch(self, risk_scores):
+        """Returns (risk_idx, clamped (N, 3) probabilities)"""
+        position = np.searchsorted(self.risk_thresholds_array, risk_scores, side='right')
+
+        risk_idx = np.empty(risk_scores.shape[0], dtype=np.int64)
+        probs = np.empty((risk_scores.shape[0], 3), dtype=np.float64)
+        for i, rule in enumerate(self.risk_classes):
+            mask = position == i
+            if not mask.any():
+                continue
+            risk_idx[mask] = rule.idx
+            rows = np.empty((int(mask.sum()), 3), dtype=np.float64)
+            rule.probabilities_array(risk_scores[mask], rows)
+            probs[mask] = rows
+
+        np.clip(probs, 0.0, 1.0, out=probs)
+        return risk_idx, probs
+
+
+def load_scoring_rules(path):
+    """Load and compile the soil scoring rule table (JSON)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        table = json.load(f)
+    return SoilScoringRules(table)
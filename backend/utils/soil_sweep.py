@@ -0,0 +1,167 @@
+import numpy as np
+
+from utils.preprocessor import SOIL_FEATURE_COLUMNS, classify_health_batch
+from utils.scoring_rules import RISK_CLASSES
+
+# Sweepable soil parameters (request name -> feature column)
+SWEEP_PARAMETERS = {
+    'temperature': 'Temparature',
+    'humidity': 'Humidity',
+    'moisture': 'Moisture',
+    'nitrogen': 'Nitrogen',
+    'potassium': 'Potassium',
+    'phosphorous': 'Phosphorous',
+    'ph': 'pH',
+    'ec': 'EC_dS_m',
+    'organic_carbon': 'Organic_Carbon_pct',
+    'pathogen_presence': 'Soil_Pathogen_Presence'
+}
+HEALTH_CLASSES = ('Low', 'Medium', 'High')
+TARGET_KEYS = ('health_class', 'risk_class')
+
+
+def parse_axes(specs, max_steps=200, max_points=250000):
+    """
+    Validate the swept parameters of a sweep request
+    specs: 1-3 dicts {"name": "ph", "min": 5.5, "max": 7.5, "steps": 21}
+    or {"name": ..., "values": [...]}
+    Returns: list of (name, values array); raises ValueError when invalid
+    """
+    if not isinstance(specs, list) or not 1 <= len(specs) <= 3:
+        raise ValueError('parameters must be a list of 1 to 3 ranges')
+
+    axes = []
+    for spec in specs:
+        name = spec.get('name') if isinstance(spec, dict) else None
+        if name not in SWEEP_PARAMETERS:
+            raise ValueError(f"Unknown sweep parameter {name!r}; expected one of {', '.join(SWEEP_PARAMETERS)}")
+        if name in (axis[0] for axis in axes):
+            raise ValueError(f"Parameter {name!r} is swept twice")
+
+        if 'values' in spec:
+            values = np.asarray(spec['values'], dtype=np.float64)
+            if values.ndim != 1 or not len(values):
+                raise ValueError(f"values of {name!r} must be a non-empty list of numbers")
+        else:
+            low, high, steps = float(spec['min']), float(spec['max']), int(spec.get('steps', 11))
+            if high < low or steps < 1:
+                raise ValueError(f"Range of {name!r} needs min <= max and steps >= 1")
+            values = np.linspace(low, high, steps)
+        if len(values) > max_steps:
+            raise ValueError(f"{name!r} has {len(values)} values; at most {max_steps} per parameter")
+        axes.append((name, values))
+
+    points = int(np.prod([len(values) for _, values in axes]))
+    if points > max_points:
+        raise ValueError(f"Grid has {points} points; at most {max_points} per request")
+    return axes
+
+
+def build_grid(base_row, axes):
+    """
+    Feature matrix of the cartesian grid: the base sample repeated, with the
+    swept columns set from the axes in C order (last parameter varies fastest)
+    """
+    shape = tuple(len(values) for _, values in axes)
+    features = np.empty((int(np.prod(shape)), len(SOIL_FEATURE_COLUMNS)), dtype=np.float64)
+    features[:] = base_row
+    for i, (name, values) in enumerate(axes):
+        column = SOIL_FEATURE_COLUMNS.index(SWEEP_PARAMETERS[name])
+        # Broadcast the axis along its own dimension instead of materializing a meshgrid
+        view = features[:, column].reshape(shape)
+        view[...] = values.reshape([-1 if j == i else 1 for j in range(len(shape))])
+    return features
+
+
+def cheapest_change(axes, base_row, health_scores, risk_idx, target, costs=None):
+    """
+    Grid point reaching the target class with the smallest change from the base
+    target: {"health_class": "High"} and/or {"risk_class": "Low"} (both must hold)
+    costs: optional per-parameter cost of one unit of change; by default a
+    change costs its fraction of the swept range, so parameters compare evenly
+    Ties go to the higher health score. Returns None if no grid point qualifies
+    Raises ValueError for unknown target keys, unknown cost parameters or negative costs
+    """
+    unknown = [key for key in target if key not in TARGET_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown target {', '.join(map(repr, unknown))}; expected {' and/or '.join(TARGET_KEYS)}")
+    costs = costs or {}
+    for name, unit_cost in costs.items():
+        if name not in SWEEP_PARAMETERS:
+            raise ValueError(f"Unknown cost parameter {name!r}; expected one of {', '.join(SWEEP_PARAMETERS)}")
+        if not float(unit_cost) >= 0:  # also rejects NaN
+            raise ValueError(f"Cost of {name!r} must be a non-negative number")
+
+    shape = tuple(len(values) for _, values in axes)
+    reached = np.ones(shape, dtype=bool)
+    if 'health_class' in target:
+        if target['health_class'] not in HEALTH_CLASSES:
+            raise ValueError(f"health_class must be one of {', '.join(HEALTH_CLASSES)}")
+        wanted = HEALTH_CLASSES.index(target['health_class'])
+        reached &= np.searchsorted([40, 70], health_scores, side='right') >= wanted
+    if 'risk_class' in target:
+        if target['risk_class'] not in RISK_CLASSES:
+            raise ValueError(f"risk_class must be one of {', '.join(RISK_CLASSES)}")
+        reached &= risk_idx <= RISK_CLASSES.index(target['risk_class'])
+    if not reached.any():
+        return None
+
+    cost = np.zeros(shape)
+    for i, (name, values) in enumerate(axes):
+        base = base_row[SOIL_FEATURE_COLUMNS.index(SWEEP_PARAMETERS[name])]
+        if name in costs:
+            unit_cost = float(costs[name])
+        else:
+            span = values.max() - values.min()
+            unit_cost = 1.0 / span if span > 0 else 0.0
+        axis_cost = np.abs(values - base) * unit_cost
+        cost = cost + axis_cost.reshape([-1 if j == i else 1 for j in range(len(shape))])
+
+    # Lexicographic: lowest cost, then highest health score
+    candidates = np.flatnonzero(reached.ravel())
+    order = np.lexsort((-health_scores.ravel()[candidates], cost.ravel()[candidates]))
+    best = np.unravel_index(candidates[order[0]], shape)
+
+    values = {name: float(axis_values[best[i]]) for i, (name, axis_values) in enumerate(axes)}
+    score = float(health_scores[best])
+    return {
+        'values': values,
+        'changes': {
+            name: round(value - float(base_row[SOIL_FEATURE_COLUMNS.index(SWEEP_PARAMETERS[name])]), 6)
+            for name, value in values.items()
+        },
+        'cost': round(float(cost[best]), 6),
+        'health_score': round(score, 2),
+        'health_class': str(classify_health_batch(score)),
+        'risk_class': RISK_CLASSES[int(risk_idx[best])]
+    }
+
+
+def sweep_soil(model_manager, base_row, axes, target=None, costs=None):
+    """
+    Score the cartesian grid of the swept parameters in one vectorized pass
+    Returns: dict with the axes, the health score and risk surfaces (nested
+    lists in axis order), their extremes and, with a target, the cheapest change
+    """
+    shape = tuple(len(values) for _, values in axes)
+    scores = model_manager.score_soil_batch(build_grid(base_row, axes))
+    health_scores = scores['health_scores'].reshape(shape)
+    risk_idx = scores['risk_idx'].reshape(shape)
+
+    best = np.unravel_index(np.argmax(health_scores), shape)
+    result = {
+        'axes': [{'name': name, 'values': values.tolist()} for name, values in axes],
+        'points': int(health_scores.size),
+        'health_scores': np.round(health_scores, 2).tolist(),
+        'risk_idx': risk_idx.tolist(),
+        'risk_classes': list(RISK_CLASSES),
+        'best': {
+            'values': {name: float(values[best[i]]) for i, (name, values) in enumerate(axes)},
+            'health_score': round(float(health_scores[best]), 2),
+            'risk_class': RISK_CLASSES[int(risk_idx[best])]
+        }
+    }
+    if target:
+        result['target'] = target
+        result['cheapest_change'] = cheapest_change(axes, base_row, health_scores, risk_idx, target, costs)
+    return result
@@ -0,0 +1,327 @@
+"""
+Location-based soil sample synthesizer
+
+Python port of frontend/src/utils/soilDataAPI.js (generateLocationBasedSoilData
+and its helpers). For the same coordinates, weather and month it produces the
+same sample as the browser, so load tests and offline tools see the same
+realistic inputs real users send.
+"""
+import datetime
+import math
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def to_fixed(value, digits):
+    """JavaScript Number.prototype.toFixed (rounds ties away from zero on the exact binary value)"""
+    return str(Decimal(value).quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP))
+
+
+def _fixed(value, digits):
+    """parseFloat(value.toFixed(digits))"""
+    return float(to_fixed(value, digits))
+
+
+def _to_int32(value):
+    value &= 0xFFFFFFFF
+    return value - 0x100000000 if value & 0x80000000 else value
+
+
+def hash_coordinates(lat, lng):
+    """Hash coordinates to create a consistent seed (JS 32-bit string hash)"""
+    text = f"{to_fixed(lat, 4)}_{to_fixed(lng, 4)}"
+    h = 0
+    for char in text:
+        h = _to_int32((_to_int32(h << 5) - h) + ord(char))
+    return abs(h)
+
+
+def create_seeded_random(seed):
+    """Seeded linear congruential generator returning floats in [0, 1)"""
+    state = [seed]
+
+    def random():
+        state[0] = (state[0] * 9301 + 49297) % 233280
+        return state[0] / 233280
+    return random
+
+
+def get_climate_zone(lat):
+    """Climate zone based on latitude"""
+    abs_lat = abs(lat)
+    if abs_lat < 15:
+        return 'tropical'
+    if abs_lat < 35:
+        return 'subtropical'
+    if abs_lat < 50:
+        return 'temperate'
+    if abs_lat < 66.5:
+        return 'cold'
+    return 'polar'
+
+
+def estimate_temperature(lat, month=None):
+    """Estimate temperature based on latitude and season (month 1-12, default: now)"""
+    abs_lat = abs(lat)
+    if month is None:
+        month = datetime.date.today().month
+
+    # Base temperature decreases with latitude
+    base_temp = 30 - (abs_lat * 0.4)
+
+    # Seasonal variation
+    if lat > 0:
+        base_temp += 5 if 4 <= month <= 9 else -5
+    else:
+        base_temp += 5 if (month >= 10 or month <= 3) else -5
+
+    base_temp += math.sin(abs_lat * 0.1) * 3
+
+    return max(5, min(40, base_temp))
+
+
+def estimate_humidity(lat):
+    """Estimate humidity based on latitude and proximity to water"""
+    abs_lat = abs(lat)
+
+    # Tropical regions have higher humidity
+    base_humidity = 70 - (abs_lat * 0.3)
+
+    # Coastal areas typically have higher humidity
+    base_humidity += math.sin(abs_lat * 0.2) * 15
+
+    return max(25, min(90, base_humidity))
+
+
+def determine_soil_type_by_location(lat, lng, climate_zone):
+    """Soil type based on location"""
+    location_factor = (math.sin(lat * 0.1) + math.cos(lng * 0.1)) / 2
+
+    if climate_zone == 'tropical':
+        # Tropical: more clayey and red soils
+        if location_factor > 0.3:
+            return 'Red'
+        if location_factor > -0.2:
+            return 'Clayey'
+        return 'Loamy'
+    if climate_zone == 'subtropical':
+        # Subtropical: varied, including black soils
+        if location_factor > 0.4:
+            return 'Black'
+        if location_factor > 0:
+            return 'Loamy'
+        if location_factor > -0.3:
+            return 'Red'
+        return 'Clayey'
+    if climate_zone == 'temperate':
+        # Temperate: mostly loamy and sandy
+        if location_factor > 0.2:
+            return 'Loamy'
+        if location_factor > -0.2:
+            return 'Sandy'
+        return 'Clayey'
+    # Cold/Polar: sandy and low organic matter
+    if location_factor > 0:
+        return 'Sandy'
+    return 'Loamy'
+
+
+def generate_nutrients_by_zone(climate_zone, soil_type, random):
+    """Nitrogen, phosphorous and potassium based on climate zone and soil type"""
+    nitrogen_base = 200
+    phosphorous_base = 30
+    potassium_base = 180
+
+    # Climate adjustments
+    if climate_zone == 'tropical':
+        nitrogen_base += 50
+        phosphorous_base += 10
+    elif climate_zone == 'temperate':
+        nitrogen_base += 30
+        phosphorous_base += 5
+    elif climate_zone == 'cold':
+        nitrogen_base -= 30
+        phosphorous_base -= 5
+
+    # Soil type adjustments
+    if soil_type == 'Black':
+        nitrogen_base += 40
+        phosphorous_base += 8
+        potassium_base += 30
+    elif soil_type == 'Red':
+        nitrogen_base -= 20
+        phosphorous_base -= 5
+        potassium_base += 15
+    elif soil_type == 'Sandy':
+        nitrogen_base -= 40
+        phosphorous_base -= 10
+        potassium_base -= 30
+    elif soil_type == 'Clayey':
+        potassium_base += 20
+
+    # Add variation
+    variation = random() * 0.3 + 0.85  # 85-115% of base
+
+    return {
+        'nitrogen': max(100, min(400, nitrogen_base * variation)),
+        'phosphorous': max(15, min(60, phosphorous_base * variation)),
+        'potassium': max(100, min(300, potassium_base * variation))
+    }
+
+
+def calculate_realistic_moisture(humidity, soil_type, api_moisture, random):
+    """Soil moisture from humidity, soil type and (optionally) measured moisture"""
+    moisture_base = humidity * 0.6
+
+    # Soil type affects water retention
+    if soil_type == 'Clayey':
+        moisture_base += 10
+    elif soil_type == 'Sandy':
+        moisture_base -= 15
+    elif soil_type == 'Black':
+        moisture_base += 5
+    elif soil_type == 'Loamy':
+        moisture_base += 2
+
+    # Use API data if available
+    if api_moisture:
+        moisture_base = (moisture_base + api_moisture * 100) / 2
+
+    # Add slight variation
+    moisture_base += (random() - 0.5) * 10
+
+    return max(20, min(80, moisture_base))
+
+
+def generate_ph_by_location(lat, soil_type, random):
+    """pH based on latitude and soil type"""
+    ph_base = 6.5
+
+    # Latitude effect (tropical = more acidic)
+    abs_lat = abs(lat)
+    if abs_lat < 23.5:
+        ph_base -= 0.8
+    elif abs_lat > 50:
+        ph_base += 0.5
+
+    # Soil type adjustments
+    if soil_type == 'Black':
+        ph_base += 0.5
+    elif soil_type == 'Red':
+        ph_base -= 0.4
+    elif soil_type == 'Sandy':
+        ph_base -= 0.3
+    elif soil_type == 'Clayey':
+        ph_base += 0.3
+
+    # Add variation
+    ph_base += (random() - 0.5) * 0.6
+
+    return max(5.0, min(8.5, ph_base))
+
+
+def generate_ec_by_location(lat, lng, climate_zone, random):
+    """EC (salinity) based on location"""
+    ec_base = 1.0
+
+    # Arid regions have higher salinity
+    if climate_zone == 'subtropical':
+        ec_base += 0.5
+    elif climate_zone == 'tropical':
+        ec_base -= 0.3
+
+    # Coastal proximity (using longitude variation as proxy)
+    ec_base += abs(math.sin(lng * 0.05)) * 0.4
+
+    # Add variation
+    ec_base += random() * 0.8
+
+    return max(0.5, min(4.0, ec_base))
+
+
+def generate_organic_carbon_by_zone(climate_zone, soil_type, random):
+    """Organic carbon based on climate zone and soil type"""
+    oc_base = 2.0
+
+    # Climate effects
+    if climate_zone == 'tropical':
+        oc_base += 1.0
+    elif climate_zone == 'temperate':
+        oc_base += 0.5
+    elif climate_zone == 'cold':
+        oc_base -= 0.5
+
+    # Soil type effects
+    if soil_type == 'Black':
+        oc_base += 1.5
+    elif soil_type == 'Sandy':
+        oc_base -= 0.8
+    elif soil_type == 'Clayey':
+        oc_base += 0.3
+
+    # Add variation
+    oc_base += (random() - 0.5) * 1.0
+
+    return max(0.5, min(5.0, oc_base))
+
+
+def determine_pathogen_presence(moisture, temperature, random):
+    """High moisture + warm temperature = higher pathogen risk"""
+    if moisture > 65 and temperature > 25 and random() > 0.6:
+        return 1
+    if moisture > 70 and random() > 0.7:
+        return 1
+    if temperature > 30 and moisture > 60 and random() > 0.65:
+        return 1
+    return 0
+
+
+def determine_salinity_class(ec):
+    if ec < 2.0:
+        return 'Normal'
+    if ec < 4.0:
+        return 'Slightly Saline'
+    if ec < 8.0:
+        return 'Moderately Saline'
+    return 'Highly Saline'
+
+
+def generate_location_based_soil_data(lat, lng, weather=None, month=None):
+    """
+    Realistic soil parameters for a location, in the request format of
+    /api/predict/soil-health
+    weather: optional dict with temperature, humidity and soilMoisture (Open-Meteo values)
+    month: month used for the seasonal temperature estimate (default: now)
+    """
+    weather = weather or {}
+    climate_zone = get_climate_zone(lat)
+
+    # Base values from weather or estimation
+    temperature = weather.get('temperature') or estimate_temperature(lat, month)
+    humidity = weather.get('humidity') or estimate_humidity(lat)
+
+    # Location-specific seed for consistency
+    random = create_seeded_random(hash_coordinates(lat, lng))
+
+    soil_type = determine_soil_type_by_location(lat, lng, climate_zone)
+    nutrients = generate_nutrients_by_zone(climate_zone, soil_type, random)
+    moisture = calculate_realistic_moisture(humidity, soil_type, weather.get('soilMoisture'), random)
+    ph = generate_ph_by_location(lat, soil_type, random)
+    ec = generate_ec_by_location(lat, lng, climate_zone, random)
+    organic_carbon = generate_organic_carbon_by_zone(climate_zone, soil_type, random)
+
+    return {
+        'temperature': _fixed(temperature, 1),
+        'humidity': _fixed(humidity, 1),
+        'moisture': _fixed(moisture, 1),
+        'soil_type': soil_type,
+        'nitrogen': _fixed(nutrients['nitrogen'], 1),
+        'phosphorous': _fixed(nutrients['phosphorous'], 1),
+        'potassium': _fixed(nutrients['potassium'], 1),
+        'ph': _fixed(ph, 1),
+        'ec': _fixed(ec, 2),
+        'organic_carbon': _fixed(organic_carbon, 2),
+        'pathogen_presence': determine_pathogen_presence(moisture, temperature, random),
+        'salinity_class': determine_salinity_class(ec),
+        'latitude': _fixed(lat, 4),
+        'longitude': _fixed(lng, 4)
+    }
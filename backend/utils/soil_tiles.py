@@ -0,0 +1,214 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.soil_synth import (
+    calculate_realistic_moisture, create_seeded_random, determine_pathogen_presence,
+    determine_salinity_class, determine_soil_type_by_location, estimate_humidity,
+    estimate_temperature, generate_ec_by_location, generate_nutrients_by_zone,
+    generate_organic_carbon_by_zone, generate_ph_by_location, get_climate_zone,
+    hash_coordinates, to_fixed
+)
+from utils.preprocessor import SALINITY_CODES, SOIL_TYPE_CODES
+
+# Per-cell channels of a tile. Values that only depend on the location are
+# stored as returned by the synthesizer (rounded); moisture and pathogen
+# presence depend on the weather, so the LCG states they draw from are kept
+# instead (exact in float32, as states are < 233280)
+CHANNELS = (
+    'soil_type', 'nitrogen', 'phosphorous', 'potassium', 'ph', 'ec', 'organic_carbon',
+    'salinity_class', 'moisture_state', 'pathogen_state'
+)
+_CH = {name: i for i, name in enumerate(CHANNELS)}
+_DIGITS = {'nitrogen': 1, 'phosphorous': 1, 'potassium': 1, 'ph': 1, 'ec': 2, 'organic_carbon': 2}
+_SOIL_TYPES = {code: name for name, code in SOIL_TYPE_CODES.items()}
+_SALINITY = {code: name for name, code in SALINITY_CODES.items()}
+_LCG_MODULUS = 233280
+
+
+def compute_cell_priors(lat, lng):
+    """Location-only soil priors for a point as one row of CHANNELS"""
+    draws = []
+    seeded = create_seeded_random(hash_coordinates(lat, lng))
+
+    def random():
+        draws.append(seeded())
+        return draws[-1]
+
+    climate_zone = get_climate_zone(lat)
+    soil_type = determine_soil_type_by_location(lat, lng, climate_zone)
+    nutrients = generate_nutrients_by_zone(climate_zone, soil_type, random)
+    random()  # moisture variation (applied at lookup, needs the weather)
+    ph = generate_ph_by_location(lat, soil_type, random)
+    ec = generate_ec_by_location(lat, lng, climate_zone, random)
+    organic_carbon = generate_organic_carbon_by_zone(climate_zone, soil_type, random)
+
+    row = np.empty(len(CHANNELS), dtype=np.float32)
+    row[_CH['soil_type']] = SOIL_TYPE_CODES[soil_type]
+    for name, value in (('nitrogen', nutrients['nitrogen']), ('phosphorous', nutrients['phosphorous']),
+                        ('potassium', nutrients['potassium']), ('ph', ph), ('ec', ec),
+                        ('organic_carbon', organic_carbon)):
+        row[_CH[name]] = float(to_fixed(value, _DIGITS[name]))
+    row[_CH['salinity_class']] = SALINITY_CODES[determine_salinity_class(ec)]
+    row[_CH['moisture_state']] = round(draws[1] * _LCG_MODULUS)
+    row[_CH['pathogen_state']] = round(draws[-1] * _LCG_MODULUS)
+    return row
+
+
+def sample_from_priors(row, lat, lng, weather=None, month=None):
+    """
+    Full soil sample from a cell's priors plus the weather at (lat, lng)
+    Equal to generate_location_based_soil_data(lat, lng, weather, month)
+    when (lat, lng) is the cell centre
+    """
+    weather = weather or {}
+    soil_type = _SOIL_TYPES[int(row[_CH['soil_type']])]
+    temperature = weather.get('temperature') or estimate_temperature(lat, month)
+    humidity = weather.get('humidity') or estimate_humidity(lat)
+
+    moisture_draw = float(row[_CH['moisture_state']]) / _LCG_MODULUS
+    moisture = calculate_realistic_moisture(humidity, soil_type, weather.get('soilMoisture'), lambda: moisture_draw)
+    pathogen = determine_pathogen_presence(
+        moisture, temperature, create_seeded_random(int(row[_CH['pathogen_state']]))
+    )
+
+    sample = {
+        'temperature': float(to_fixed(temperature, 1)),
+        'humidity': float(to_fixed(humidity, 1)),
+        'moisture': float(to_fixed(moisture, 1)),
+        'soil_type': soil_type
+    }
+    for name, digits in _DIGITS.items():
+        sample[name] = round(float(row[_CH[name]]), digits)
+    sample['pathogen_presence'] = pathogen
+    sample['salinity_class'] = _SALINITY[int(row[_CH['salinity_class']])]
+    sample['latitude'] = float(to_fixed(lat, 4))
+    sample['longitude'] = float(to_fixed(lng, 4))
+    return sample
+
+
+class SoilTileCache:
+    """
+    Location-derived soil priors in memory-mapped tiles
+
+    The map is split into 1x1 degree tiles of `cells_per_degree` squared grid
+    cells, one .npy file per tile under `tile_dir`. A cell is computed from
+    the synthesizer (at its centre) the first time it is looked up, or ahead
+    of time by warm_region(), and read straight from the mapped file after
+    that. Files are shared by all workers through the page cache.
+    """
+
+    def __init__(self, tile_dir, cells_per_degree=100, max_open_tiles=256):
+        self.tile_dir = tile_dir
+        self.cells_per_degree = cells_per_degree
+        self.max_open_tiles = max_open_tiles
+
+        self._tiles = OrderedDict()  # (lat, lng) degree -> writable memmap
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cell_of(self, lat, lng):
+        """(tile key, row, col, centre lat, centre lng) of the cell containing a point"""
+        n = self.cells_per_degree
+        tile_lat, tile_lng = math.floor(lat), math.floor(lng)
+        row = min(n - 1, int((lat - tile_lat) * n))
+        col = min(n - 1, int((lng - tile_lng) * n))
+        centre_lat = round(tile_lat + (row + 0.5) / n, 6)
+        centre_lng = round(tile_lng + (col + 0.5) / n, 6)
+        return (tile_lat, tile_lng), row, col, centre_lat, centre_lng
+
+    def tile_path(self, key):
+        return os.path.join(self.tile_dir, f"{key[0]:+03d}_{key[1]:+04d}.npy")
+
+    def _tile(self, key):
+        """Open (creating if needed) the memory-mapped array of a tile"""
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+
+            path = self.tile_path(key)
+            if not os.path.exists(path):
+                # Build the empty tile under a temporary name, then rename, so a
+                # worker never maps a half-written file
+                os.makedirs(self.tile_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                shape = (self.cells_per_degree, self.cells_per_degree, len(CHANNELS))
+                empty = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=shape)
+                empty[...] = np.nan
+                empty.flush()
+                del empty
+                os.replace(tmp_path, path)
+
+            tile = np.load(path, mmap_mode='r+')
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_open_tiles:
+                self._tiles.popitem(last=False)
+            return tile
+
+    def priors(self, lat, lng):
+        """(priors row, centre lat, centre lng) for the cell containing a point"""
+        key, row, col, centre_lat, centre_lng = self.cell_of(lat, lng)
+        tile = self._tile(key)
+        cell = tile[row, col]
+        if np.isnan(cell[0]):
+            self.misses += 1
+            values = compute_cell_priors(centre_lat, centre_lng)
+            # soil_type (the "computed" marker) is written last
+            cell[1:] = values[1:]
+            cell[0] = values[0]
+        else:
+            self.hits += 1
+        return np.array(cell), centre_lat, centre_lng
+
+    def lookup(self, lat, lng, weather=None):
+        """
+        Soil sample for a point: cached priors of its cell plus the weather
+        Returns: (sample, cell info dict)
+        """
+        row, centre_lat, centre_lng = self.priors(lat, lng)
+        sample = sample_from_priors(row, centre_lat, centre_lng, weather)
+        sample['latitude'] = float(to_fixed(lat, 4))
+        sample['longitude'] = float(to_fixed(lng, 4))
+        return sample, {
+            'centre': [centre_lat, centre_lng],
+            'size_degrees': 1.0 / self.cells_per_degree
+        }
+
+    def warm_tile(self, key):
+        """Compute every missing cell of one tile; returns the number computed"""
+        tile = self._tile(key)
+        n = self.cells_per_degree
+        missing = np.argwhere(np.isnan(tile[:, :, 0]))
+        for row, col in missing:
+            centre_lat = round(key[0] + (row + 0.5) / n, 6)
+            centre_lng = round(key[1] + (col + 0.5) / n, 6)
+            values = compute_cell_priors(centre_lat, centre_lng)
+            tile[row, col, 1:] = values[1:]
+            tile[row, col, 0] = values[0]
+        tile.flush()
+        return len(missing)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'open_tiles': len(self._tiles),
+            'cells_per_degree': self.cells_per_degree,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def region_tiles(lat_min, lat_max, lng_min, lng_max):
+    """Tile keys covering a lat/lng bounding box"""
+    return [
+        (lat, lng)
+        for lat in range(math.floor(lat_min), math.ceil(lat_max))
+        for lng in range(math.floor(lng_min), math.ceil(lng_max))
+    ]
@@ -0,0 +1,162 @@
+import math
+import threading
+
+import numpy as np
+
+from utils.scoring_rules import RISK_CLASSES
+
+# Health score histogram used for per-cell percentiles (0.5 point bins over 0-100)
+SCORE_BIN_WIDTH = 0.5
+SCORE_BINS = int(100 / SCORE_BIN_WIDTH)
+MAX_CELLS = 4096
+CELLS_PER_TILE = 8  # Aggregation cells per 256 px map tile (one cell per 32 px)
+
+
+def cell_degrees_for_zoom(zoom):
+    """Cell size (degrees) at a web map zoom level"""
+    return 360.0 / (2 ** zoom) / CELLS_PER_TILE
+
+
+class SpatialIndex:
+    """
+    In-memory index of scored soil samples for bounding-box aggregation
+
+    Points are held in columnar numpy arrays sorted by latitude, so a
+    bounding box is a binary search on latitude plus a vectorized longitude
+    filter. New points go to a small unsorted buffer that is merged in once
+    it grows past merge_threshold; queries scan the buffer as well.
+    Aggregation bins the points of the box into grid cells with bincount.
+    """
+
+    def __init__(self, merge_threshold=50000):
+        self.merge_threshold = merge_threshold
+        self._lat = np.empty(0, dtype=np.float64)
+        self._lng = np.empty(0, dtype=np.float64)
+        self._health = np.empty(0, dtype=np.float32)
+        self._risk = np.empty(0, dtype=np.int8)
+        self._pending = []  # list of (lat, lng, health, risk) array chunks
+        self._pending_count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lat) + self._pending_count
+
+    def add(self, lat, lng, health_score, risk_class):
+        self.add_many([lat], [lng], [health_score], [RISK_CLASSES.index(risk_class)])
+
+    def add_many(self, lat, lng, health_scores, risk_idx):
+        """Add points from parallel sequences (risk_idx: 0=Low, 1=Medium, 2=High)"""
+        chunk = (
+            np.asarray(lat, dtype=np.float64),
+            np.asarray(lng, dtype=np.float64),
+            np.asarray(health_scores, dtype=np.float32),
+            np.asarray(risk_idx, dtype=np.int8)
+        )
+        with self._lock:
+            self._pending.append(chunk)
+            self._pending_count += len(chunk[0])
+            if self._pending_count >= self.merge_threshold:
+                self._merge()
+
+    def _merge(self):
+        columns = [
+            np.concatenate([main] + [chunk[i] for chunk in self._pending])
+            for i, main in enumerate((self._lat, self._lng, self._health, self._risk))
+        ]
+        order = np.argsort(columns[0], kind='stable')
+        self._lat, self._lng, self._health, self._risk = (column[order] for column in columns)
+        self._pending = []
+        self._pending_count = 0
+
+    def query(self, min_lat, max_lat, min_lng, max_lng):
+        """(lat, lng, health, risk) arrays of the points inside a bounding box"""
+        with self._lock:
+            lat, lng, health, risk = self._lat, self._lng, self._health, self._risk
+            pending = list(self._pending)
+
+        # The sorted arrays only need the longitude test inside the latitude slice
+        start = np.searchsorted(lat, min_lat, side='left')
+        stop = np.searchsorted(lat, max_lat, side='right')
+        parts = [(lat[start:stop], lng[start:stop], health[start:stop], risk[start:stop], False)]
+        parts += [chunk + (True,) for chunk in pending]
+
+        selected = []
+        for p_lat, p_lng, p_health, p_risk, check_lat in parts:
+            mask = (p_lng >= min_lng) & (p_lng <= max_lng)
+            if check_lat:
+                mask &= (p_lat >= min_lat) & (p_lat <= max_lat)
+            if mask.all():
+                selected.append((p_lat, p_lng, p_health, p_risk))  # views, no copy
+            elif mask.any():
+                selected.append((p_lat[mask], p_lng[mask], p_health[mask], p_risk[mask]))
+        if len(selected) == 1:
+            return selected[0]
+        if not selected:
+            return lat[:0], lng[:0], health[:0], risk[:0]
+        return tuple(np.concatenate([part[i] for part in selected]) for i in range(4))
+
+    def aggregate(self, min_lat, max_lat, min_lng, max_lng, cell_degrees, percentiles=(50, 90)):
+        """
+        Grid aggregation of the points in a bounding box
+        cell_degrees is increased if the box would need more than MAX_CELLS cells
+        Returns: dict with the cell size, point total and one entry per
+        non-empty cell (bounds, count, mean health, percentiles, risk counts)
+        """
+        rows = max(1, math.ceil((max_lat - min_lat) / cell_degrees))
+        cols = max(1, math.ceil((max_lng - min_lng) / cell_degrees))
+        while rows * cols > MAX_CELLS:
+            cell_degrees *= 2
+            rows = max(1, math.ceil((max_lat - min_lat) / cell_degrees))
+            cols = max(1, math.ceil((max_lng - min_lng) / cell_degrees))
+
+        lat, lng, health, risk = self.query(min_lat, max_lat, min_lng, max_lng)
+        result = {'cell_degrees': cell_degrees, 'points': int(len(lat)), 'cells': []}
+        if not len(lat):
+            return result
+
+        row = np.minimum(((lat - min_lat) / cell_degrees).astype(np.intp), rows - 1)
+        col = np.minimum(((lng - min_lng) / cell_degrees).astype(np.intp), cols - 1)
+        cell = row * cols + col
+
+        counts = np.bincount(cell, minlength=rows * cols)
+        occupied = np.flatnonzero(counts)
+        # Renumber occupied cells 0..k-1 so the per-cell tables stay small
+        dense = np.empty(rows * cols, dtype=np.intp)
+        dense[occupied] = np.arange(len(occupied))
+        cell = dense[cell]
+        k = len(occupied)
+        counts = counts[occupied]
+
+        sums = np.bincount(cell, weights=health, minlength=k)
+        risk_counts = np.bincount(cell * len(RISK_CLASSES) + risk, minlength=k * len(RISK_CLASSES))
+        risk_counts = risk_counts.reshape(k, len(RISK_CLASSES))
+
+        # Percentiles (nearest rank) from per-cell score histograms
+        score_bin = np.clip((health * (1 / SCORE_BIN_WIDTH)).astype(np.intp), 0, SCORE_BINS - 1)
+        histogram = np.bincount(cell * SCORE_BINS + score_bin, minlength=k * SCORE_BINS).reshape(k, SCORE_BINS)
+        cumulative = np.cumsum(histogram, axis=1)
+        cell_percentiles = {}
+        for p in percentiles:
+            target = np.maximum(1, np.ceil(counts * p / 100.0))
+            first_bin = (cumulative >= target[:, None]).argmax(axis=1)
+            cell_percentiles[f"p{p}"] = ((first_bin + 0.5) * SCORE_BIN_WIDTH).tolist()
+
+        # Convert to Python values in bulk; per-element numpy scalars are slow
+        cell_rows, cell_cols = np.divmod(occupied, cols)
+        south = min_lat + cell_rows * cell_degrees
+        west = min_lng + cell_cols * cell_degrees
+        bounds = np.round(np.stack([south, west, south + cell_degrees, west + cell_degrees], axis=1), 6).tolist()
+        means = np.round(sums / counts, 2).tolist()
+        counts = counts.tolist()
+        risk_counts = risk_counts.tolist()
+        result['cells'] = [
+            {
+                'bounds': bounds[i],
+                'count': counts[i],
+                'mean_health': means[i],
+                'percentiles': {name: values[i] for name, values in cell_percentiles.items()},
+                'risk_counts': dict(zip(RISK_CLASSES, risk_counts[i]))
+            }
+            for i in range(k)
+        ]
+        return result
@@ -0,0 +1,149 @@
+import threading
+from concurrent.futures import Future
+
+from utils.prediction_cache import PredictionCache
+from utils.soil_synth import estimate_humidity, estimate_temperature
+
+# Open-Meteo "current" variables used by the soil form
+CURRENT_VARIABLES = 'temperature_2m,relative_humidity_2m,soil_temperature_0cm,soil_moisture_0_to_1cm'
+
+
+class WeatherProxy:
+    """
+    Current weather lookups for the soil form, proxied to Open-Meteo
+
+    Points are snapped to a grid of `cell_degrees` cells and each cell is
+    fetched once per TTL: nearby clicks share the cached result, identical
+    in-flight lookups are merged into one upstream call, and connections
+    come from a pooled requests.Session. When the upstream fails or is too
+    slow, the latitude-based estimate from the frontend is returned instead
+    (and the failure is remembered briefly so a dead upstream is not hammered).
+    """
+
+    def __init__(self, base_url, timeout_seconds=3.0, cell_degrees=0.05, ttl_seconds=600,
+                 failure_ttl_seconds=60, max_entries=4096, pool_size=16):
+        self.base_url = base_url
+        self.timeout_seconds = timeout_seconds
+        self.cell_degrees = cell_degrees
+        self.pool_size = pool_size
+
+        self._cache = PredictionCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._failures = PredictionCache(max_entries=max_entries, ttl_seconds=failure_ttl_seconds)
+        self._in_flight = {}  # cell -> Future of the upstream lookup
+        self._lock = threading.Lock()
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.coalesced = 0
+
+    @property
+    def session(self):
+        """Pooled HTTP session, created on first use (keeps requests out of startup)"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def cell(self, lat, lng):
+        """Grid cell (as integer indices) containing a point"""
+        return round(lat / self.cell_degrees), round(lng / self.cell_degrees)
+
+    def current_weather(self, lat, lng, month=None):
+        """
+        Current weather at a point
+        Returns: dict with temperature, humidity, soilTemp, soilMoisture,
+        source ('open-meteo' or 'estimate') and cached
+        """
+        cell = self.cell(lat, lng)
+        current = self._cache.get(cell)
+        cached = current is not None
+        if current is None and self._failures.get(cell) is None:
+            current = self._lookup_coalesced(cell)
+
+        if current is None:
+            return {
+                'temperature': estimate_temperature(lat, month),
+                'humidity': estimate_humidity(lat),
+                'soilTemp': None,
+                'soilMoisture': None,
+                'source': 'estimate',
+                'cached': False
+            }
+
+        # Same fallbacks as the frontend for missing values
+        return {
+            'temperature': current.get('temperature_2m') or estimate_temperature(lat, month),
+            'humidity': current.get('relative_humidity_2m') or estimate_humidity(lat),
+            'soilTemp': current.get('soil_temperature_0cm'),
+            'soilMoisture': current.get('soil_moisture_0_to_1cm'),
+            'source': 'open-meteo',
+            'cached': cached
+        }
+
+    def _lookup_coalesced(self, cell):
+        """Upstream lookup for a cell; concurrent callers for the same cell share one call"""
+        with self._lock:
+            future = self._in_flight.get(cell)
+            leader = future is None
+            if leader:
+                future = self._in_flight[cell] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            try:
+                return future.result(timeout=self.timeout_seconds + 1.0)
+            except Exception:
+                return None
+
+        current = None
+        try:
+            current = self._fetch(cell)
+            self._cache.put(cell, current)
+        except Exception:
+            with self._lock:
+                self.upstream_errors += 1
+            self._failures.put(cell, True)
+        finally:
+            with self._lock:
+                del self._in_flight[cell]
+            future.set_result(current)
+        return current
+
+    def _fetch(self, cell):
+        """Open-Meteo 'current' block for the centre of a cell"""
+        with self._lock:
+            self.upstream_calls += 1
+        response = self.session.get(self.base_url, params={
+            'latitude': round(cell[0] * self.cell_degrees, 4),
+            'longitude': round(cell[1] * self.cell_degrees, 4),
+            'current': CURRENT_VARIABLES,
+            'timezone': 'auto'
+        }, timeout=self.timeout_seconds)
+        response.raise_for_status()
+        current = response.json().get('current')
+        if not current:
+            raise ValueError('Open-Meteo response has no current weather')
+        return current
+
+    def stats(self):
+        cache = self._cache.stats()
+        return {
+            'upstream_calls': self.upstream_calls,
+            'upstream_errors': self.upstream_errors,
+            'coalesced': self.coalesced,
+            'cache_entries': cache['entries'],
+            'cache_hits': cache['hits'],
+            'cache_misses': cache['misses'],
+            'cache_hit_rate': cache['hit_rate'],
+            'cell_degrees': self.cell_degrees
+        }
@@ -0,0 +1,54 @@
+"""
+Precompute location-based soil priors for a region
+
+Fills the memory-mapped soil tiles served by /api/soil/location for every
+grid cell in a lat/lng bounding box, one 1x1 degree tile per task, so map
+clicks in that region never compute priors on the request path. Tiles that
+are already complete are skipped.
+
+Usage (from the backend directory):
+    python warm_soil_tiles.py --region 8 35 68 97            # India
+    python warm_soil_tiles.py --region 18 20 73 75 --workers 4
+"""
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+from config import Config
+from utils.soil_tiles import SoilTileCache, region_tiles
+
+
+def _tile_cache():
+    return SoilTileCache(Config.SOIL_TILE_DIR, cells_per_degree=Config.SOIL_TILE_CELLS_PER_DEGREE)
+
+
+def _warm(key):
+    return key, _tile_cache().warm_tile(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--region', type=float, nargs=4, required=True,
+                        metavar=('LAT_MIN', 'LAT_MAX', 'LNG_MIN', 'LNG_MAX'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='parallel processes')
+    args = parser.parse_args()
+
+    tiles = region_tiles(*args.region)
+    print(f"Warming {len(tiles)} tiles ({Config.SOIL_TILE_CELLS_PER_DEGREE ** 2} cells each) "
+          f"into {Config.SOIL_TILE_DIR} with {args.workers} workers")
+
+    start = time.perf_counter()
+    computed = 0
+    with Pool(args.workers) as pool:
+        for done, (key, cells) in enumerate(pool.imap_unordered(_warm, tiles), 1):
+            computed += cells
+            if done % 10 == 0 or done == len(tiles):
+                print(f"  {done}/{len(tiles)} tiles")
+    elapsed = time.perf_counter() - start
+
+    print(f"Computed {computed} cells in {elapsed:.1f} s ({computed / elapsed if elapsed else 0:.0f} cells/sec)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,10 @@
-import { useState, useEffect } from 'react'
-import { MapContainer, TileLayer, Marker, Popup, useMapEvents } from 'react-leaflet'
+import { useState, useEffect, useRef } from 'react'
+import { MapContainer, TileLayer, Marker, Popup, Rectangle, useMapEvents } from 'react-leaflet'
 import { Icon } from 'leaflet'
 import 'leaflet/dist/leaflet.css'
 import { MapPin, Loader } from 'lucide-react'
 import axios from 'axios'
+import { fetchMapAggregate } from '../utils/soilDataAPI'
 
 // Fix for default marker icon
 delete Icon.Default.prototype._getIconUrl
@@ -68,6 +69,55 @@ function LocationMarker({ onLocationSelect, selectedLocation, loading }) {
   )
 }
 
+// Cell colour by mean soil health (same bands as the health classes)
+function healthColor(score) {
+  if (score >= 70) return '#22c55e'
+  if (score >= 40) return '#f59e0b'
+  return '#ef4444'
+}
+
+function SoilHealthCells() {
+  const [cells, setCells] = useState([])
+  const latestRequest = useRef(0)
+
+  const refresh = async (map) => {
+    // Only the response to the latest view is drawn
+    const request = ++latestRequest.current
+    const result = await fetchMapAggregate(map.getBounds(), map.getZoom())
+    if (request === latestRequest.current) {
+      setCells(result)
+    }
+  }
+
+  const map = useMapEvents({
+    moveend() {
+      refresh(map)
+    },
+  })
+
+  useEffect(() => {
+    refresh(map)
+  }, [map])
+
+  return cells.map((cell) => (
+    <Rectangle
+      key={cell.bounds.join(',')}
+      bounds={[[cell.bounds[0], cell.bounds[1]], [cell.bounds[2], cell.bounds[3]]]}
+      pathOptions={{ color: healthColor(cell.mean_health), weight: 1, fillOpacity: 0.35 }}
+    >
+      <Popup>
+        <div>
+          <strong>Soil health: {cell.mean_health}</strong>
+          <br />
+          {cell.count} sample{cell.count === 1 ? '' : 's'} • p50 {cell.percentiles.p50} • p90 {cell.percentiles.p90}
+          <br />
+          Risk: {Object.entries(cell.risk_counts).map(([risk, count]) => `${risk} ${count}`).join(', ')}
+        </div>
+      </Popup>
+    </Rectangle>
+  ))
+}
+
 export default function MapComponent({ onLocationSelect, selectedLocation, loading: externalLoading, soilData }) {
   return (
     <div className="w-full h-[500px] rounded-lg overflow-hidden shadow-lg border-2 border-gray-200 relative">
@@ -86,6 +136,7 @@ export default function MapComponent({ onLocationSelect, selectedLocation, loadi
           attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
           url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
         />
+        <SoilHealthCells />
         <LocationMarker 
           onLocationSelect={onLocationSelect} 
           selectedLocation={selectedLocation}
@@ -8,6 +8,20 @@ export async function fetchSoilDataFromLocation(lat, lng) {
   try {
     console.log(`Fetching soil data for: ${lat}, ${lng}`)
     
+    // Location priors are cached per grid cell on the backend
+    const response = await axios.get('http://localhost:5000/api/soil/location', {
+      params: { lat, lng, weather: true },
+      timeout: 5000
+    })
+    if (response.data && response.data.data) {
+      console.log('Soil data from backend:', response.data.data)
+      return response.data.data
+    }
+  } catch (error) {
+    console.log('Backend soil lookup failed, generating locally')
+  }
+  
+  try {
     // Fetch real weather data
     const weatherData = await fetchWeatherData(lat, lng)
     
@@ -24,22 +38,46 @@ export async function fetchSoilDataFromLocation(lat, lng) {
 }
 
 /**
- * Fetch real weather data from Open-Meteo (free, no API key needed)
+ * Fetch aggregated soil health cells for the visible map area
+ * bounds: Leaflet LatLngBounds, zoom: current map zoom
+ */
+export async function fetchMapAggregate(bounds, zoom) {
+  try {
+    // Leaflet bounds can run past the antimeridian when zoomed out
+    const clamp = (value, limit) => Math.min(limit, Math.max(-limit, value)).toFixed(4)
+    const bbox = [
+      clamp(bounds.getSouth(), 90), clamp(bounds.getWest(), 180),
+      clamp(bounds.getNorth(), 90), clamp(bounds.getEast(), 180)
+    ].join(',')
+    const response = await axios.get('http://localhost:5000/api/map/aggregate', {
+      params: { bbox, zoom: Math.round(zoom) },
+      timeout: 5000
+    })
+    return response.data && response.data.data ? response.data.data.cells : []
+  } catch (error) {
+    console.log('Map aggregation unavailable')
+    return []
+  }
+}
+
+/**
+ * Fetch current weather through the backend weather proxy
+ * (pooled, cached Open-Meteo lookup with a latitude-based fallback)
  */
 async function fetchWeatherData(lat, lng) {
   try {
-    const response = await axios.get(
-      `https://api.open-meteo.com/v1/forecast?latitude=${lat}&longitude=${lng}&current=temperature_2m,relative_humidity_2m,soil_temperature_0cm,soil_moisture_0_to_1cm&timezone=auto`,
-      { timeout: 8000 }
-    )
+    const response = await axios.get('http://localhost:5000/api/weather', {
+      params: { lat, lng },
+      timeout: 5000
+    })
     
-    if (response.data && response.data.current) {
-      const current = response.data.current
+    if (response.data && response.data.data) {
+      const weather = response.data.data
       return {
-        temperature: current.temperature_2m || estimateTemperature(lat),
-        humidity: current.relative_humidity_2m || estimateHumidity(lat),
-        soilTemp: current.soil_temperature_0cm,
-        soilMoisture: current.soil_moisture_0_to_1cm
+        temperature: weather.temperature || estimateTemperature(lat),
+        humidity: weather.humidity || estimateHumidity(lat),
+        soilTemp: weather.soilTemp,
+        soilMoisture: weather.soilMoisture
       }
     }
   } catch (error) {